@@ -15,10 +15,13 @@
 # imports from python standard library
 import grading
 import imp
+import json
+import layout
 import optparse
 import os
 import re
 import sys
+import time
 import projectParams
 import random
 random.seed(0)
@@ -79,6 +82,28 @@ def readCommand(argv):
                     dest = 'noGraphics',
                     action = 'store_true',
                     help = 'No graphics display for pacman games.')
+    parser.add_option('--jobs', '-j',
+                    dest = 'jobs',
+                    type = 'int',
+                    default = 1,
+                    help = 'Run test cases in this many separate processes (implies --no-graphics)')
+    parser.add_option('--result-cache',
+                    dest = 'resultCache',
+                    default = '',
+                    help = 'Reuse results of questions whose fixtures and student code are unchanged, stored in this file (e.g. .autograder_results.json)')
+    parser.add_option('--force',
+                    dest = 'forceRerun',
+                    action = 'store_true',
+                    default = False,
+                    help = 'Grade every question again, ignoring reusable results')
+    parser.add_option('--submissions-dir',
+                    dest = 'submissionsDir',
+                    default = None,
+                    help = 'Grade every subdirectory of this directory as a separate submission (use --jobs to grade several at once)')
+    parser.add_option('--batch-results',
+                    dest = 'batchResults',
+                    default = 'batch_results.json',
+                    help = 'File the results of --submissions-dir are written to')
     (options, args) = parser.parse_args(argv)
     return options
 
@@ -243,34 +268,25 @@ def getTestSubdirs(testParser, testRoot, questionToGrade):
     return sorted(os.listdir(testRoot))
 
 
-# evaluate student code
-def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MAP,
-             edxOutput=False, muteOutput=False, gsOutput=False,
-            printTestCase=False, questionToGrade=None, display=None):
-    # imports of testbench code.  note that the testClasses import must follow
-    # the import of student code due to dependencies
+# parse the CONFIG, .test and .solution files of every question to grade
+def loadFixtures(testRoot, questionToGrade=None, loadSolutions=True):
+    """
+    Returns a list of (question, questionDict, tests), where tests is a list
+    of (testDict, solutionDict, solutionFile).  solutionDict is None when
+    loadSolutions is False.
+    """
     import testParser
-    import testClasses
-    for module in moduleDict:
-        setattr(sys.modules[__name__], module, moduleDict[module])
-
-    questions = []
-    questionDicts = {}
+    fixtures = []
     test_subdirs = getTestSubdirs(testParser, testRoot, questionToGrade)
     for q in test_subdirs:
         subdir_path = os.path.join(testRoot, q)
         if not os.path.isdir(subdir_path) or q[0] == '.':
             continue
-
-        # create a question object
         questionDict = testParser.TestParser(os.path.join(subdir_path, 'CONFIG')).parse()
-        questionClass = getattr(testClasses, questionDict['class'])
-        question = questionClass(questionDict, display)
-        questionDicts[q] = questionDict
 
-        # load test cases into question
         tests = filter(lambda t: re.match('[^#~.].*\.test\Z', t), os.listdir(subdir_path))
         tests = map(lambda t: re.match('(.*)\.test\Z', t).group(1), tests)
+        testFixtures = []
         for t in sorted(tests):
             test_file = os.path.join(subdir_path, '%s.test' % t)
             solution_file = os.path.join(subdir_path, '%s.solution' % t)
@@ -279,21 +295,56 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
             if testDict.get("disabled", "false").lower() == "true":
                 continue
             testDict['test_out_file'] = test_out_file
+            solutionDict = None
+            if loadSolutions:
+                solutionDict = testParser.TestParser(solution_file).parse()
+            testFixtures.append((testDict, solutionDict, solution_file))
+        fixtures.append((q, questionDict, testFixtures))
+    return fixtures
+
+
+# evaluate student code
+def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MAP,
+             edxOutput=False, muteOutput=False, gsOutput=False,
+            printTestCase=False, questionToGrade=None, display=None, jobs=1,
+            fixtures=None, resultStore=None):
+    # imports of testbench code.  note that the testClasses import must follow
+    # the import of student code due to dependencies
+    import testClasses
+    for module in moduleDict:
+        setattr(sys.modules[__name__], module, moduleDict[module])
+
+    if fixtures == None:
+        fixtures = loadFixtures(testRoot, questionToGrade, not generateSolutions)
+
+    testRunner = None
+    if jobs > 1:
+        testRunner = grading.ParallelTestRunner(jobs)
+
+    questions = []
+    questionDicts = {}
+    for q, questionDict, testFixtures in fixtures:
+        # create a question object
+        questionClass = getattr(testClasses, questionDict['class'])
+        question = questionClass(questionDict, display)
+        questionDicts[q] = questionDict
+
+        # load test cases into question
+        for testDict, solutionDict, solution_file in testFixtures:
             testClass = getattr(projectTestClasses, testDict['class'])
             testCase = testClass(question, testDict)
-            def makefun(testCase, solution_file):
+            def makefun(testCase, testDict, solutionDict, solution_file):
                 if generateSolutions:
                     # write solution file to disk
                     return lambda grades: testCase.writeSolution(moduleDict, solution_file)
+                elif printTestCase:
+                    return lambda grades: printTest(testDict, solutionDict) or testCase.execute(grades, moduleDict, solutionDict)
                 else:
-                    # read in solution dictionary and pass as an argument
-                    testDict = testParser.TestParser(test_file).parse()
-                    solutionDict = testParser.TestParser(solution_file).parse()
-                    if printTestCase:
-                        return lambda grades: printTest(testDict, solutionDict) or testCase.execute(grades, moduleDict, solutionDict)
-                    else:
-                        return lambda grades: testCase.execute(grades, moduleDict, solutionDict)
-            question.addTestCase(testCase, makefun(testCase, solution_file))
+                    return lambda grades: testCase.execute(grades, moduleDict, solutionDict)
+            thunk = makefun(testCase, testDict, solutionDict, solution_file)
+            if testRunner != None:
+                thunk = testRunner.submit(q, thunk)
+            question.addTestCase(testCase, thunk)
 
         # Note extra function is necessary for scoping reasons
         def makefun(question):
@@ -308,21 +359,138 @@ def evaluate(generateSolutions, testRoot, moduleDict, exceptionMap=ERROR_HINT_MA
             for prereq in questionDicts[q].get('depends', '').split():
                 grades.addPrereq(q, prereq)
 
-    grades.grade(sys.modules[__name__], bonusPic = projectParams.BONUS_PIC)
+    grades.grade(sys.modules[__name__], bonusPic = projectParams.BONUS_PIC, testRunner = testRunner,
+                 resultStore = resultStore)
     return grades.points
 
 
+def loadModuleDict(studentCode, testCaseCode, codeRoot="", studentRoot=None, projectTestClasses=None):
+    "Loads the student modules and, unless already loaded (projectTestClasses), the project's test classes"
+    if studentRoot == None: studentRoot = codeRoot
+    moduleNames = [(re.match('.*?([^/]*)\.py', cp).group(1), cp) for cp in studentCode.split(',')]
+    # New modules, rather than ones already loaded (e.g. by a batch grader's
+    # parent) run again over the old ones; they import each other
+    for moduleName, cp in moduleNames: sys.modules.pop(moduleName, None)
+    moduleDict = {}
+    for moduleName, cp in moduleNames:
+        moduleDict[moduleName] = loadModuleFile(moduleName, os.path.join(studentRoot, cp))
+    if projectTestClasses == None:
+        moduleName = re.match('.*?([^/]*)\.py', testCaseCode).group(1)
+        projectTestClasses = loadModuleFile(moduleName, os.path.join(codeRoot, testCaseCode))
+    moduleDict['projectTestClasses'] = projectTestClasses
+    return moduleDict
+
+
+#######################################################################
+# Batch grading
+#######################################################################
+
+def gradeSubmission(submissionDir, options, fixtures, projectTestClasses=None):
+    """
+    Grades one submission; runs in a child process forked from the batch
+    grader, so the fixtures, layouts, graphs and modules loaded by the parent
+    (including projectTestClasses, if it could load them) are shared.
+    """
+    import textDisplay
+    random.seed(0)
+    # Student modules import each other by name
+    sys.path.insert(0, submissionDir)
+    moduleDict = loadModuleDict(options.studentCode, options.testCaseCode,
+                                options.codeRoot, submissionDir, projectTestClasses)
+    points = evaluate(False, options.testRoot, moduleDict, muteOutput=True,
+                      questionToGrade=options.gradeQuestion,
+                      display=textDisplay.NullGraphics(), fixtures=fixtures)
+    return dict(points)
+
+def runSubmission(submissionDir, options, fixtures, projectTestClasses, connection):
+    "Body of a batch grading process; output of the grading is discarded"
+    devnull = open(os.devnull, 'w')
+    sys.stdout = devnull
+    os.dup2(devnull.fileno(), 1)
+    start = time.time()
+    try:
+        result = {'points': gradeSubmission(submissionDir, options, fixtures, projectTestClasses)}
+    except BaseException, inst:
+        result = {'error': '%s: %s' % (type(inst).__name__, inst)}
+    result['seconds'] = time.time() - start
+    connection.send(result)
+    connection.close()
+
+def gradeSubmissions(options):
+    """
+    Grades every subdirectory of options.submissionsDir, running up to
+    options.jobs submissions at a time, and writes the points of all of them
+    to options.batchResults as JSON.
+    """
+    import multiprocessing
+    import testClasses
+    import textDisplay
+    fixtures = loadFixtures(options.testRoot, options.gradeQuestion)
+    # Load the test classes (and the modules they import) once, here.  They
+    # import student code, for which the student files of the code directory
+    # stand in until each grader loads its submission's.
+    try:
+        projectTestClasses = loadModuleDict(options.studentCode, options.testCaseCode,
+                                            options.codeRoot)['projectTestClasses']
+    except Exception:
+        projectTestClasses = None # Each grader loads them after its student code
+    # Parse every test layout and graph once in the parent so the forked graders share them
+    for q, questionDict, testFixtures in fixtures:
+        for testDict, solutionDict, solutionFile in testFixtures:
+            if 'layout' in testDict: layout.getLayoutFromText(testDict['layout'])
+            if 'graph' in testDict and 'GraphSearch' in dir(projectTestClasses):
+                projectTestClasses.GraphSearch(testDict['graph'])
+    maxes = dict([(q, int(questionDict['max_points'])) for q, questionDict, tests in fixtures])
+
+    submissions = sorted([d for d in os.listdir(options.submissionsDir)
+                          if os.path.isdir(os.path.join(options.submissionsDir, d)) and d[0] != '.'])
+    results = {}
+    queued = list(submissions)
+    running = {}
+    while len(queued) > 0 or len(running) > 0:
+        while len(queued) > 0 and len(running) < max(options.jobs, 1):
+            name = queued.pop(0)
+            parentConnection, childConnection = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=runSubmission,
+                args=(os.path.join(options.submissionsDir, name), options, fixtures, projectTestClasses, childConnection))
+            process.start()
+            childConnection.close()
+            running[name] = (process, parentConnection)
+        for name, (process, connection) in running.items():
+            if connection.poll():
+                try: result = connection.recv()
+                except EOFError: result = {'error': 'Grading process crashed (exit code %s)' % process.exitcode}
+            elif not process.is_alive() and not connection.poll():
+                result = {'error': 'Grading process crashed (exit code %s)' % process.exitcode}
+            else:
+                continue
+            process.join()
+            connection.close()
+            del running[name]
+            if 'points' in result:
+                result['total'] = sum(result['points'].values())
+                print '%s: %d/%d (%.1fs)' % (name, result['total'], sum(maxes.values()), result['seconds'])
+            else:
+                print '%s: %s' % (name, result['error'])
+            results[name] = result
+        time.sleep(0.005)
+
+    with open(options.batchResults, 'w') as outfile:
+        json.dump({'project': projectParams.PROJECT_NAME, 'maxes': maxes,
+                   'submissions': results}, outfile, indent=2, sort_keys=True)
+    print 'Graded %d submissions; results written to %s' % (len(results), options.batchResults)
+
 
 def getDisplay(graphicsByDefault, options=None):
     graphics = graphicsByDefault
-    if options is not None and options.noGraphics:
+    if options is not None and (options.noGraphics or options.jobs > 1):
         graphics = False
     if graphics:
-        try:
+        # Checked without loading Tk, so that headless runs never load it
+        import graphicsUtils
+        if graphicsUtils.can_open_window():
             import graphicsDisplay
             return graphicsDisplay.PacmanGraphics(1, frameTime=.05)
-        except ImportError:
-            pass
     import textDisplay
     return textDisplay.NullGraphics()
 
@@ -333,21 +501,22 @@ if __name__ == '__main__':
     options = readCommand(sys.argv)
     if options.generateSolutions:
         confirmGenerate()
-    codePaths = options.studentCode.split(',')
-    # moduleCodeDict = {}
-    # for cp in codePaths:
-    #     moduleName = re.match('.*?([^/]*)\.py', cp).group(1)
-    #     moduleCodeDict[moduleName] = readFile(cp, root=options.codeRoot)
-    # moduleCodeDict['projectTestClasses'] = readFile(options.testCaseCode, root=options.codeRoot)
-    # moduleDict = loadModuleDict(moduleCodeDict)
 
-    moduleDict = {}
-    for cp in codePaths:
-        moduleName = re.match('.*?([^/]*)\.py', cp).group(1)
-        moduleDict[moduleName] = loadModuleFile(moduleName, os.path.join(options.codeRoot, cp))
-    moduleName = re.match('.*?([^/]*)\.py', options.testCaseCode).group(1)
-    moduleDict['projectTestClasses'] = loadModuleFile(moduleName, os.path.join(options.codeRoot, options.testCaseCode))
+    if options.submissionsDir != None:
+        gradeSubmissions(options)
+        sys.exit(0)
+
+    moduleDict = loadModuleDict(options.studentCode, options.testCaseCode, options.codeRoot)
 
+    resultStore = None
+    if options.resultCache and not options.generateSolutions and options.runTest == None:
+        import gradeCache
+        studentModules = [moduleDict[re.match('.*?([^/]*)\.py', cp).group(1)]
+                          for cp in options.studentCode.split(',')]
+        resultStore = gradeCache.ResultStore(os.path.join(options.codeRoot, options.resultCache),
+                                             studentModules, options.testRoot, options.codeRoot,
+                                             settings=(options.muteOutput, options.printTestCase),
+                                             force=options.forceRerun)
 
     if options.runTest != None:
         runTest(options.runTest, moduleDict, printTestCase=options.printTestCase, display=getDisplay(True, options))
@@ -355,4 +524,5 @@ if __name__ == '__main__':
         evaluate(options.generateSolutions, options.testRoot, moduleDict,
             gsOutput=options.gsOutput,
             edxOutput=options.edxOutput, muteOutput=options.muteOutput, printTestCase=options.printTestCase,
-            questionToGrade=options.gradeQuestion, display=getDisplay(options.gradeQuestion!=None, options))
+            questionToGrade=options.gradeQuestion, display=getDisplay(options.gradeQuestion!=None, options),
+            jobs=options.jobs, resultStore=resultStore)
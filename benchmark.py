@@ -0,0 +1,261 @@
+# benchmark.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Micro-benchmarks for the game engine.
+
+Measures, for every bundled layout, generateSuccessor calls/sec,
+getLegalActions queries/sec, Grid.copy calls/sec, Layout parses/sec and
+full-game moves/sec (random Pacman against RandomGhosts), plus push/pop
+operations/sec of the util data structures.  Results are written as JSON and
+can be compared against a stored baseline:
+
+  python benchmark.py --save-baseline                 # record a baseline
+  python benchmark.py --tolerance 0.15                # compare against it
+
+The comparison exits with status 1 if any benchmark is more than the
+tolerance slower than the baseline.
+"""
+
+import json
+import optparse
+import os
+import random
+import sys
+import time
+
+import layout
+import pacman
+import textDisplay
+import util
+from game import Agent, Directions
+from ghostAgents import RandomGhost
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+
+class RandomPacman(Agent):
+    "Picks a legal non-STOP action uniformly at random"
+    def getAction(self, state):
+        legal = state.getLegalPacmanActions()
+        if Directions.STOP in legal and len(legal) > 1:
+            legal.remove(Directions.STOP)
+        return random.choice(legal)
+
+class CappedGameRules(pacman.ClassicGameRules):
+    "Classic rules, except that games end after maxMoves agent moves"
+    def __init__(self, maxMoves):
+        pacman.ClassicGameRules.__init__(self)
+        self.maxMoves = maxMoves
+
+    def process(self, state, game):
+        pacman.ClassicGameRules.process(self, state, game)
+        if len(game.moveHistory) >= self.maxMoves:
+            game.gameOver = True
+
+REPEATS = 3
+
+def measure(function, duration):
+    """
+    Calls function() repeatedly for about duration seconds.  function returns
+    the number of operations it performed; returns operations per second,
+    the best of REPEATS such runs.
+    """
+    best = 0.0
+    for i in range(REPEATS):
+        ops = 0
+        start = time.time()
+        elapsed = 0.0
+        while elapsed < duration or ops == 0:
+            ops += function()
+            elapsed = time.time() - start
+        best = max(best, ops / elapsed)
+    return best
+
+def sampleStates(lay, numStates, seed=0):
+    "Returns up to numStates non-terminal states reached by random play"
+    random.seed(seed)
+    agents = [RandomPacman()] + [RandomGhost(i + 1) for i in range(lay.getNumGhosts())]
+    states = []
+    while len(states) < numStates:
+        state = pacman.GameState()
+        state.initialize(lay, lay.getNumGhosts())
+        # Every game would end at once; without food pacman wins with his first move
+        if state.isWin() or state.isLose() or state.getNumFood() == 0: break
+        agentIndex = 0
+        while not (state.isWin() or state.isLose()) and len(states) < numStates:
+            states.append((state, agentIndex))
+            action = agents[agentIndex].getAction(state)
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+    return states
+
+def benchmarkLayout(name, lay, duration, numStates=200, maxMoves=1000):
+    results = {}
+    states = sampleStates(lay, numStates)
+    transitions = [(s, i, s.getLegalActions(i)) for s, i in states]
+
+    def successors():
+        n = 0
+        for state, agentIndex, legal in transitions:
+            for action in legal:
+                state.generateSuccessor(agentIndex, action)
+            n += len(legal)
+        return n
+    results['successors/sec'] = measure(successors, duration)
+
+    def legalActions():
+        for state, agentIndex in states:
+            state.getLegalActions(agentIndex)
+        return len(states)
+    results['legalActions/sec'] = measure(legalActions, duration)
+
+    food = lay.food
+    def gridCopies():
+        for i in range(100): food.copy()
+        return 100
+    results['gridCopy/sec'] = measure(gridCopies, duration)
+
+    text = lay.layoutText
+    def layoutParses():
+        layout.Layout(text)
+        return 1
+    results['layoutParse/sec'] = measure(layoutParses, duration)
+
+    display = textDisplay.NullGraphics()
+    rules = CappedGameRules(maxMoves)
+    gameSeed = [0]
+    def gameMoves():
+        random.seed(gameSeed[0])
+        gameSeed[0] += 1
+        ghosts = [RandomGhost(i + 1) for i in range(lay.getNumGhosts())]
+        game = rules.newGame(lay, RandomPacman(), ghosts, display, quiet=True)
+        game.run()
+        return len(game.moveHistory)
+    results['gameMoves/sec'] = measure(gameMoves, duration)
+
+    return dict([('%s:%s' % (name, k), v) for k, v in results.items()])
+
+def benchmarkDataStructures(duration, size=1000):
+    results = {}
+    items = range(size)
+    rng = random.Random(0)
+    priorities = [rng.random() for i in items]
+    for name, cls in [('Stack', util.Stack), ('Queue', util.Queue)]:
+        def pushPop():
+            container = cls()
+            for item in items: container.push(item)
+            while not container.isEmpty(): container.pop()
+            return 2 * size
+        results['util.%s:ops/sec' % name] = measure(pushPop, duration)
+
+    def priorityPushPop():
+        container = util.PriorityQueue()
+        for item, priority in zip(items, priorities): container.push(item, priority)
+        while not container.isEmpty(): container.pop()
+        return 2 * size
+    results['util.PriorityQueue:ops/sec'] = measure(priorityPushPop, duration)
+
+    def priorityUpdate():
+        container = util.PriorityQueue()
+        for item, priority in zip(items[:100], priorities): container.update(item, priority)
+        for item in items[:100]: container.update(item, -1)
+        return 200
+    results['util.PriorityQueue.update:ops/sec'] = measure(priorityUpdate, duration)
+    return results
+
+def bundledLayouts():
+    return sorted([f[:-4] for f in os.listdir('layouts') if f.endswith('.lay')])
+
+def runBenchmarks(layoutNames, duration):
+    results = {}
+    for name in layoutNames:
+        lay = layout.getLayout(name)
+        if lay == None: raise Exception("The layout " + name + " cannot be found")
+        if len(sampleStates(lay, 1)) == 0:
+            # Nothing to time, e.g. a layout without food
+            print >>sys.stderr, 'Skipping %s: its games end at the start' % name
+            continue
+        print >>sys.stderr, 'Benchmarking %s' % name
+        results.update(benchmarkLayout(name, lay, duration))
+    results.update(benchmarkDataStructures(duration))
+    return results
+
+def compareToBaseline(results, baseline, tolerance):
+    "Prints a comparison and returns the names of regressed benchmarks"
+    regressions = []
+    print '%-45s %14s %14s %8s' % ('Benchmark', 'Baseline', 'Current', 'Ratio')
+    for name in sorted(results):
+        if name not in baseline:
+            print '%-45s %14s %14.1f %8s' % (name, '-', results[name], 'new')
+            continue
+        ratio = results[name] / baseline[name]
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print '%-45s %14.1f %14.1f %8.2f%s' % (name, baseline[name], results[name], ratio, flag)
+    return regressions
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Run engine micro-benchmarks')
+    parser.add_option('-l', '--layouts', dest='layouts', default=None,
+                      help='Comma separated layouts to benchmark [Default: all bundled layouts]')
+    parser.add_option('-d', '--duration', dest='duration', type='float', default=0.2,
+                      help='Seconds spent on each measurement [Default: %default]')
+    parser.add_option('-r', '--repeats', dest='repeats', type='int', default=REPEATS,
+                      help='Runs per measurement; the fastest is reported [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write the results as JSON to this file')
+    parser.add_option('-b', '--baseline', dest='baseline', default=DEFAULT_BASELINE,
+                      help='Baseline results to compare against [Default: %default]')
+    parser.add_option('--save-baseline', dest='saveBaseline', action='store_true', default=False,
+                      help='Store the results as the new baseline instead of comparing')
+    parser.add_option('-t', '--tolerance', dest='tolerance', type='float', default=0.15,
+                      help='Allowed fractional slowdown before failing [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+def writeResults(results, path, duration):
+    f = open(path, 'w')
+    try: json.dump({'duration': duration, 'python': sys.version.split()[0], 'results': results}, f, indent=2, sort_keys=True)
+    finally: f.close()
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    REPEATS = options.repeats
+    if options.layouts != None:
+        layoutNames = options.layouts.split(',')
+    else:
+        layoutNames = bundledLayouts()
+    results = runBenchmarks(layoutNames, options.duration)
+
+    if options.output != None:
+        writeResults(results, options.output, options.duration)
+    if options.saveBaseline:
+        writeResults(results, options.baseline, options.duration)
+        print 'Baseline written to %s' % options.baseline
+    elif os.path.exists(options.baseline):
+        f = open(options.baseline)
+        try: baseline = json.load(f)['results']
+        finally: f.close()
+        regressions = compareToBaseline(results, baseline, options.tolerance)
+        if len(regressions) > 0:
+            print '%d benchmark(s) regressed by more than %d%%' % (len(regressions), 100 * options.tolerance)
+            sys.exit(1)
+    else:
+        for name in sorted(results):
+            print '%-45s %14.1f' % (name, results[name])
+        print 'No baseline found at %s; run with --save-baseline to create one' % options.baseline
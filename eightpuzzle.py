@@ -17,7 +17,26 @@ import random
 
 # Module Classes
 
-class EightPuzzleState:
+def makeBlankMoves():
+    """
+      For each cell (numbered row * 3 + col), the moves of the blank from
+    that cell, in the order legalMoves lists them, as (move, cell the blank
+    moves to, bit offset of that cell) triples.
+    """
+    table = []
+    for cell in range(9):
+        row, col = divmod(cell, 3)
+        moves = []
+        if row != 0: moves.append(('up', cell - 3))
+        if row != 2: moves.append(('down', cell + 3))
+        if col != 0: moves.append(('left', cell - 1))
+        if col != 2: moves.append(('right', cell + 1))
+        table.append(tuple([(move, target, 4 * target) for move, target in moves]))
+    return tuple(table)
+
+BLANK_MOVES = makeBlankMoves()
+
+class EightPuzzleState(object):
     """
     The Eight Puzzle is described in the course textbook on
     page 64.
@@ -26,6 +45,8 @@ class EightPuzzleState:
     task of recasting this puzzle as a search problem is left to
     the EightPuzzleSearchProblem class.
     """
+    # Searches create millions of states: keep them to two integers
+    __slots__ = ('packed', 'blank')
 
     def __init__( self, numbers ):
         """
@@ -46,18 +67,27 @@ class EightPuzzleState:
             | 6 | 7 | 8 |
             ------------
 
-        The configuration of the puzzle is stored in a 2-dimensional
-        list (a list of lists) 'cells'.
+        The configuration of the puzzle is packed into a single integer,
+        'packed', with four bits per cell: the number in row r and column c
+        is stored in bits 4 * (3 * r + c) and up.  'blank' is the cell
+        number (3 * r + c) of the blank.  'cells' returns the configuration
+        as a tuple of rows, each a tuple: a copy, so it cannot be used to
+        change the state (it used to be a list of lists kept by the state).
         """
-        self.cells = []
-        numbers = numbers[:] # Make a copy so as not to cause side-effects.
-        numbers.reverse()
-        for row in range( 3 ):
-            self.cells.append( [] )
-            for col in range( 3 ):
-                self.cells[row].append( numbers.pop() )
-                if self.cells[row][col] == 0:
-                    self.blankLocation = row, col
+        packed = 0
+        for cell, number in enumerate(numbers):
+            packed |= number << (4 * cell)
+            if number == 0:
+                self.blank = cell
+        self.packed = packed
+
+    def _getCells(self):
+        return tuple([tuple([(self.packed >> (4 * (3 * row + col))) & 15 for col in range(3)]) for row in range(3)])
+    cells = property(_getCells)
+
+    def _getBlankLocation(self):
+        return divmod(self.blank, 3)
+    blankLocation = property(_getBlankLocation)
 
     def isGoal( self ):
         """
@@ -77,13 +107,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).isGoal()
         False
         """
-        current = 0
-        for row in range( 3 ):
-            for col in range( 3 ):
-                if current != self.cells[row][col]:
-                    return False
-                current += 1
-        return True
+        return self.packed == GOAL_PACKED
 
     def legalMoves( self ):
         """
@@ -95,17 +119,7 @@ class EightPuzzleState:
         >>> EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).legalMoves()
         ['down', 'right']
         """
-        moves = []
-        row, col = self.blankLocation
-        if(row != 0):
-            moves.append('up')
-        if(row != 2):
-            moves.append('down')
-        if(col != 0):
-            moves.append('left')
-        if(col != 2):
-            moves.append('right')
-        return moves
+        return [move for move, target, offset in BLANK_MOVES[self.blank]]
 
     def result(self, move):
         """
@@ -113,37 +127,29 @@ class EightPuzzleState:
         updated based on the provided move.
 
         The move should be a string drawn from a list returned by legalMoves.
-        Illegal moves will raise an exception, which may be an array bounds
-        exception.
+        Illegal moves will raise an exception.
 
         NOTE: This function *does not* change the current object.  Instead,
         it returns a new object.
         """
-        row, col = self.blankLocation
-        if(move == 'up'):
-            newrow = row - 1
-            newcol = col
-        elif(move == 'down'):
-            newrow = row + 1
-            newcol = col
-        elif(move == 'left'):
-            newrow = row
-            newcol = col - 1
-        elif(move == 'right'):
-            newrow = row
-            newcol = col + 1
-        else:
-            raise "Illegal Move"
-
-        # Create a copy of the current eightPuzzle
-        newPuzzle = EightPuzzleState([0, 0, 0, 0, 0, 0, 0, 0, 0])
-        newPuzzle.cells = [values[:] for values in self.cells]
-        # And update it to reflect the move
-        newPuzzle.cells[row][col] = self.cells[newrow][newcol]
-        newPuzzle.cells[newrow][newcol] = self.cells[row][col]
-        newPuzzle.blankLocation = newrow, newcol
-
-        return newPuzzle
+        for legalMove, target, offset in BLANK_MOVES[self.blank]:
+            if legalMove == move:
+                # Swap the blank (a zero) with the number in the target cell
+                number = (self.packed >> offset) & 15
+                return makeState(self.packed - (number << offset) + (number << (4 * self.blank)), target)
+        raise Exception("Illegal move: %s" % move)
+
+    def successors(self):
+        """
+          Returns a list of (state, move) pairs for the legal moves, in the
+        order of legalMoves.
+        """
+        packed, blankOffset = self.packed, 4 * self.blank
+        successors = []
+        for move, target, offset in BLANK_MOVES[self.blank]:
+            number = (packed >> offset) & 15
+            successors.append((makeState(packed - (number << offset) + (number << blankOffset), target), move))
+        return successors
 
     # Utilities for comparison and display
     def __eq__(self, other):
@@ -155,13 +161,13 @@ class EightPuzzleState:
               EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]).result('left')
           True
         """
-        for row in range( 3 ):
-            if self.cells[row] != other.cells[row]:
-                return False
-        return True
+        return isinstance(other, EightPuzzleState) and self.packed == other.packed
+
+    def __ne__(self, other):
+        return not self == other
 
     def __hash__(self):
-        return hash(str(self.cells))
+        return hash(self.packed)
 
     def __getAsciiString(self):
         """
@@ -183,6 +189,15 @@ class EightPuzzleState:
     def __str__(self):
         return self.__getAsciiString()
 
+GOAL_PACKED = EightPuzzleState([0, 1, 2, 3, 4, 5, 6, 7, 8]).packed
+
+def makeState(packed, blank):
+    "Creates an EightPuzzleState from its packed form, without unpacking"
+    state = EightPuzzleState.__new__(EightPuzzleState)
+    state.packed = packed
+    state.blank = blank
+    return state
+
 # TODO: Implement The methods in this class
 
 class EightPuzzleSearchProblem(search.SearchProblem):
@@ -196,7 +211,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         self.puzzle = puzzle
 
     def getStartState(self):
-        return puzzle
+        return self.puzzle
 
     def isGoalState(self,state):
         return state.isGoal()
@@ -207,10 +222,7 @@ class EightPuzzleSearchProblem(search.SearchProblem):
           each succesor is either left, right, up, or down
           from the original state and the cost is 1.0 for each
         """
-        succ = []
-        for a in state.legalMoves():
-            succ.append((state.result(a), a, 1))
-        return succ
+        return [(successor, move, 1) for successor, move in state.successors()]
 
     def getCostOfActions(self, actions):
         """
@@ -221,6 +233,25 @@ class EightPuzzleSearchProblem(search.SearchProblem):
         """
         return len(actions)
 
+# MANHATTAN_DISTANCES[tile][cell]: distance from cell to the goal cell of tile
+MANHATTAN_DISTANCES = [[abs(cell / 3 - tile / 3) + abs(cell % 3 - tile % 3) for cell in range(9)]
+                       for tile in range(9)]
+
+def manhattanHeuristic(state, problem=None):
+    """
+      The sum of the Manhattan distances of the tiles from their goal cells.
+
+    >>> manhattanHeuristic(EightPuzzleState([1, 0, 2, 3, 4, 5, 6, 7, 8]))
+    1
+    """
+    packed = state.packed
+    total = 0
+    for cell in range(9):
+        tile = packed & 15
+        if tile: total += MANHATTAN_DISTANCES[tile][cell]
+        packed >>= 4
+    return total
+
 EIGHT_PUZZLE_DATA = [[1, 0, 2, 3, 4, 5, 6, 7, 8],
                      [1, 7, 8, 2, 3, 4, 5, 6, 0],
                      [4, 3, 2, 7, 0, 5, 1, 6, 8],
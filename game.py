@@ -515,7 +515,7 @@ class Game:
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, profiler=None ):
         self.agentCrashed = False
         self.agents = agents
         self.display = display
@@ -528,6 +528,7 @@ class Game:
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
+        self.profiler = profiler
         import cStringIO
         self.agentOutput = [cStringIO.StringIO() for agent in agents]
 
@@ -543,6 +544,8 @@ class Game:
         self.gameOver = True
         self.agentCrashed = True
         self.rules.agentCrash(self, agentIndex)
+        if self.profiler != None:
+            self.profiler.finishGame(self)
 
     OLD_STDOUT = None
     OLD_STDERR = None
@@ -568,6 +571,13 @@ class Game:
         """
         Main control loop for game play.
         """
+        # With a profiler, agent and engine calls are wrapped to record their latency
+        if self.profiler != None:
+            self.profiler.startGame(self)
+            timed = self.profiler.wrap
+        else:
+            timed = lambda phase, agentIndex, function: function
+
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -587,7 +597,7 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
+                        timed_func = TimeoutFunction(timed('registerInitialState', i, agent.registerInitialState), self.rules.getMaxStartupTime(i))
                         try:
                             start_time = time.time()
                             timed_func(self.state.deepCopy())
@@ -604,7 +614,7 @@ class Game:
                         self.unmute()
                         return
                 else:
-                    agent.registerInitialState(self.state.deepCopy())
+                    timed('registerInitialState', i, agent.registerInitialState)(self.state.deepCopy())
                 ## TODO: could this exceed the total time
                 self.unmute()
 
@@ -621,7 +631,7 @@ class Game:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
+                        timed_func = TimeoutFunction(timed('observationFunction', agentIndex, agent.observationFunction), self.rules.getMoveTimeout(agentIndex))
                         try:
                             start_time = time.time()
                             observation = timed_func(self.state.deepCopy())
@@ -634,7 +644,7 @@ class Game:
                         self.unmute()
                         return
                 else:
-                    observation = agent.observationFunction(self.state.deepCopy())
+                    observation = timed('observationFunction', agentIndex, agent.observationFunction)(self.state.deepCopy())
                 self.unmute()
             else:
                 observation = self.state.deepCopy()
@@ -644,7 +654,7 @@ class Game:
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
+                    timed_func = TimeoutFunction(timed('getAction', agentIndex, agent.getAction), self.rules.getMoveTimeout(agentIndex) - move_time)
                     try:
                         start_time = time.time()
                         if skip_action:
@@ -683,29 +693,29 @@ class Game:
                     self.unmute()
                     return
             else:
-                action = agent.getAction(observation)
+                action = timed('getAction', agentIndex, agent.getAction)(observation)
             self.unmute()
 
             # Execute the action
             self.moveHistory.append( (agentIndex, action) )
             if self.catchExceptions:
                 try:
-                    self.state = self.state.generateSuccessor( agentIndex, action )
+                    self.state = timed('generateSuccessor', agentIndex, self.state.generateSuccessor)( agentIndex, action )
                 except Exception,data:
                     self.mute(agentIndex)
                     self._agentCrash(agentIndex)
                     self.unmute()
                     return
             else:
-                self.state = self.state.generateSuccessor( agentIndex, action )
+                self.state = timed('generateSuccessor', agentIndex, self.state.generateSuccessor)( agentIndex, action )
 
             # Change the display
-            self.display.update( self.state.data )
+            timed('display', agentIndex, self.display.update)( self.state.data )
             ###idx = agentIndex - agentIndex % 2 + 1
             ###self.display.update( self.state.makeObservation(idx).data )
 
             # Allow for game specific conditions (winning, losing, etc.)
-            self.rules.process(self.state, self)
+            timed('rules', agentIndex, self.rules.process)(self.state, self)
             # Track progress
             if agentIndex == numAgents + 1: self.numMoves += 1
             # Next agent
@@ -726,4 +736,6 @@ class Game:
                     self._agentCrash(agentIndex)
                     self.unmute()
                     return
+        if self.profiler != None:
+            self.profiler.finishGame(self)
         self.display.finish()
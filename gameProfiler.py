@@ -0,0 +1,169 @@
+# gameProfiler.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Opt-in instrumentation for Game.run.
+
+A GameProfiler handed to a Game records how long every agent spends in
+registerInitialState, observationFunction and getAction, and how long the
+engine spends generating successors, updating the display and applying the
+rules after each agent's move.  At the end of the game the latencies can be
+summarised (count, mean, p50, p95, p99, max) and exported as JSON.
+
+With profileMoves=N, every getAction call also runs under cProfile and the
+statistics of the N slowest moves are kept in the report.
+
+  python pacman.py -q -n 5 --profile profile.json --profileMoves 3
+"""
+
+import cProfile
+import cStringIO
+import heapq
+import json
+import math
+import pstats
+import time
+
+AGENT_PHASES = ['registerInitialState', 'observationFunction', 'getAction']
+ENGINE_PHASES = ['generateSuccessor', 'display', 'rules']
+
+class LatencyHistogram:
+    """
+    Collects latency samples (in seconds) for one agent and phase.
+    """
+    def __init__(self):
+        self.samples = []
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, sortedSamples, p):
+        "Nearest-rank percentile of an already sorted list of samples"
+        if len(sortedSamples) == 0: return 0.0
+        rank = int(math.ceil(p / 100.0 * len(sortedSamples))) - 1
+        return sortedSamples[min(max(rank, 0), len(sortedSamples) - 1)]
+
+    def summary(self):
+        samples = sorted(self.samples)
+        count = len(samples)
+        total = sum(samples)
+        return {'count': count,
+                'total': total,
+                'mean': count and total / count or 0.0,
+                'p50': self.percentile(samples, 50),
+                'p95': self.percentile(samples, 95),
+                'p99': self.percentile(samples, 99),
+                'max': count and samples[-1] or 0.0}
+
+class GameProfiler:
+    """
+    Records per-agent, per-phase latencies for a single game.
+    """
+    def __init__(self, profileMoves=0, profileLines=25):
+        self.profileMoves = profileMoves
+        self.profileLines = profileLines
+        self.histograms = {}
+        self.slowestMoves = [] # Min-heap of (seconds, move, agentIndex, stats)
+        self.agentNames = []
+        self.moveNumber = 0
+        self.startTime = None
+        self.wallTime = 0.0
+        self.result = {}
+
+    def startGame(self, game):
+        self.agentNames = [agent.__class__.__name__ if agent else None for agent in game.agents]
+        self.startTime = time.time()
+
+    def finishGame(self, game):
+        self.wallTime = time.time() - self.startTime
+        self.result = {'score': game.state.getScore(),
+                       'win': game.state.isWin(),
+                       'moves': len(game.moveHistory),
+                       'crashed': game.agentCrashed}
+
+    def record(self, phase, agentIndex, seconds):
+        key = (phase, agentIndex)
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        self.histograms[key].add(seconds)
+
+    def wrap(self, phase, agentIndex, function):
+        """
+        Returns a version of function which records its running time under
+        the given phase.  Time is recorded even if the function raises.
+        """
+        if phase == 'getAction' and self.profileMoves > 0:
+            return lambda *args: self._profiledCall(agentIndex, function, args)
+
+        def timed(*args):
+            start = time.time()
+            try:
+                return function(*args)
+            finally:
+                self.record(phase, agentIndex, time.time() - start)
+        return timed
+
+    def _profiledCall(self, agentIndex, function, args):
+        profile = cProfile.Profile()
+        start = time.time()
+        try:
+            return profile.runcall(function, *args)
+        finally:
+            seconds = time.time() - start
+            self.record('getAction', agentIndex, seconds)
+            self.moveNumber += 1
+            entry = (seconds, self.moveNumber, agentIndex, profile)
+            if len(self.slowestMoves) < self.profileMoves:
+                heapq.heappush(self.slowestMoves, entry)
+            elif seconds > self.slowestMoves[0][0]:
+                heapq.heapreplace(self.slowestMoves, entry)
+
+    def _formatProfile(self, profile):
+        out = cStringIO.StringIO()
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.profileLines)
+        return out.getvalue()
+
+    def report(self):
+        "Returns a JSON-serialisable summary of the game"
+        agents = []
+        for index, name in enumerate(self.agentNames):
+            phases = {}
+            for phase in AGENT_PHASES + ENGINE_PHASES:
+                if (phase, index) in self.histograms:
+                    phases[phase] = self.histograms[(phase, index)].summary()
+            agents.append({'index': index, 'agent': name, 'phases': phases})
+        slowest = []
+        for seconds, move, agentIndex, profile in sorted(self.slowestMoves, reverse=True):
+            slowest.append({'seconds': seconds, 'move': move, 'agent': agentIndex,
+                            'profile': self._formatProfile(profile)})
+        return {'wallTime': self.wallTime,
+                'result': self.result,
+                'agents': agents,
+                'slowestMoves': slowest}
+
+    def printSummary(self):
+        print '%-6s %-22s %-20s %7s %9s %9s %9s %9s' % ('Agent', 'Type', 'Phase', 'Count', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms')
+        for agent in self.report()['agents']:
+            for phase in AGENT_PHASES + ENGINE_PHASES:
+                if phase not in agent['phases']: continue
+                s = agent['phases'][phase]
+                print '%-6d %-22s %-20s %7d %9.3f %9.3f %9.3f %9.3f' % (agent['index'], agent['agent'], phase, s['count'],
+                                                                  1000 * s['p50'], 1000 * s['p95'], 1000 * s['p99'], 1000 * s['max'])
+
+def writeReports(profilers, path):
+    "Writes the reports of a list of GameProfilers to a JSON file"
+    f = open(path, 'w')
+    try: json.dump([p.report() for p in profilers], f, indent=2)
+    finally: f.close()
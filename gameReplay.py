@@ -0,0 +1,216 @@
+# gameReplay.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Replays recorded games (pacman.py -r) with random access to every move.
+
+A Replay applies the recorded actions once, keeping the state every
+checkpointEvery moves along with the score after each move and how the game
+ended.  The state after any move is then rebuilt from the checkpoint before
+it; the states between two checkpoints are kept together, so stepping
+backwards costs one rebuild per checkpointEvery moves.  No agents or
+display are needed, so recorded games can also be summarised in bulk.
+
+  python gameReplay.py recorded-game-1                  # watch it
+  python gameReplay.py -t --start 200 --step -1 recorded-game-1   # backwards from move 200
+  python gameReplay.py --step 10 recorded-game-1        # fast forward, every 10th move
+  python gameReplay.py --analyze recorded-game-*        # scores and deaths, no display
+"""
+
+import cPickle
+import optparse
+import os
+import sys
+import time
+
+import util
+from pacman import GameState
+
+CHECKPOINT_EVERY = 50
+
+class DiscardStates:
+    "Stands in for GameState.explored, which need not grow while replaying"
+    def add(self, state):
+        pass
+
+DISCARD_STATES = DiscardStates()
+
+def loadRecordedGame(path):
+    "The layout and actions of a game recorded by pacman.py -r"
+    f = open(path, 'rb')
+    try: recorded = cPickle.load(f)
+    finally: f.close()
+    return recorded['layout'], recorded['actions']
+
+class Replay:
+    """
+    A recorded game.  len(replay) is the number of moves and
+    replay.stateAt(move) the GameState after that many moves, from 0 (the
+    start) to len(replay).  scores[move] is the score after move moves;
+    won, lost and deathPosition tell how the game ended.
+    """
+    def __init__(self, layout, actions, checkpointEvery=CHECKPOINT_EVERY):
+        self.layout = layout
+        self.checkpointEvery = max(1, checkpointEvery)
+        self.checkpoints = []
+        self.scores = []
+        self.actions = []
+        self.segment = (None, [])
+        state = GameState()
+        # The game may have had fewer ghosts than the layout (pacman.py -k)
+        numGhosts = max([agentIndex for agentIndex, action in actions] + [0])
+        state.initialize(layout, numGhosts)
+        self.numAgents = state.getNumAgents()
+        explored = GameState.explored
+        GameState.explored = DISCARD_STATES
+        try:
+            for move in range(len(actions) + 1):
+                if move % self.checkpointEvery == 0: self.checkpoints.append(state)
+                self.scores.append(state.data.score)
+                if move == len(actions) or state.isWin() or state.isLose(): break
+                self.actions.append(actions[move])
+                state = state.generateSuccessor(*actions[move])
+        finally:
+            GameState.explored = explored
+        self.won = state.isWin()
+        self.lost = state.isLose()
+        self.deathPosition = self.lost and state.getPacmanPosition() or None
+
+    def __len__(self):
+        return len(self.actions)
+
+    def stateAt(self, move):
+        if move < 0 or move > len(self.actions):
+            raise IndexError('Move %d of a game of %d moves' % (move, len(self.actions)))
+        index, offset = divmod(move, self.checkpointEvery)
+        if self.segment[0] != index:
+            self.segment = (index, self.rebuildSegment(index))
+        return self.segment[1][offset]
+
+    def rebuildSegment(self, index):
+        "The states from checkpoint index to the next checkpoint"
+        state = self.checkpoints[index]
+        states = [state]
+        first = index * self.checkpointEvery
+        explored = GameState.explored
+        GameState.explored = DISCARD_STATES
+        try:
+            for move in range(first, min(first + self.checkpointEvery, len(self.actions) + 1) - 1):
+                state = state.generateSuccessor(*self.actions[move])
+                states.append(state)
+        finally:
+            GameState.explored = explored
+        return states
+
+    def roundScores(self):
+        "The score after each round, in which every agent moves once"
+        return self.scores[::self.numAgents]
+
+    def play(self, display, start=0, end=None, step=1, delay=0.0):
+        """
+        Shows the moves from start to end on display: each move, as the game
+        did, when step is 1; otherwise every step-th state and the last,
+        backwards if step is negative, each drawn afresh with delay seconds
+        between them (on the open window when the display has showState).
+        """
+        if end == None: end = step > 0 and len(self) or 0
+        display.initialize(self.stateAt(start).data)
+        if step == 1:
+            for move in range(start + 1, end + 1):
+                display.update(self.stateAt(move).data)
+        else:
+            moves = range(start + step, end + (step > 0 and 1 or -1), step)
+            if end != start and end not in moves[-1:]: moves.append(end)
+            if 'showState' in dir(display): show = display.showState
+            else: show = display.initialize
+            for move in moves:
+                if delay > 0: time.sleep(delay)
+                show(self.stateAt(move).data)
+        display.finish()
+
+def analyze(paths, every=50):
+    """
+    Prints the length, score and ending of each recorded game, how often
+    pacman died in each cell, and the average score every so many rounds.
+    """
+    deaths = util.Counter()
+    curves = []
+    print '%-32s %6s %7s %6s %7s %7s  %s' % ('Game', 'Moves', 'Score', 'Result', 'Lowest', 'Highest', 'Died at')
+    for path in paths:
+        replay = Replay(*loadRecordedGame(path))
+        result = replay.won and 'Win' or replay.lost and 'Loss' or '-'
+        print '%-32s %6d %7d %6s %7d %7d  %s' % (os.path.basename(path)[-32:], len(replay), replay.scores[-1], result,
+                                                min(replay.scores), max(replay.scores), replay.deathPosition or '')
+        if replay.lost: deaths[replay.deathPosition] += 1
+        curves.append(replay.roundScores())
+    if deaths:
+        print '\nDeaths by cell:'
+        for position in deaths.sortedKeys():
+            print '  %-10s %d' % (position, deaths[position])
+    print '\n%-8s %10s %6s' % ('Round', 'Average', 'Games')
+    for roundNumber in range(0, max(map(len, curves)), every):
+        scores = [curve[roundNumber] for curve in curves if roundNumber < len(curve)]
+        print '%-8d %10.1f %6d' % (roundNumber, sum(scores) / float(len(scores)), len(scores))
+
+def readCommand(argv):
+    parser = optparse.OptionParser(usage='%prog [options] recorded-game ...',
+                                   description='Replay games recorded by pacman.py -r')
+    parser.add_option('--analyze', action='store_true', dest='analyze',
+                      help='Summarise the games without a display', default=False)
+    parser.add_option('--start', dest='start', type='int', default=0,
+                      help='Move to start from [Default: %default]')
+    parser.add_option('--end', dest='end', type='int', default=None,
+                      help='Move to stop at [Default: the last move, or 0 with a negative step]')
+    parser.add_option('--step', dest='step', type='int', default=1,
+                      help='Moves between the states shown; negative to go backwards [Default: %default]')
+    parser.add_option('--checkpoint', dest='checkpoint', type='int', default=CHECKPOINT_EVERY,
+                      help='Moves between kept states [Default: %default]')
+    parser.add_option('-t', '--textGraphics', action='store_true', dest='textGraphics',
+                      help='Display output as text only', default=False)
+    parser.add_option('--ansi', action='store_true', dest='ansiGraphics',
+                      help='Display output as text, redrawing only the changed cells of the terminal', default=False)
+    parser.add_option('-z', '--zoom', type='float', dest='zoom',
+                      help='Zoom the size of the graphics window [Default: %default]', default=1.0)
+    parser.add_option('--frameTime', dest='frameTime', type='float',
+                      help='Time to delay between frames [Default: %default]', default=0.1)
+    options, args = parser.parse_args(argv)
+    if len(args) == 0:
+        parser.error('No recorded game given')
+    if options.step == 0:
+        parser.error('The step cannot be 0')
+    replays = []
+    if not options.analyze:
+        for path in args:
+            replay = Replay(checkpointEvery=options.checkpoint, *loadRecordedGame(path))
+            for option, move in [('--start', options.start), ('--end', options.end)]:
+                if move != None and not 0 <= move <= len(replay):
+                    parser.error('%s %d is not a move of %s, which has moves 0 to %d' %
+                                 (option, move, path, len(replay)))
+            replays.append(replay)
+    return options, args, replays
+
+if __name__ == '__main__':
+    options, paths, replays = readCommand(sys.argv[1:])
+    if options.analyze:
+        analyze(paths)
+        sys.exit(0)
+    if options.textGraphics or options.ansiGraphics:
+        import textDisplay
+        textDisplay.SLEEP_TIME = options.frameTime
+        display = options.ansiGraphics and textDisplay.AnsiGraphics() or textDisplay.PacmanGraphics()
+    else:
+        import graphicsDisplay
+        display = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
+    for replay in replays:
+        replay.play(display, options.start, options.end, options.step, options.frameTime)
@@ -17,7 +17,9 @@ from game import Actions
 from game import Directions
 import random
 from util import manhattanDistance
+from util import nearestPoint
 import util
+import math
 
 class GhostAgent( Agent ):
     def __init__( self, index ):
@@ -79,3 +81,106 @@ class DirectionalGhost( GhostAgent ):
         for a in legalActions: dist[a] += ( 1-bestProb ) / len(legalActions)
         dist.normalize()
         return dist
+
+# The util.MazeDistances of the walls of the game being played, shared by all
+# ghosts.  The walls grid itself is the key: every state of a game shares it.
+MAZE_DISTANCES = [None, None]
+
+def getMazeDistances( walls ):
+    "Returns the (lazily filled) util.MazeDistances of a wall grid."
+    if MAZE_DISTANCES[0] is not walls:
+        MAZE_DISTANCES[:] = [walls, util.MazeDistances( walls )]
+    return MAZE_DISTANCES[1]
+
+def _mazeDistance( mazeDistances, source, pos ):
+    """
+    Maze distance from the integer cell source to pos.  Scared ghosts move at
+    half speed, so pos may lie halfway between two cells; it is then half a
+    step from each of them.
+    """
+    x, y = pos
+    if x == int( x ) and y == int( y ):
+        cells, extra = [( int( x ), int( y ) )], 0
+    else:
+        cells, extra = [( int( math.floor( x ) ), int( math.floor( y ) ) ), ( int( math.ceil( x ) ), int( math.ceil( y ) ) )], 0.5
+    distances = [mazeDistances.getDistance( source, c ) for c in cells]
+    return min( [d for d in distances if d != None] or [float( 'inf' )] ) + extra
+
+class BatchedDirectionalGhost( DirectionalGhost ):
+    """
+    A DirectionalGhost whose distributions are computed for every ghost at
+    once.  The first ghost to move in a round fills a cache shared by all
+    ghosts with the same parameters; the others read their entry back, as
+    long as their own configuration and Pacman's position are unchanged
+    since the batch was computed (a ghost's distribution depends on nothing
+    else).
+
+    With mazeDistance=True, distances to Pacman are true maze distances
+    taken from the layout's util.MazeDistances instead of Manhattan distances.
+    """
+    _batches = {}
+
+    def __init__( self, index, prob_attack=0.8, prob_scaredFlee=0.8, mazeDistance=False ):
+        DirectionalGhost.__init__( self, index, prob_attack, prob_scaredFlee )
+        self.mazeDistance = mazeDistance
+        self.batchKey = ( prob_attack, prob_scaredFlee, mazeDistance )
+
+    def getDistribution( self, state ):
+        batch = BatchedDirectionalGhost._batches.get( self.batchKey )
+        key = self._entryKey( state, self.index )
+        if batch is None or batch.get( self.index, (None,) )[0] != key:
+            batch = self.getDistributions( state )
+            BatchedDirectionalGhost._batches[self.batchKey] = batch
+        return batch[self.index][1].copy()
+
+    def _entryKey( self, state, index ):
+        ghostState = state.data.agentStates[index]
+        return ( state.data.layout.layoutText, state.getPacmanPosition(), ghostState.configuration, ghostState.scaredTimer )
+
+    def getDistributions( self, state ):
+        """
+        Returns {ghostIndex: (entryKey, distribution)} for every ghost in the
+        state, using this agent's attack and flee probabilities.
+        """
+        pacmanPosition = state.getPacmanPosition()
+        px, py = pacmanPosition
+        if self.mazeDistance:
+            mazeDistances = getMazeDistances( state.getWalls() )
+            source = nearestPoint( pacmanPosition )
+
+        batch = {}
+        for index in range( 1, state.getNumAgents() ):
+            legalActions = state.getLegalActions( index )
+            ghostState = state.data.agentStates[index]
+            x, y = ghostState.configuration.pos
+            isScared = ghostState.scaredTimer > 0
+            vectors = isScared and _SCARED_VECTORS or _VECTORS
+
+            if self.mazeDistance:
+                distancesToPacman = [_mazeDistance( mazeDistances, source, ( x + vectors[a][0], y + vectors[a][1] ) ) for a in legalActions]
+            else:
+                distancesToPacman = [abs( x + vectors[a][0] - px ) + abs( y + vectors[a][1] - py ) for a in legalActions]
+
+            dist = util.Counter()
+            if len( legalActions ) > 0:
+                if isScared:
+                    bestScore = max( distancesToPacman )
+                    bestProb = self.prob_scaredFlee
+                else:
+                    bestScore = min( distancesToPacman )
+                    bestProb = self.prob_attack
+                bestActions = [action for action, distance in zip( legalActions, distancesToPacman ) if distance == bestScore]
+
+                for a in bestActions: dist[a] = bestProb / len(bestActions)
+                for a in legalActions: dist[a] += ( 1-bestProb ) / len(legalActions)
+                dist.normalize()
+            batch[index] = ( self._entryKey( state, index ), dist )
+        return batch
+
+class MazeDistanceGhost( BatchedDirectionalGhost ):
+    "A batched DirectionalGhost that rushes (or flees) Pacman by maze distance."
+    def __init__( self, index, prob_attack=0.8, prob_scaredFlee=0.8 ):
+        BatchedDirectionalGhost.__init__( self, index, prob_attack, prob_scaredFlee, mazeDistance=True )
+
+_VECTORS = dict( [( a, Actions.directionToVector( a, 1 ) ) for a in Actions._directions] )
+_SCARED_VECTORS = dict( [( a, Actions.directionToVector( a, 0.5 ) ) for a in Actions._directions] )
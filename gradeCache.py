@@ -0,0 +1,272 @@
+# gradeCache.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Incremental grading: reuse the result of a question when nothing it
+depends on has changed since the last run.
+
+While a question is graded, every student function it calls is recorded.
+Its result is stored together with fingerprints of
+  - the question's fixture files (CONFIG, .test and .solution files),
+  - the grading framework (all non-student modules of the code directory),
+  - the bytecode, constants and defaults of each student function it called
+    (line numbers are ignored, so moving code around does not count), and
+  - the structure of each student module it used: its top-level names,
+    class attributes and simple constants such as REVERSE_PUSH.
+If all of these match on the next run, the stored points, messages and
+output are reused instead of grading the question again.
+"""
+
+import cProfile
+import hashlib
+import json
+import os
+import sys
+import types
+
+# The tracker of the question being graded, if any.  Test processes started
+# by grading.ParallelTestRunner inherit it and report what they called.
+ACTIVE_TRACKER = None
+
+FUNCTION_TYPES = (types.FunctionType, types.MethodType)
+CLASS_TYPES = (types.ClassType, type)
+SIMPLE_TYPES = (int, long, float, bool, str, unicode, type(None))
+
+def stableRepr(value):
+    "A repr which does not depend on object addresses"
+    if isinstance(value, SIMPLE_TYPES):
+        return repr(value)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        return '%s(%s)' % (type(value).__name__, ', '.join([stableRepr(v) for v in value]))
+    if isinstance(value, dict):
+        items = sorted([(stableRepr(k), stableRepr(v)) for k, v in value.items()])
+        return '{%s}' % ', '.join(['%s: %s' % item for item in items])
+    if isinstance(value, FUNCTION_TYPES + CLASS_TYPES + (types.ModuleType,)):
+        return '<%s %s>' % (type(value).__name__, getattr(value, '__name__', '?'))
+    return '<%s>' % type(value).__name__
+
+def hashCode(code, digest):
+    "Adds everything but the line numbers of a code object to digest"
+    digest.update(code.co_code)
+    digest.update(repr((code.co_names, code.co_varnames, code.co_freevars,
+                        code.co_cellvars, code.co_argcount, code.co_flags)))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            hashCode(const, digest)
+        else:
+            digest.update(stableRepr(const))
+
+def hashFiles(paths):
+    digest = hashlib.sha1()
+    for path in sorted(paths):
+        digest.update(path)
+        with open(path, 'rb') as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()
+
+class CodeIndex:
+    """
+    Maps the code objects of the functions and methods defined in the
+    student modules to stable names ("search.breadthFirstSearch") and
+    fingerprints of their definitions.
+    """
+    def __init__(self, modules):
+        self.keys = {}        # code object -> function name
+        self.digests = {}     # function name -> fingerprint
+        self.moduleDigests = {} # module name -> structure fingerprint
+        for module in modules:
+            self.indexModule(module)
+
+    def indexModule(self, module):
+        structure = []
+        for name, value in sorted(vars(module).items()):
+            if name.startswith('__') or isinstance(value, types.ModuleType):
+                continue
+            if isinstance(value, FUNCTION_TYPES) and value.__module__ == module.__name__:
+                self.indexFunction('%s.%s' % (module.__name__, name), value)
+            elif isinstance(value, CLASS_TYPES) and value.__module__ == module.__name__:
+                attributes = []
+                for attribute, member in sorted(vars(value).items()):
+                    if isinstance(member, (staticmethod, classmethod)):
+                        member = member.__get__(None, value)
+                    if isinstance(member, FUNCTION_TYPES):
+                        self.indexFunction('%s.%s.%s' % (module.__name__, name, attribute), member)
+                    attributes.append((attribute, stableRepr(member)))
+                structure.append((name, [base.__name__ for base in value.__bases__], attributes))
+                continue
+            structure.append((name, stableRepr(value)))
+        self.moduleDigests[module.__name__] = hashlib.sha1(repr(structure)).hexdigest()
+
+    def indexFunction(self, key, function):
+        function = getattr(function, 'im_func', function)
+        code = function.func_code
+        if code in self.keys: return # An alias of a function already indexed
+        digest = hashlib.sha1()
+        hashCode(code, digest)
+        digest.update(stableRepr(function.func_defaults))
+        self.digests[key] = digest.hexdigest()
+        self.registerCode(code, key)
+
+    def registerCode(self, code, key):
+        "Nested functions and lambdas are covered by their enclosing function"
+        self.keys[code] = key
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                self.registerCode(const, key)
+
+class DependencyTracker:
+    """
+    Records which student functions are called between start() and stop().
+    Calls are counted by cProfile, whose C implementation costs far less
+    than a Python trace function.
+    """
+    def __init__(self, index):
+        self.index = index
+        self.called = set()
+        self.complete = True # False if some calls may have gone unrecorded
+        self.profiler = None
+
+    def start(self):
+        global ACTIVE_TRACKER
+        if self.profiler != None and sys.getprofile() is self.profiler:
+            self.profiler.disable() # Restarted in a test process
+        self.called = set()
+        self.complete = sys.getprofile() == None
+        self.profiler = cProfile.Profile(builtins=False)
+        ACTIVE_TRACKER = self
+        self.profiler.enable()
+
+    def collect(self):
+        "Adds the student functions called so far to self.called"
+        if sys.getprofile() is not self.profiler:
+            # Someone else installed a profiler and replaced ours
+            self.complete = False
+        for entry in self.profiler.getstats():
+            key = self.index.keys.get(entry.code)
+            if key != None: self.called.add(key)
+
+    def stop(self):
+        global ACTIVE_TRACKER
+        self.collect()
+        self.profiler.disable()
+        ACTIVE_TRACKER = None
+
+class OutputRecorder:
+    "Passes writes through to a stream and keeps a copy"
+    def __init__(self, stream):
+        self.stream = stream
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+        self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+class ResultStore:
+    """
+    A local store of question results, kept as JSON in path.  Used by
+    grading.Grades.grade: restore() replays a still valid result, begin()
+    and end() record a new one.
+    """
+    def __init__(self, path, studentModules, testRoot, codeRoot="", settings=(), force=False):
+        self.path = path
+        self.testRoot = testRoot
+        self.force = force
+        self.index = CodeIndex(studentModules)
+        self.tracker = DependencyTracker(self.index)
+        self.output = None
+        self.results = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as handle:
+                    self.results = json.load(handle)
+            except ValueError:
+                self.results = {}
+        studentFiles = set([self.sourceFile(m) for m in studentModules])
+        self.frameworkDigest = hashlib.sha1(repr(tuple(settings)) + hashFiles(
+            self.frameworkFiles(codeRoot, studentFiles) + [os.path.join(testRoot, 'CONFIG')])).hexdigest()
+
+    def sourceFile(self, module):
+        path = os.path.abspath(getattr(module, '__file__', '') or '')
+        if path.endswith('.pyc') or path.endswith('.pyo'): path = path[:-1]
+        return path
+
+    def frameworkFiles(self, codeRoot, studentFiles):
+        "Sources of the loaded, non-student modules in the code directory"
+        root = os.path.abspath(codeRoot or '.')
+        files = set()
+        for module in sys.modules.values():
+            if module == None: continue
+            path = self.sourceFile(module)
+            if os.path.dirname(path) == root and path not in studentFiles and os.path.exists(path):
+                files.add(path)
+        return list(files)
+
+    def fingerprint(self, question):
+        directory = os.path.join(self.testRoot, question)
+        fixtures = [os.path.join(directory, f) for f in os.listdir(directory)
+                    if os.path.isfile(os.path.join(directory, f)) and not f.endswith('.test_output')]
+        return self.frameworkDigest + ':' + hashFiles(fixtures)
+
+    def restore(self, grades, question):
+        "Replays the stored result of question if it is still valid"
+        entry = self.results.get(question)
+        if self.force or entry == None or entry['fingerprint'] != self.fingerprint(question):
+            return False
+        for module, digest in entry['modules'].items():
+            if self.index.moduleDigests.get(module) != digest: return False
+        for function, digest in entry['functions'].items():
+            if self.index.digests.get(function) != digest: return False
+        sys.stdout.write(entry['output'])
+        grades.points[question] = entry['points']
+        grades.messages[question] = list(entry['messages'])
+        if not entry['sane']: grades.sane = False
+        print '*** Reused the result of the last run: question %s and the code it uses are unchanged' % question
+        return True
+
+    def begin(self):
+        self.tracker.start()
+        self.output = OutputRecorder(sys.stdout)
+        sys.stdout = self.output
+
+    def end(self, grades, question, sane, timedOut):
+        "Records the result of question; timed-out questions are not stored"
+        self.tracker.stop()
+        sys.stdout = self.output.stream
+        if timedOut or not self.tracker.complete:
+            self.results.pop(question, None)
+        else:
+            called = sorted(self.tracker.called)
+            modules = set([key.split('.')[0] for key in called])
+            self.results[question] = {
+                'fingerprint': self.fingerprint(question),
+                'modules': dict([(m, self.index.moduleDigests[m]) for m in modules]),
+                'functions': dict([(key, self.index.digests[key]) for key in called]),
+                'points': grades.points[question],
+                'messages': grades.messages[question],
+                'sane': sane,
+                'output': ''.join(self.output.parts)}
+        self.output = None
+        self.save()
+
+    def save(self):
+        temporary = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            with open(temporary, 'w') as handle:
+                json.dump(self.results, handle)
+            os.rename(temporary, self.path)
+        except (IOError, OSError):
+            pass
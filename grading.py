@@ -14,10 +14,11 @@
 
 "Common code for autograders"
 
-import cgi
 import time
 import sys
 import json
+import multiprocessing
+import random
 import traceback
 import pdb
 from collections import defaultdict
@@ -51,10 +52,12 @@ class Grades:
   def addPrereq(self, question, prereq):
     self.prereqs[question].add(prereq)
 
-  def grade(self, gradingModule, exceptionMap = {}, bonusPic = False):
+  def grade(self, gradingModule, exceptionMap = {}, bonusPic = False, testRunner = None, resultStore = None):
     """
     Grades each question
       gradingModule: the module with all the grading functions (pass in with sys.modules[__name__])
+      testRunner: the ParallelTestRunner the question's tests were submitted to, if any
+      resultStore: a gradeCache.ResultStore to reuse unchanged questions' results from, if any
     """
 
     completedQuestions = set([])
@@ -71,19 +74,13 @@ class Grades:
 """*** NOTE: Make sure to complete Question %s before working on Question %s,
 *** because Question %s builds upon your answer for Question %s.
 """ % (prereq, q, q, prereq)
+          if testRunner != None: testRunner.cancel(q)
           continue
 
-      if self.mute: util.mutePrint()
-      try:
-        util.TimeoutFunction(getattr(gradingModule, q),1800)(self) # Call the question's function
-        #TimeoutFunction(getattr(gradingModule, q),1200)(self) # Call the question's function
-      except Exception, inst:
-        self.addExceptionMessage(q, inst, traceback)
-        self.addErrorHints(exceptionMap, inst, q[1])
-      except:
-        self.fail('FAIL: Terminated with a string exception.')
-      finally:
-        if self.mute: util.unmutePrint()
+      if resultStore != None and resultStore.restore(self, q):
+        if testRunner != None: testRunner.cancel(q)
+      else:
+        self.gradeQuestion(gradingModule, q, exceptionMap, testRunner, resultStore)
 
       if self.points[q] >= self.maxes[q]:
         completedQuestions.add(q)
@@ -91,6 +88,7 @@ class Grades:
       print '\n### Question %s: %d/%d ###\n' % (q, self.points[q], self.maxes[q])
 
 
+    if testRunner != None: testRunner.shutdown()
     print '\nFinished at %d:%02d:%02d' % time.localtime()[3:6]
     print "\nProvisional grades\n=================="
 
@@ -141,6 +139,30 @@ to follow your instructor's guidelines to receive credit on your project.
     if self.gsOutput:
         self.produceGradeScopeOutput()
 
+  def gradeQuestion(self, gradingModule, q, exceptionMap, testRunner, resultStore):
+    wasSane, self.sane = self.sane, True
+    timedOut = False
+    if resultStore != None:
+      # A question's result must not depend on which earlier questions were
+      # graded and which were restored from the result cache
+      random.seed(q)
+      resultStore.begin()
+    if self.mute: util.mutePrint()
+    try:
+      util.TimeoutFunction(getattr(gradingModule, q),1800)(self) # Call the question's function
+      #TimeoutFunction(getattr(gradingModule, q),1200)(self) # Call the question's function
+    except Exception, inst:
+      timedOut = isinstance(inst, util.TimeoutFunctionException)
+      self.addExceptionMessage(q, inst, traceback)
+      self.addErrorHints(exceptionMap, inst, q[1])
+    except:
+      self.fail('FAIL: Terminated with a string exception.')
+    finally:
+      if self.mute: util.unmutePrint()
+      if testRunner != None: testRunner.cancel(q)
+      if resultStore != None: resultStore.end(self, q, self.sane, timedOut)
+      self.sane = wasSane and self.sane
+
   def addExceptionMessage(self, q, inst, traceback):
     """
     Method to format the exception message, this is more complicated because
@@ -148,7 +170,9 @@ to follow your instructor's guidelines to receive credit on your project.
     """
     self.fail('FAIL: Exception raised: %s' % inst)
     self.addMessage('')
-    for line in traceback.format_exc().split('\n'):
+    # Exceptions replayed from a test process carry the original traceback
+    tracebackText = getattr(inst, 'remoteTraceback', None) or traceback.format_exc()
+    for line in tracebackText.split('\n'):
         self.addMessage(line)
 
   def addErrorHints(self, exceptionMap, errorInstance, questionNum):
@@ -291,6 +315,7 @@ to follow your instructor's guidelines to receive credit on your project.
         if self.mute: util.unmutePrint()
         print '*** ' + message
         if self.mute: util.mutePrint()
+        import cgi
         message = cgi.escape(message)
     self.messages[self.currentQuestion].append(message)
 
@@ -305,6 +330,173 @@ to follow your instructor's guidelines to receive credit on your project.
 
 
 
+class RecordingGrades:
+  """
+  Stands in for a Grades object inside a test process.  Calls which change
+  the grades, and anything the test prints, are recorded in order so that
+  they can be replayed on the real Grades object by the parent process.
+  """
+  def __init__(self):
+    self.events = []
+
+  def write(self, text):
+    self.events.append(('stdout', text))
+
+  def flush(self):
+    pass
+
+  def _record(self, method, *args):
+    self.events.append(('call', method, args))
+
+  def fail(self, message, raw=False): self._record('fail', message, raw)
+  def assignZeroCredit(self): self._record('assignZeroCredit')
+  def addPoints(self, amt): self._record('addPoints', amt)
+  def deductPoints(self, amt): self._record('deductPoints', amt)
+  def assignFullCredit(self, message="", raw=False): self._record('assignFullCredit', message, raw)
+  def addMessage(self, message, raw=False): self._record('addMessage', message, raw)
+  def addMessageToEmail(self, message): self._record('addMessageToEmail', message)
+
+def activeTracker():
+  "The gradeCache.DependencyTracker of the question being graded, if results are being cached"
+  # gradeCache is only imported when the result cache is used
+  if 'gradeCache' not in sys.modules: return None
+  return sys.modules['gradeCache'].ACTIVE_TRACKER
+
+def runRecorded(thunk, connection):
+  "Body of a test process: runs thunk and sends back its events and outcome"
+  grades = RecordingGrades()
+  sys.stdout = grades
+  # The dependency tracker, if one was active, is inherited from the parent;
+  # restart it so that only the calls made by this test are reported
+  tracker = activeTracker()
+  if tracker != None: tracker.start()
+  try:
+    outcome = ('return', thunk(grades))
+  except BaseException, inst:
+    outcome = ('raise', inst, traceback.format_exc())
+  if tracker != None:
+    tracker.stop()
+    grades.events.append(('dependencies', sorted(tracker.called)))
+  try:
+    connection.send((grades.events, outcome))
+  except Exception:
+    # The result or exception could not be pickled
+    if outcome[0] == 'raise':
+      inst = Exception('%s: %s' % (type(outcome[1]).__name__, outcome[1]))
+      connection.send((grades.events, ('raise', inst, outcome[2])))
+    else:
+      connection.send((grades.events, ('return', bool(outcome[1]))))
+  connection.close()
+
+class TestJob:
+  def __init__(self, question, thunk):
+    self.question = question
+    self.thunk = thunk
+    self.process = None
+    self.connection = None
+    self.started = None
+    self.result = None # (events, outcome) once finished
+
+class ParallelTestRunner:
+  """
+  Runs test case thunks in up to `jobs` forked processes.
+
+  submit() returns a thunk which, when the question calls it, waits for the
+  test process and replays the recorded grades calls and output, so points,
+  messages and their order are the same as when grading serially.  Tests run
+  ahead of the question currently being graded; tests of questions which are
+  skipped or have finished are cancelled.  A test which crashes or runs
+  longer than `timeout` seconds fails with an exception, like a test raising
+  one in-process, without affecting the other tests.
+  """
+  def __init__(self, jobs, timeout=1800):
+    self.jobs = jobs
+    self.timeout = timeout
+    self.queued = []
+    self.running = []
+
+  def submit(self, question, thunk):
+    job = TestJob(question, thunk)
+    self.queued.append(job)
+    return lambda grades: self.replay(job, grades)
+
+  def cancel(self, question):
+    "Stops all queued and running tests of a question"
+    for job in self.queued + self.running:
+      if job.question == question:
+        self._finish(job, ([], ('raise', Exception('Test cancelled'), '')))
+
+  def shutdown(self):
+    for job in self.queued + self.running:
+      self._finish(job, ([], ('raise', Exception('Test cancelled'), '')))
+
+  def _start(self, job):
+    parentConnection, childConnection = multiprocessing.Pipe(duplex=False)
+    job.process = multiprocessing.Process(target=runRecorded, args=(job.thunk, childConnection))
+    job.process.daemon = True
+    job.process.start()
+    childConnection.close()
+    job.connection = parentConnection
+    job.started = time.time()
+    self.running.append(job)
+
+  def _finish(self, job, result):
+    job.result = result
+    if job in self.queued: self.queued.remove(job)
+    if job in self.running:
+      self.running.remove(job)
+      if job.process.is_alive(): job.process.terminate()
+      job.process.join()
+      job.connection.close()
+
+  def _poll(self):
+    "Collects finished tests and starts queued ones; returns whether anything happened"
+    changed = False
+    for job in list(self.running):
+      if job.connection.poll():
+        try:
+          result = job.connection.recv()
+        except EOFError:
+          result = ([], ('raise', Exception('Test process crashed (exit code %s)' % job.process.exitcode), ''))
+      elif not job.process.is_alive():
+        if job.connection.poll(): continue # Finished just now; collect next time
+        result = ([], ('raise', Exception('Test process crashed (exit code %s)' % job.process.exitcode), ''))
+      elif time.time() - job.started > self.timeout:
+        result = ([], ('raise', util.TimeoutFunctionException('Test timed out after %s seconds' % self.timeout), ''))
+      else:
+        continue
+      self._finish(job, result)
+      changed = True
+    while len(self.running) < self.jobs and len(self.queued) > 0:
+      self._start(self.queued.pop(0))
+      changed = True
+    return changed
+
+  def replay(self, job, grades):
+    if job in self.queued:
+      # Make sure the test we are waiting for runs next
+      self.queued.remove(job)
+      self.queued.insert(0, job)
+    while job.result == None:
+      if not self._poll(): time.sleep(0.002)
+    events, outcome = job.result
+    tracker = activeTracker()
+    if tracker != None and ('dependencies' not in [event[0] for event in events]):
+      tracker.complete = False
+    for event in events:
+      if event[0] == 'stdout':
+        sys.stdout.write(event[1])
+      elif event[0] == 'dependencies':
+        if tracker != None: tracker.called.update(event[1])
+      else:
+        getattr(grades, event[1])(*event[2])
+    if outcome[0] == 'return':
+      return outcome[1]
+    inst = outcome[1]
+    if outcome[2]: inst.remoteTraceback = outcome[2]
+    raise inst
+
+
 class Counter(dict):
   """
   Dict with default 0
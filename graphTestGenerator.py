@@ -0,0 +1,280 @@
+# graphTestGenerator.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Generates large GraphSearchTest cases for stress testing search code.
+
+Four graph families are available, each with roughly the requested number
+of states:
+  random     a random spanning tree plus two random cross edges per state
+  grid       a square grid with N/S/E/W moves of random cost
+  branching  a 25-ary tree with extra cross edges, for very wide frontiers
+  chain      one long path with a dead end and a back edge at every step
+
+Reference solutions are computed by the built-in searches below, which
+follow the conventions of the bundled solution files: graph search with the
+visited check and the goal test made when a state is popped, successors
+pushed in getSuccessors order (reversed for the rev_ solutions), ties in
+the priority queue broken by insertion order, and A* using half the true
+distance to the goal as a consistent heuristic.
+
+  python graphTestGenerator.py --nodes 100000 --time-limit 30
+  python autograder.py --test-directory stress_test_cases --no-graphics
+"""
+
+import collections
+import heapq
+import math
+import optparse
+import os
+import random
+import sys
+
+ALGORITHMS = [('q1', 'depthFirstSearch'), ('q2', 'breadthFirstSearch'),
+              ('q3', 'uniformCostSearch'), ('q4', 'aStarSearch')]
+
+class Graph:
+    """
+    A search graph: successors maps each state to its list of
+    (next state, action, cost), in the order getSuccessors returns them.
+    """
+    def __init__(self, start, goals, description):
+        self.start = start
+        self.goals = goals
+        self.description = description
+        self.states = []
+        self.successors = {}
+        self._text = None
+
+    def addState(self, state):
+        if state not in self.successors:
+            self.states.append(state)
+            self.successors[state] = []
+
+    def addEdge(self, state, action, nextState, cost):
+        self.addState(state)
+        self.addState(nextState)
+        self.successors[state].append((nextState, action, cost))
+
+    def text(self):
+        if self._text == None:
+            lines = ['start_state: %s' % self.start, 'goal_states: %s' % ' '.join(self.goals)]
+            for state in self.states:
+                for nextState, action, cost in self.successors[state]:
+                    lines.append('%s %s %s %d' % (state, action, nextState, cost))
+            self._text = '\n'.join(lines)
+        return self._text
+
+def randomGraph(n, rng):
+    graph = Graph('n0', ['n%d' % rng.randrange(n * 9 / 10, n)],
+                  'Random graph: a random spanning tree rooted at the start\nplus two random edges per state.')
+    edges = [[] for i in range(n)]
+    for i in range(1, n):
+        edges[rng.randrange(i)].append(i)
+    for i in range(2 * n):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v: edges[u].append(v)
+    for u in range(n):
+        graph.addState('n%d' % u)
+        rng.shuffle(edges[u])
+        for i, v in enumerate(edges[u]):
+            graph.addEdge('n%d' % u, 'a%d' % i, 'n%d' % v, rng.randint(1, 9))
+    return graph
+
+def gridGraph(n, rng):
+    side = max(2, int(math.sqrt(n)))
+    name = lambda r, c: 'r%dc%d' % (r, c)
+    graph = Graph(name(0, 0), [name(side - 1, side - 1)],
+                  '%dx%d grid from one corner to the opposite one;\nmoves N, S, E and W have random costs.' % (side, side))
+    for r in range(side):
+        for c in range(side):
+            graph.addState(name(r, c))
+            for action, dr, dc in [('N', -1, 0), ('S', 1, 0), ('E', 0, 1), ('W', 0, -1)]:
+                if 0 <= r + dr < side and 0 <= c + dc < side:
+                    graph.addEdge(name(r, c), action, name(r + dr, c + dc), rng.randint(1, 5))
+    return graph
+
+def branchingGraph(n, rng, branching=25):
+    graph = Graph('n0', ['n%d' % rng.randrange(n * 9 / 10, n)],
+                  'Complete %d-ary tree with five random cross edges per state.' % branching)
+    for u in range(n):
+        children = range(branching * u + 1, min(branching * u + branching + 1, n))
+        targets = children + [rng.randrange(n) for i in range(5)]
+        graph.addState('n%d' % u)
+        for i, v in enumerate(targets):
+            graph.addEdge('n%d' % u, 'a%d' % i, 'n%d' % v, rng.randint(1, 9))
+    return graph
+
+def chainGraph(n, rng):
+    length = max(2, n / 2)
+    graph = Graph('c0', ['c%d' % (length - 1)],
+                  'Chain of %d states; every state also leads to a dead end\nand back to a random earlier state.' % length)
+    for i in range(length):
+        graph.addState('c%d' % i)
+        edges = [('f', 'c%d' % (i + 1))] if i + 1 < length else []
+        edges += [('d', 'd%d' % i), ('b', 'c%d' % rng.randrange(i + 1))]
+        rng.shuffle(edges)
+        for action, nextState in edges:
+            graph.addEdge('c%d' % i, action, nextState, rng.randint(1, 3))
+    return graph
+
+FAMILIES = collections.OrderedDict([('random', randomGraph), ('grid', gridGraph),
+                                    ('branching', branchingGraph), ('chain', chainGraph)])
+
+def graphHeuristic(graph):
+    """
+    Half the true cost to the nearest goal, found by Dijkstra's algorithm on
+    the reversed graph.  States which cannot reach a goal get the largest
+    value, which keeps the heuristic consistent.
+    """
+    predecessors = collections.defaultdict(list)
+    for state in graph.states:
+        for nextState, action, cost in graph.successors[state]:
+            predecessors[nextState].append((state, cost))
+    distance = {}
+    frontier = [(0, goal) for goal in graph.goals]
+    while frontier:
+        d, state = heapq.heappop(frontier)
+        if state in distance: continue
+        distance[state] = d
+        for previous, cost in predecessors[state]:
+            if previous not in distance:
+                heapq.heappush(frontier, (d + cost, previous))
+    unreachable = max(distance.values()) / 2.0
+    return dict([(state, distance[state] / 2.0 if state in distance else unreachable)
+                 for state in graph.states])
+
+def referenceSearch(graph, algorithm, reverse=False, heuristic=None):
+    """
+    Returns (actions, expanded states).  Search nodes are (state, action,
+    parent, cost) tuples so that paths are shared rather than copied.
+    """
+    goals = set(graph.goals)
+    closed = set()
+    expanded = []
+    if algorithm == 'depthFirstSearch':
+        fringe = []
+        push, pop = fringe.append, fringe.pop
+    elif algorithm == 'breadthFirstSearch':
+        fringe = collections.deque()
+        push, pop = fringe.append, fringe.popleft
+    else:
+        fringe = []
+        h = heuristic or (lambda state: 0)
+        counter = [0]
+        def push(node):
+            heapq.heappush(fringe, (node[3] + h(node[0]), counter[0], node))
+            counter[0] += 1
+        pop = lambda: heapq.heappop(fringe)[2]
+
+    push((graph.start, None, None, 0))
+    while fringe:
+        node = pop()
+        state = node[0]
+        if state in goals:
+            actions = []
+            while node[2] != None:
+                actions.append(node[1])
+                node = node[2]
+            actions.reverse()
+            return actions, expanded
+        if state in closed: continue
+        closed.add(state)
+        expanded.append(state)
+        successors = graph.successors[state]
+        if reverse: successors = reversed(successors)
+        for nextState, action, stepCost in successors:
+            if nextState not in closed:
+                push((nextState, action, node, node[3] + stepCost))
+    return [], expanded
+
+def writeTest(directory, name, graph, algorithm, heuristic, exactOrder, timeLimit):
+    testPath = os.path.join(directory, name + '.test')
+    with open(testPath, 'w') as handle:
+        handle.write('class: "GraphSearchTest"\n')
+        handle.write('algorithm: "%s"\n' % algorithm)
+        handle.write('exactExpansionOrder: "%s"\n' % exactOrder)
+        if timeLimit != None:
+            handle.write('timeLimit: "%s"\n' % timeLimit)
+        handle.write('\ndiagram: """\n%s\n%d states, generated by graphTestGenerator.py.\n"""\n' %
+                     (graph.description, len(graph.states)))
+        if heuristic != None:
+            handle.write('heuristic: """\n%s\n"""\n' %
+                         '\n'.join(['%s %r' % (s, heuristic[s]) for s in graph.states]))
+        handle.write('graph: """\n%s\n"""\n' % graph.text())
+
+    h = heuristic and heuristic.__getitem__
+    solutionPath = os.path.join(directory, name + '.solution')
+    with open(solutionPath, 'w') as handle:
+        handle.write('# This is the solution file for %s.\n' % testPath)
+        handle.write('# This solution is designed to support both right-to-left\n')
+        handle.write('# and left-to-right implementations.\n')
+        for prefix, reverse in [('', False), ('rev_', True)]:
+            actions, expanded = referenceSearch(graph, algorithm, reverse, h)
+            handle.write('%ssolution: "%s"\n' % (prefix, ' '.join(actions)))
+            handle.write('%sexpanded_states: "%s"\n' % (prefix, ' '.join(expanded)))
+
+def writeQuestionConfig(directory, questions):
+    if not os.path.isdir(directory): os.makedirs(directory)
+    with open(os.path.join(directory, 'CONFIG'), 'w') as handle:
+        handle.write('order: "%s"\n' % ' '.join(questions))
+    for question in questions:
+        questionDirectory = os.path.join(directory, question)
+        if not os.path.isdir(questionDirectory): os.makedirs(questionDirectory)
+        with open(os.path.join(questionDirectory, 'CONFIG'), 'w') as handle:
+            handle.write('max_points: "3"\nclass: "PassAllTestsQuestion"\n')
+
+def generate(outputDirectory, nodes, families, algorithms, seed, exactOrder, timeLimit):
+    questions = [q for q, algorithm in ALGORITHMS if algorithm in algorithms]
+    writeQuestionConfig(outputDirectory, questions)
+    for family in families:
+        graph = FAMILIES[family](nodes, random.Random('%s-%s-%d' % (seed, family, nodes)))
+        heuristic = None
+        for question, algorithm in ALGORITHMS:
+            if algorithm not in algorithms: continue
+            if algorithm == 'aStarSearch' and heuristic == None:
+                heuristic = graphHeuristic(graph)
+            name = 'graph_%s_%d' % (family, nodes)
+            print 'Writing %s/%s/%s' % (outputDirectory, question, name)
+            sys.stdout.flush()
+            writeTest(os.path.join(outputDirectory, question), name, graph, algorithm,
+                      algorithm == 'aStarSearch' and heuristic or None, exactOrder, timeLimit)
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Generate large GraphSearchTest cases')
+    parser.add_option('-o', '--output-dir', dest='outputDir', default='stress_test_cases',
+                      help='Test directory to write [Default: %default]')
+    parser.add_option('-n', '--nodes', dest='nodes', type='int', default=10000,
+                      help='Approximate number of states per graph [Default: %default]')
+    parser.add_option('-f', '--families', dest='families', default=','.join(FAMILIES),
+                      help='Comma separated graph families [Default: %default]')
+    parser.add_option('-a', '--algorithms', dest='algorithms', default=','.join([a for q, a in ALGORITHMS]),
+                      help='Comma separated search functions to test [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', default='0',
+                      help='Random seed [Default: %default]')
+    parser.add_option('-t', '--time-limit', dest='timeLimit', type='float', default=None,
+                      help='Seconds each student search may take')
+    parser.add_option('--any-order', dest='exactOrder', action='store_false', default=True,
+                      help='Only check solutions, not the order states are expanded in')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    for family in options.families.split(','):
+        if family not in FAMILIES: raise Exception('Unknown graph family: ' + family)
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    generate(options.outputDir, options.nodes, options.families.split(','),
+             options.algorithms.split(','), options.seed, options.exactOrder, options.timeLimit)
@@ -79,6 +79,83 @@ CAPSULE_SIZE = 0.25
 # Drawing walls
 WALL_RADIUS = 0.15
 
+# Wall shapes, and wall images (base64 GIF data), of each layout drawn so far:
+# (wallMatrix.packBits(), gridSize, capture) -> shapes or image data
+WALL_SHAPES = {}
+WALL_IMAGES = {}
+
+# Expanded cells overlay: shades of the heat map, and the least time in
+# seconds between redraws while cells are added by addExpandedCells
+EXPANDED_SHADES = 16
+EXPANDED_REDRAW_INTERVAL = 0.1
+
+# Batched frames: rounds dropped in a row at most, before one is drawn anyway
+MAX_DROPPED_IN_A_ROW = 5
+
+def mergedRectangles(cells):
+    """
+    Covers grid cells with few rectangles: runs of cells along each row,
+    stacked with the same runs in the rows above.  Returns the rectangles
+    as (x0, y0, x1, y1), the cells at the corners.
+    """
+    rows = {}
+    for x, y in cells:
+        rows.setdefault(y, []).append(x)
+    rectangles = []
+    growing = {}  # (x0, x1) -> y0 of the rectangles reaching the last row
+    lastRow = None
+    for y in sorted(rows):
+        if lastRow != y - 1:
+            rectangles += [(x0, y0, x1, lastRow) for (x0, x1), y0 in growing.items()]
+            growing = {}
+        xs = sorted(rows[y])
+        runs = []
+        first = xs[0]
+        for previous, x in zip(xs, xs[1:]):
+            if x != previous + 1:
+                runs.append((first, previous))
+                first = x
+        runs.append((first, xs[-1]))
+        stillGrowing = {}
+        for run in runs:
+            stillGrowing[run] = growing.pop(run, y)
+        rectangles += [(x0, y0, x1, lastRow) for (x0, x1), y0 in growing.items()]
+        growing = stillGrowing
+        lastRow = y
+    rectangles += [(x0, y0, x1, lastRow) for (x0, x1), y0 in growing.items()]
+    return rectangles
+
+class StreamedSearchProblem:
+    """
+    Wraps a search problem so that the display shows the states it expands
+    as the search runs, e.g.
+
+      problem = StreamedSearchProblem(PositionSearchProblem(state), __main__._display)
+      actions = search.bfs(problem)
+      problem.finish()
+
+    cellOf gives the grid position of a state; by default, the state itself.
+    Displays without an expanded cells overlay (e.g. text ones) show nothing.
+    """
+    def __init__(self, problem, display, cellOf=None):
+        self.problem = problem
+        self.display = display
+        self.cellOf = cellOf or (lambda state: state)
+        self.cells = []
+
+    def __getattr__(self, name):
+        return getattr(self.problem, name)
+
+    def getSuccessors(self, state):
+        cell = self.cellOf(state)
+        self.cells.append(cell)
+        if 'addExpandedCells' in dir(self.display): self.display.addExpandedCells([cell])
+        return self.problem.getSuccessors(state)
+
+    def finish(self):
+        "Draws the overlay of every expanded state"
+        if 'drawExpandedCells' in dir(self.display): self.display.drawExpandedCells(self.cells)
+
 class InfoPane:
     def __init__(self, layout, gridSize):
         self.gridSize = gridSize
@@ -153,7 +230,20 @@ class InfoPane:
 
 
 class PacmanGraphics:
-    def __init__(self, zoom=1.0, frameTime=0.0, capture=False):
+    """
+    Animates a game on a Tk canvas.  By default every agent move is drawn
+    (and pacman's animated) as it happens.  With batchFrames, moves are
+    collected and the whole round drawn as one canvas update once every
+    agent has moved.  With a target fps as well, round k is shown at time
+    k / fps; a round which ends more than a frame budget (1 / fps seconds)
+    behind that clock is not drawn, up to MAX_DROPPED_IN_A_ROW in a row.
+    drawnFrames and droppedFrames count the outcomes.
+
+    The walls of each layout are worked out once and kept in WALL_SHAPES.
+    With wallImage, they are drawn as a single image instead of an item per
+    arc and line, rendered once per layout and kept in WALL_IMAGES.
+    """
+    def __init__(self, zoom=1.0, frameTime=0.0, capture=False, batchFrames=False, fps=0, wallImage=False):
         self.have_window = 0
         self.currentGhostImages = {}
         self.pacmanImage = None
@@ -161,6 +251,14 @@ class PacmanGraphics:
         self.gridSize = DEFAULT_GRID_SIZE * zoom
         self.capture = capture
         self.frameTime = frameTime
+        self.batchFrames = batchFrames or fps > 0
+        self.frameBudget = fps > 0 and 1.0 / fps or 0.0
+        self.drawnFrames = 0
+        self.droppedFrames = 0
+        self.wallImage = wallImage
+        self.expandedCells = []
+        self.expandedList = []
+        self.expandedDrawTime = 0.0
 
     def checkNullDisplay(self):
         return False
@@ -176,6 +274,17 @@ class PacmanGraphics:
 
         # Information
         self.previousState = state
+        self.resetFrames()
+
+    def resetFrames(self):
+        "Starts the clock of batched frames and empties the pending round"
+        self.pendingAgents = {}
+        self.pendingFood = []
+        self.pendingCapsules = []
+        self.pendingInfo = None
+        self.roundNumber = 0
+        self.droppedInARow = 0
+        self.clockStart = time.time()
 
     def startGraphics(self, state):
         self.layout = state.layout
@@ -200,6 +309,7 @@ class PacmanGraphics:
                                 filled = 1, behind=2)
                 distx.append(block)
         self.distributionImages = dist
+        self.distributionColors = {} # (x, y) -> colour of the cells not BACKGROUND_COLOR
 
     def drawStaticObjects(self, state):
         layout = self.layout
@@ -233,7 +343,33 @@ class PacmanGraphics:
             self.agentImages[agentIndex] = (newState, image )
         refresh()
 
+    def showState(self, state):
+        """
+        Draws state on the open window, in place of whatever was shown: the
+        walls stay, the food, capsules and agents are drawn afresh.  Used to
+        jump between states that are not one move apart (e.g. a replay seek).
+        """
+        begin_batch()
+        try:
+            for agentState, image in self.agentImages:
+                for item in image: remove_from_screen(item)
+            for row in self.food:
+                for dot in row:
+                    if dot != None: remove_from_screen(dot)
+            for dot in self.capsules.values(): remove_from_screen(dot)
+            self.food = self.drawFood(state.food)
+            self.capsules = self.drawCapsules(state.capsules)
+            self.drawAgentObjects(state)
+            self.infoPane.updateScore(state.score)
+            self.previousState = state
+            self.resetFrames()
+        finally:
+            end_batch()
+
     def update(self, newState):
+        if self.batchFrames:
+            self.queueUpdate(newState)
+            return
         agentIndex = newState._agentMoved
         agentState = newState.agentStates[agentIndex]
 
@@ -253,12 +389,78 @@ class PacmanGraphics:
         if 'ghostDistances' in dir(newState):
             self.infoPane.updateGhostDistances(newState.ghostDistances)
 
-    def make_window(self, width, height):
+    def queueUpdate(self, newState):
+        "Records a move for the next batched frame; the last agent's move ends the round"
+        agentIndex = newState._agentMoved
+        self.pendingAgents[agentIndex] = newState.agentStates[agentIndex]
+        if newState._foodEaten != None:
+            self.pendingFood.append(newState._foodEaten)
+        if newState._capsuleEaten != None:
+            self.pendingCapsules.append(newState._capsuleEaten)
+        self.pendingInfo = newState
+        if agentIndex == len(newState.agentStates) - 1:
+            self.endRound()
+
+    def endRound(self):
+        self.roundNumber += 1
+        if self.frameBudget > 0:
+            due = self.clockStart + self.roundNumber * self.frameBudget
+            lag = time.time() - due
+            if lag < 0:
+                sleep(-lag)
+            elif lag > self.frameBudget and self.droppedInARow < MAX_DROPPED_IN_A_ROW:
+                self.droppedFrames += 1
+                self.droppedInARow += 1
+                return
+        self.drawFrame()
+        if self.frameBudget > 0 and self.droppedInARow == MAX_DROPPED_IN_A_ROW:
+            # Dropping frames did not catch up: follow the game from here on
+            self.clockStart = time.time() - self.roundNumber * self.frameBudget
+        self.droppedInARow = 0
+
+    def drawFrame(self):
+        "Draws every pending change as a single canvas update"
+        begin_batch()
+        try:
+            for agentIndex, agentState in sorted(self.pendingAgents.items()):
+                if self.agentImages[agentIndex][0].isPacman != agentState.isPacman:
+                    self.swapImages(agentIndex, agentState)
+                prevState, image = self.agentImages[agentIndex]
+                if agentState.isPacman:
+                    self.movePacman(self.getPosition(agentState), self.getDirection(agentState), image)
+                else:
+                    self.moveGhost(agentState, agentIndex, prevState, image)
+                self.agentImages[agentIndex] = (agentState, image)
+            for cell in self.pendingFood:
+                self.removeFood(cell, self.food)
+            for cell in self.pendingCapsules:
+                self.removeCapsule(cell, self.capsules)
+            if self.pendingInfo != None:
+                self.infoPane.updateScore(self.pendingInfo.score)
+                if 'ghostDistances' in dir(self.pendingInfo):
+                    self.infoPane.updateGhostDistances(self.pendingInfo.ghostDistances)
+        finally:
+            end_batch()
+        self.pendingAgents = {}
+        self.pendingFood = []
+        self.pendingCapsules = []
+        self.pendingInfo = None
+        self.drawnFrames += 1
+
+    def getFrameStats(self):
+        return {'frameBudget': self.frameBudget, 'drawnFrames': self.drawnFrames,
+                'droppedFrames': self.droppedFrames}
+
+    def windowSize(self, width, height):
+        "Pixel size of the window for a layout of width x height cells"
         grid_width = (width-1) * self.gridSize
         grid_height = (height-1) * self.gridSize
         screen_width = 2*self.gridSize + grid_width
         screen_height = 2*self.gridSize + grid_height + INFO_PANE_HEIGHT
+        return screen_width, screen_height
 
+    def make_window(self, width, height):
+        screen_width, screen_height = self.windowSize(width, height)
         begin_graphics(screen_width,
                        screen_height,
                        BACKGROUND_COLOR,
@@ -411,6 +613,12 @@ class PacmanGraphics:
         return agentState.configuration.getDirection()
 
     def finish(self):
+        if self.batchFrames:
+            # Show the end of the game, even if its round was cut short
+            if self.pendingAgents or self.pendingInfo != None: self.drawFrame()
+            if self.frameBudget > 0:
+                print 'Frames: %d drawn, %d dropped, budget %.1f ms' % \
+                      (self.drawnFrames, self.droppedFrames, 1000 * self.frameBudget)
         end_graphics()
 
     def to_screen(self, point):
@@ -429,6 +637,22 @@ class PacmanGraphics:
         return ( x, y )
 
     def drawWalls(self, wallMatrix):
+        key = (wallMatrix.packBits(), self.gridSize, self.capture)
+        shapes = WALL_SHAPES.get(key)
+        if shapes == None:
+            shapes = WALL_SHAPES[key] = self.computeWallShapes(wallMatrix)
+        if not self.wallImage:
+            draw_shapes(shapes)
+            return
+        if key not in WALL_IMAGES:
+            import offscreenDisplay
+            width, height = self.windowSize(wallMatrix.width, wallMatrix.height)
+            WALL_IMAGES[key] = offscreenDisplay.shapesToGif(width, height, shapes, BACKGROUND_COLOR)
+        image_from_data((0, 0), WALL_IMAGES[key])
+
+    def computeWallShapes(self, wallMatrix):
+        "The arcs and lines of the walls, as shapes for draw_shapes"
+        shapes = []
         wallColor = WALL_COLOR
         for xNum, x in enumerate(wallMatrix):
             if self.capture and (xNum * 2) < wallMatrix.width: wallColor = TEAM_COLORS[0]
@@ -453,66 +677,67 @@ class PacmanGraphics:
                     # NE quadrant
                     if (not nIsWall) and (not eIsWall):
                         # inner circle
-                        circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (0,91), 'arc')
+                        shapes.append(circle_shape(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (0,91), 'arc'))
                     if (nIsWall) and (not eIsWall):
                         # vertical line
-                        line(add(screen, (self.gridSize*WALL_RADIUS, 0)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(-0.5)-1)), wallColor)
+                        shapes.append(line_shape(add(screen, (self.gridSize*WALL_RADIUS, 0)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(-0.5)-1)), wallColor))
                     if (not nIsWall) and (eIsWall):
                         # horizontal line
-                        line(add(screen, (0, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5+1, self.gridSize*(-1)*WALL_RADIUS)), wallColor)
+                        shapes.append(line_shape(add(screen, (0, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5+1, self.gridSize*(-1)*WALL_RADIUS)), wallColor))
                     if (nIsWall) and (eIsWall) and (not neIsWall):
                         # outer circle
-                        circle(add(screen2, (self.gridSize*2*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (180,271), 'arc')
-                        line(add(screen, (self.gridSize*2*WALL_RADIUS-1, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5+1, self.gridSize*(-1)*WALL_RADIUS)), wallColor)
-                        line(add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS+1)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(-0.5))), wallColor)
+                        shapes.append(circle_shape(add(screen2, (self.gridSize*2*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (180,271), 'arc'))
+                        shapes.append(line_shape(add(screen, (self.gridSize*2*WALL_RADIUS-1, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5+1, self.gridSize*(-1)*WALL_RADIUS)), wallColor))
+                        shapes.append(line_shape(add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS+1)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(-0.5))), wallColor))
 
                     # NW quadrant
                     if (not nIsWall) and (not wIsWall):
                         # inner circle
-                        circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (90,181), 'arc')
+                        shapes.append(circle_shape(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (90,181), 'arc'))
                     if (nIsWall) and (not wIsWall):
                         # vertical line
-                        line(add(screen, (self.gridSize*(-1)*WALL_RADIUS, 0)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(-0.5)-1)), wallColor)
+                        shapes.append(line_shape(add(screen, (self.gridSize*(-1)*WALL_RADIUS, 0)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(-0.5)-1)), wallColor))
                     if (not nIsWall) and (wIsWall):
                         # horizontal line
-                        line(add(screen, (0, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5)-1, self.gridSize*(-1)*WALL_RADIUS)), wallColor)
+                        shapes.append(line_shape(add(screen, (0, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5)-1, self.gridSize*(-1)*WALL_RADIUS)), wallColor))
                     if (nIsWall) and (wIsWall) and (not nwIsWall):
                         # outer circle
-                        circle(add(screen2, (self.gridSize*(-2)*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (270,361), 'arc')
-                        line(add(screen, (self.gridSize*(-2)*WALL_RADIUS+1, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5), self.gridSize*(-1)*WALL_RADIUS)), wallColor)
-                        line(add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS+1)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(-0.5))), wallColor)
+                        shapes.append(circle_shape(add(screen2, (self.gridSize*(-2)*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (270,361), 'arc'))
+                        shapes.append(line_shape(add(screen, (self.gridSize*(-2)*WALL_RADIUS+1, self.gridSize*(-1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5), self.gridSize*(-1)*WALL_RADIUS)), wallColor))
+                        shapes.append(line_shape(add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(-2)*WALL_RADIUS+1)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(-0.5))), wallColor))
 
                     # SE quadrant
                     if (not sIsWall) and (not eIsWall):
                         # inner circle
-                        circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (270,361), 'arc')
+                        shapes.append(circle_shape(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (270,361), 'arc'))
                     if (sIsWall) and (not eIsWall):
                         # vertical line
-                        line(add(screen, (self.gridSize*WALL_RADIUS, 0)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(0.5)+1)), wallColor)
+                        shapes.append(line_shape(add(screen, (self.gridSize*WALL_RADIUS, 0)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(0.5)+1)), wallColor))
                     if (not sIsWall) and (eIsWall):
                         # horizontal line
-                        line(add(screen, (0, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5+1, self.gridSize*(1)*WALL_RADIUS)), wallColor)
+                        shapes.append(line_shape(add(screen, (0, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5+1, self.gridSize*(1)*WALL_RADIUS)), wallColor))
                     if (sIsWall) and (eIsWall) and (not seIsWall):
                         # outer circle
-                        circle(add(screen2, (self.gridSize*2*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (90,181), 'arc')
-                        line(add(screen, (self.gridSize*2*WALL_RADIUS-1, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5, self.gridSize*(1)*WALL_RADIUS)), wallColor)
-                        line(add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS-1)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(0.5))), wallColor)
+                        shapes.append(circle_shape(add(screen2, (self.gridSize*2*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (90,181), 'arc'))
+                        shapes.append(line_shape(add(screen, (self.gridSize*2*WALL_RADIUS-1, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*0.5, self.gridSize*(1)*WALL_RADIUS)), wallColor))
+                        shapes.append(line_shape(add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS-1)), add(screen, (self.gridSize*WALL_RADIUS, self.gridSize*(0.5))), wallColor))
 
                     # SW quadrant
                     if (not sIsWall) and (not wIsWall):
                         # inner circle
-                        circle(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (180,271), 'arc')
+                        shapes.append(circle_shape(screen2, WALL_RADIUS * self.gridSize, wallColor, wallColor, (180,271), 'arc'))
                     if (sIsWall) and (not wIsWall):
                         # vertical line
-                        line(add(screen, (self.gridSize*(-1)*WALL_RADIUS, 0)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(0.5)+1)), wallColor)
+                        shapes.append(line_shape(add(screen, (self.gridSize*(-1)*WALL_RADIUS, 0)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(0.5)+1)), wallColor))
                     if (not sIsWall) and (wIsWall):
                         # horizontal line
-                        line(add(screen, (0, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5)-1, self.gridSize*(1)*WALL_RADIUS)), wallColor)
+                        shapes.append(line_shape(add(screen, (0, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5)-1, self.gridSize*(1)*WALL_RADIUS)), wallColor))
                     if (sIsWall) and (wIsWall) and (not swIsWall):
                         # outer circle
-                        circle(add(screen2, (self.gridSize*(-2)*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (0,91), 'arc')
-                        line(add(screen, (self.gridSize*(-2)*WALL_RADIUS+1, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5), self.gridSize*(1)*WALL_RADIUS)), wallColor)
-                        line(add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS-1)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(0.5))), wallColor)
+                        shapes.append(circle_shape(add(screen2, (self.gridSize*(-2)*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS)), WALL_RADIUS * self.gridSize-1, wallColor, wallColor, (0,91), 'arc'))
+                        shapes.append(line_shape(add(screen, (self.gridSize*(-2)*WALL_RADIUS+1, self.gridSize*(1)*WALL_RADIUS)), add(screen, (self.gridSize*(-0.5), self.gridSize*(1)*WALL_RADIUS)), wallColor))
+                        shapes.append(line_shape(add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(2)*WALL_RADIUS-1)), add(screen, (self.gridSize*(-1)*WALL_RADIUS, self.gridSize*(0.5))), wallColor))
+        return shapes
 
     def isWall(self, x, y, walls):
         if x < 0 or y < 0:
@@ -565,52 +790,99 @@ class PacmanGraphics:
         """
         Draws an overlay of expanded grid positions for search agents
         """
-        n = float(len(cells))
-        baseColor = [1.0, 0.0, 0.0]
+        self.expandedList = list(cells)
+        self.redrawExpandedCells()
+
+    def addExpandedCells(self, cells):
+        """
+        Adds cells to the overlay while a search is still expanding them.
+        The overlay is redrawn at most every EXPANDED_REDRAW_INTERVAL seconds;
+        drawExpandedCells with every cell draws the final overlay.
+        """
+        self.expandedList.extend(cells)
+        if time.time() - self.expandedDrawTime >= EXPANDED_REDRAW_INTERVAL:
+            self.redrawExpandedCells()
+
+    def redrawExpandedCells(self):
+        """
+        Draws expandedList as a heat map of EXPANDED_SHADES shades of red,
+        the cells expanded first the brightest.  The cells of each shade are
+        covered by a few rectangles, drawn in one canvas update.
+        """
+        begin_batch()
         self.clearExpandedCells()
-        self.expandedCells = []
-        for k, cell in enumerate(cells):
-            screenPos = self.to_screen( cell)
-            cellColor = formatColor(*[(n-k) * c * .5 / n + .25 for c in baseColor])
-            block = square(screenPos,
-                     0.5 * self.gridSize,
-                     color = cellColor,
-                     filled = 1, behind=2)
-            self.expandedCells.append(block)
-            if self.frameTime < 0:
-                refresh()
+        n = len(self.expandedList)
+        baseColor = [1.0, 0.0, 0.0]
+        shades = [[] for shade in range(EXPANDED_SHADES)]
+        seen = set()
+        for k, cell in enumerate(self.expandedList):
+            if cell in seen: continue
+            seen.add(cell)
+            shades[k * EXPANDED_SHADES // n].append(cell)
+        half = 0.5 * self.gridSize
+        for shade, cells in enumerate(shades):
+            brightness = 1.0 - (shade + 0.5) / EXPANDED_SHADES
+            cellColor = formatColor(*[brightness * c * .5 + .25 for c in baseColor])
+            for x0, y0, x1, y1 in mergedRectangles(cells):
+                left, top = self.to_screen((x0, y1))
+                right, bottom = self.to_screen((x1, y0))
+                coords = [(left - half, top - half), (right + half, top - half),
+                          (right + half, bottom + half), (left - half, bottom + half)]
+                self.expandedCells.append(polygon(coords, cellColor, cellColor, 1, 0, behind=2))
+        end_batch()
+        self.expandedDrawTime = time.time()
 
     def clearExpandedCells(self):
-        if 'expandedCells' in dir(self) and len(self.expandedCells) > 0:
-            for cell in self.expandedCells:
-                remove_from_screen(cell)
-
+        for cell in self.expandedCells:
+            remove_from_screen(cell)
+        self.expandedCells = []
 
     def updateDistributions(self, distributions):
-        "Draws an agent's belief distributions"
-        # copy all distributions so we don't change their state
-        distributions = map(lambda x: x.copy(), distributions)
+        """
+        Draws an agent's belief distributions.  Each ghost adds its colour,
+        scaled by its belief ** .3, to the cells it may be in; only cells
+        whose colour differs from the last update are changed.
+        """
         if self.distributionImages == None:
             self.drawDistributions(self.previousState)
-        for x in range(len(self.distributionImages)):
-            for y in range(len(self.distributionImages[0])):
-                image = self.distributionImages[x][y]
-                weights = [dist[ (x,y) ] for dist in distributions]
-
-                if sum(weights) != 0:
-                    pass
-                # Fog of war
-                color = [0.0,0.0,0.0]
-                colors = GHOST_VEC_COLORS[1:] # With Pacman
-                if self.capture: colors = GHOST_VEC_COLORS
-                for weight, gcolor in zip(weights, colors):
-                    color = [min(1.0, c + 0.95 * g * weight ** .3) for c,g in zip(color, gcolor)]
-                changeColor(image, formatColor(*color))
-        refresh()
+        colors = GHOST_VEC_COLORS[1:] # With Pacman
+        if self.capture: colors = GHOST_VEC_COLORS
+        blended = {}
+        for dist, gcolor in zip(distributions, colors):
+            r, g, b = [0.95 * c for c in gcolor]
+            # items() rather than dist[cell], which would add keys to a Counter
+            for cell, weight in dist.items():
+                if weight <= 0: continue
+                scale = weight ** .3
+                color = blended.get(cell)
+                if color == None:
+                    blended[cell] = [r * scale, g * scale, b * scale]
+                else:
+                    color[0] += r * scale
+                    color[1] += g * scale
+                    color[2] += b * scale
+        # Fog of war
+        newColors = {}
+        width, height = len(self.distributionImages), len(self.distributionImages[0])
+        for (x, y), (r, g, b) in blended.items():
+            if x < 0 or y < 0 or x >= width or y >= height: continue
+            color = formatColor(min(1.0, r), min(1.0, g), min(1.0, b))
+            if color != BACKGROUND_COLOR: newColors[(x, y)] = color
+        begin_batch()
+        for cell in self.distributionColors:
+            if cell not in newColors:
+                x, y = cell
+                changeColor(self.distributionImages[x][y], BACKGROUND_COLOR)
+        for cell, color in newColors.items():
+            if self.distributionColors.get(cell) != color:
+                x, y = cell
+                changeColor(self.distributionImages[x][y], color)
+        self.distributionColors = newColors
+        end_batch()
 
 class FirstPersonPacmanGraphics(PacmanGraphics):
-    def __init__(self, zoom = 1.0, showGhosts = True, capture = False, frameTime=0):
-        PacmanGraphics.__init__(self, zoom, frameTime=frameTime)
+    def __init__(self, zoom = 1.0, showGhosts = True, capture = False, frameTime=0, batchFrames=False, fps=0, wallImage=False):
+        PacmanGraphics.__init__(self, zoom, frameTime=frameTime, batchFrames=batchFrames, fps=fps, wallImage=wallImage)
         self.showGhosts = showGhosts
         self.capture = capture
 
@@ -630,6 +902,7 @@ class FirstPersonPacmanGraphics(PacmanGraphics):
 
         # Information
         self.previousState = state
+        self.resetFrames()
 
     def lookAhead(self, config, state):
         if config.getDirection() == 'Stop':
@@ -12,15 +12,43 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import imp
 import sys
 import math
+import os
 import random
 import string
 import time
 import types
-import Tkinter
 import os.path
 
+# Tkinter is imported by begin_graphics, so that programs which never open
+# a window do not pay for loading Tk
+Tkinter = None
+
+def _load_tkinter():
+    global Tkinter
+    if Tkinter == None:
+        import Tkinter
+    return Tkinter
+
+def can_open_window():
+    """
+    Whether a window can be opened, found without loading Tk: Tkinter must
+    be installed and, on X11 systems, a display must be set.
+    """
+    try:
+        imp.find_module('Tkinter')
+    except ImportError:
+        return False
+    if sys.platform in ('win32', 'darwin'): return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+def _do_one_event():
+    "Handles one pending window event, if any; does nothing before begin_graphics"
+    if Tkinter != None:
+        Tkinter.tkinter.dooneevent(Tkinter.tkinter.DONT_WAIT)
+
 _Windows = sys.platform == 'win32'  # True if on Win95/98/NT
 
 _root_window = None      # The root window for graphics output
@@ -62,6 +90,7 @@ def begin_graphics(width=640, height=480, color=formatColor(0, 0, 0), title=None
     if _root_window is not None:
         # Lose the window.
         _root_window.destroy()
+    del _images[:]
 
     # Save the canvas size parameters
     _canvas_xs, _canvas_ys = width - 1, height - 1
@@ -69,6 +98,7 @@ def begin_graphics(width=640, height=480, color=formatColor(0, 0, 0), title=None
     _bg_color = color
 
     # Create the root window
+    _load_tkinter()
     _root_window = Tkinter.Tk()
     _root_window.protocol('WM_DELETE_WINDOW', _destroy_window)
     _root_window.title(title or 'Graphics Window')
@@ -180,6 +210,10 @@ def square(pos, r, color, filled=1, behind=0):
     return polygon(coords, color, color, filled, 0, behind=behind)
 
 def circle(pos, r, outlineColor, fillColor, endpoints=None, style='pieslice', width=2):
+    return draw_shape(circle_shape(pos, r, outlineColor, fillColor, endpoints, style, width))
+
+def circle_shape(pos, r, outlineColor, fillColor, endpoints=None, style='pieslice', width=2):
+    "The canvas item circle() draws, as (kind, coordinates, options), for draw_shapes"
     x, y = pos
     x0, x1 = x - r - 1, x + r
     y0, y1 = y - r - 1, y + r
@@ -189,16 +223,56 @@ def circle(pos, r, outlineColor, fillColor, endpoints=None, style='pieslice', wi
         e = list(endpoints)
     while e[0] > e[1]: e[1] = e[1] + 360
 
-    return _canvas.create_arc(x0, y0, x1, y1, outline=outlineColor, fill=fillColor,
-                              extent=e[1] - e[0], start=e[0], style=style, width=width)
+    return ('arc', (x0, y0, x1, y1), {'outline': outlineColor, 'fill': fillColor,
+                                      'extent': e[1] - e[0], 'start': e[0], 'style': style, 'width': width})
+
+def draw_shape(shape):
+    kind, coords, options = shape
+    return getattr(_canvas, 'create_' + kind)(*coords, **options)
+
+def draw_shapes(shapes):
+    "Draws shapes made by circle_shape and line_shape; returns their item ids"
+    creators = {}
+    ids = []
+    for kind, coords, options in shapes:
+        create = creators.get(kind)
+        if create == None: create = creators[kind] = getattr(_canvas, 'create_' + kind)
+        ids.append(create(*coords, **options))
+    return ids
 
 def image(pos, file="../../blueghost.gif"):
     x, y = pos
     # img = PhotoImage(file=file)
     return _canvas.create_image(x, y, image = Tkinter.PhotoImage(file=file), anchor = Tkinter.NW)
 
+# Images on the canvas, which Tk only shows while Python holds a reference
+_images = []
+
+def image_from_data(pos, data):
+    "Draws a base64 encoded GIF with its top left corner at pos"
+    x, y = pos
+    photo = Tkinter.PhotoImage(data=data, format='gif')
+    _images.append(photo)
+    return _canvas.create_image(x, y, image=photo, anchor=Tkinter.NW)
+
+
+# While a batch is open, canvas changes are neither processed nor redrawn
+_batch_depth = 0
+
+def begin_batch():
+    "Starts collecting canvas changes; end_batch shows them all at once"
+    global _batch_depth
+    _batch_depth += 1
+
+def end_batch():
+    global _batch_depth
+    _batch_depth -= 1
+    if _batch_depth == 0:
+        refresh()
+        _do_one_event()
 
 def refresh():
+    if _batch_depth: return
     _canvas.update_idletasks()
 
 def moveCircle(id, pos, r, endpoints=None):
@@ -239,9 +313,13 @@ def changeColor(id, newColor):
     _canvas.itemconfigure(id, fill=newColor)
 
 def line(here, there, color=formatColor(0, 0, 0), width=2):
+    return draw_shape(line_shape(here, there, color, width))
+
+def line_shape(here, there, color=formatColor(0, 0, 0), width=2):
+    "The canvas item line() draws, as (kind, coordinates, options), for draw_shapes"
     x0, y0 = here[0], here[1]
     x1, y1 = there[0], there[1]
-    return _canvas.create_line(x0, y0, x1, y1, fill=color, width=width)
+    return ('line', (x0, y0, x1, y1), {'fill': color, 'width': width})
 
 ##############################################################################
 ### Keypress handling ########################################################
@@ -291,11 +369,10 @@ def _clear_keys(event=None):
     _keyswaiting = {}
     _got_release = None
 
-def keys_pressed(d_o_e=Tkinter.tkinter.dooneevent,
-                 d_w=Tkinter.tkinter.DONT_WAIT):
-    d_o_e(d_w)
+def keys_pressed():
+    _do_one_event()
     if _got_release:
-        d_o_e(d_w)
+        _do_one_event()
     return _keysdown.keys()
 
 def keys_waiting():
@@ -313,11 +390,9 @@ def wait_for_keys():
         sleep(0.05)
     return keys
 
-def remove_from_screen(x,
-                       d_o_e=Tkinter.tkinter.dooneevent,
-                       d_w=Tkinter.tkinter.DONT_WAIT):
+def remove_from_screen(x):
     _canvas.delete(x)
-    d_o_e(d_w)
+    if not _batch_depth: _do_one_event()
 
 def _adjust_coords(coord_list, x, y):
     for i in range(0, len(coord_list), 2):
@@ -325,9 +400,7 @@ def _adjust_coords(coord_list, x, y):
         coord_list[i + 1] = coord_list[i + 1] + y
     return coord_list
 
-def move_to(object, x, y=None,
-            d_o_e=Tkinter.tkinter.dooneevent,
-            d_w=Tkinter.tkinter.DONT_WAIT):
+def move_to(object, x, y=None):
     if y is None:
         try: x, y = x
         except: raise  'incomprehensible coordinates'
@@ -345,11 +418,9 @@ def move_to(object, x, y=None,
         newCoords.append(coord + inc)
 
     _canvas.coords(object, *newCoords)
-    d_o_e(d_w)
+    if not _batch_depth: _do_one_event()
 
-def move_by(object, x, y=None,
-            d_o_e=Tkinter.tkinter.dooneevent,
-            d_w=Tkinter.tkinter.DONT_WAIT, lift=False):
+def move_by(object, x, y=None, lift=False):
     if y is None:
         try: x, y = x
         except: raise Exception, 'incomprehensible coordinates'
@@ -366,7 +437,7 @@ def move_by(object, x, y=None,
         newCoords.append(coord + inc)
 
     _canvas.coords(object, *newCoords)
-    d_o_e(d_w)
+    if not _batch_depth: _do_one_event()
     if lift:
         _canvas.tag_raise(object)
 
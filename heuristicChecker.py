@@ -0,0 +1,287 @@
+# heuristicChecker.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Exhaustive admissibility and consistency checks for search heuristics.
+
+checkHeuristic explores every state reachable from the start state of a
+search problem, finds the true cost from each state to the nearest goal
+with one Dijkstra search backwards from the goal states, evaluates the
+heuristic on every state (in parallel processes when there are many) and
+reports
+  - negative values,
+  - non-zero values at goal states,
+  - admissibility violations:  H(s) > true cost from s, and
+  - consistency violations:    H(s) > cost(s, s') + H(s')
+together with the offending states.  Exploration stops after maxStates
+states; the report is then incomplete: the explored states and edges are
+checked for everything except admissibility, which needs the true costs.
+
+  python heuristicChecker.py -l mediumCorners -p CornersProblem -H cornersHeuristic
+  python heuristicChecker.py -l trickySearch -p FoodSearchProblem -H foodHeuristic
+"""
+
+import collections
+import heapq
+import multiprocessing
+import optparse
+import os
+import sys
+
+import cPickle
+
+MAX_STATES = 20000   # States explored before giving up on completeness
+MIN_CHUNK = 2000     # Fewest states worth evaluating in a separate process
+MAX_LISTED = 5       # Violations of each kind kept in a report
+
+NEGATIVE = 'H >= 0'
+GOAL = 'H(goal) == 0'
+ADMISSIBILITY = 'admissibility'
+CONSISTENCY = 'consistency'
+KINDS = [NEGATIVE, GOAL, ADMISSIBILITY, CONSISTENCY]
+
+def describeState(state):
+    "A readable state; food and wall grids are shown as lists of positions"
+    if isinstance(state, tuple):
+        return '(%s)' % ', '.join([describeState(part) for part in state])
+    if hasattr(state, 'asList'):
+        return str(state.asList())
+    return str(state)
+
+class HeuristicReport:
+    """
+    The outcome of checkHeuristic.  violations maps each kind of violation
+    to a list of up to MAX_LISTED messages; counts has the total numbers.
+    """
+    def __init__(self):
+        self.numStates = 0
+        self.numEdges = 0
+        self.complete = True
+        self.violations = dict([(kind, []) for kind in KINDS])
+        self.counts = dict([(kind, 0) for kind in KINDS])
+
+    def add(self, kind, message):
+        self.counts[kind] += 1
+        if len(self.violations[kind]) < MAX_LISTED:
+            self.violations[kind].append(message)
+
+    def passed(self):
+        return sum(self.counts.values()) == 0
+
+    def failedKinds(self):
+        return [kind for kind in KINDS if self.counts[kind] > 0]
+
+    def describe(self, kind):
+        "Lines describing the violations of one kind"
+        lines = ['%d state(s) failed the %s test, for example:' % (self.counts[kind], kind)]
+        return lines + ['    ' + message for message in self.violations[kind]]
+
+    def __str__(self):
+        extent = self.complete and 'all' or 'the first'
+        lines = ['Checked %s %d states and %d transitions' % (extent, self.numStates, self.numEdges)]
+        if not self.complete:
+            lines.append('State space not fully explored: admissibility was not checked')
+        for kind in self.failedKinds():
+            lines.extend(self.describe(kind))
+        if self.passed():
+            lines.append('No violations found')
+        return '\n'.join(lines)
+
+def exploreStates(problem, maxStates):
+    """
+    Breadth first search over the states reachable from the start state.
+    Returns (states, edges, complete), where edges lists (from index, to
+    index, cost) for the successors of every expanded state.
+    """
+    start = problem.getStartState()
+    index = {start: 0}
+    states = [start]
+    edges = []
+    frontier = collections.deque([0])
+    while frontier:
+        if len(states) >= maxStates:
+            return states, edges, False
+        i = frontier.popleft()
+        for successor, action, cost in problem.getSuccessors(states[i]):
+            j = index.get(successor)
+            if j == None:
+                j = index[successor] = len(states)
+                states.append(successor)
+                frontier.append(j)
+            edges.append((i, j, cost))
+    return states, edges, True
+
+def trueCosts(numStates, edges, goals):
+    "Cost from each state to the nearest goal; None if no goal is reachable"
+    predecessors = [[] for i in range(numStates)]
+    for i, j, cost in edges:
+        predecessors[j].append((i, cost))
+    costs = [None] * numStates
+    frontier = [(0, goal) for goal in goals]
+    while frontier:
+        cost, j = heapq.heappop(frontier)
+        if costs[j] != None: continue
+        costs[j] = cost
+        for i, stepCost in predecessors[j]:
+            if costs[i] == None:
+                heapq.heappush(frontier, (cost + stepCost, i))
+    return costs
+
+def defaultJobs():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+def evaluateChunk(heuristic, problem, states, writeEnd, tracker):
+    "Body of a forked evaluation process"
+    # Report the student functions used here to the parent's tracker
+    if tracker != None: tracker.start()
+    try:
+        values = [heuristic(state, problem) for state in states]
+        called, complete = set(), True
+        if tracker != None:
+            tracker.stop()
+            called, complete = tracker.called, tracker.complete
+        result = cPickle.dumps((values, called, complete), cPickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        result = '' # The parent evaluates this chunk again itself
+    out = os.fdopen(writeEnd, 'wb')
+    out.write(result)
+    out.close()
+
+def evaluateHeuristic(heuristic, problem, states, jobs, tracker=None):
+    """
+    Returns [heuristic(state, problem) for state in states], splitting the
+    work between up to jobs forked processes.  A chunk whose process fails
+    is evaluated again here, so that errors are raised as usual.  The
+    functions called in the other processes are added to tracker (a
+    gradeCache.DependencyTracker), if one is given.
+    """
+    jobs = min(jobs, len(states) / MIN_CHUNK)
+    if jobs <= 1 or not hasattr(os, 'fork'):
+        return [heuristic(state, problem) for state in states]
+    size = (len(states) + jobs - 1) / jobs
+    chunks = [states[k:k + size] for k in range(0, len(states), size)]
+    children = []
+    try:
+        sys.stdout.flush()
+        for chunk in chunks[1:]:
+            readEnd, writeEnd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    os.close(readEnd)
+                    evaluateChunk(heuristic, problem, chunk, writeEnd, tracker)
+                finally:
+                    os._exit(0)
+            os.close(writeEnd)
+            children.append([pid, readEnd])
+        values = [heuristic(state, problem) for state in chunks[0]]
+        for child, chunk in zip(children, chunks[1:]):
+            pid, readEnd = child
+            data = []
+            while True:
+                block = os.read(readEnd, 65536)
+                if not block: break
+                data.append(block)
+            os.close(readEnd)
+            os.waitpid(pid, 0)
+            child[0] = None
+            if not data:
+                values.extend([heuristic(state, problem) for state in chunk])
+                continue
+            chunkValues, called, complete = cPickle.loads(''.join(data))
+            values.extend(chunkValues)
+            if tracker != None:
+                tracker.called.update(called)
+                if not complete: tracker.complete = False
+        return values
+    finally:
+        for pid, readEnd in children:
+            if pid != None:
+                # Interrupted, e.g. by a timeout: stop the remaining processes
+                try:
+                    os.kill(pid, 9)
+                    os.waitpid(pid, 0)
+                    os.close(readEnd)
+                except OSError:
+                    pass
+
+def checkHeuristic(problem, heuristic, maxStates=MAX_STATES, jobs=None, tracker=None):
+    """
+    Checks heuristic on the states of problem; returns a HeuristicReport.
+    The problem is explored, so its expansion count goes up: pass one that
+    is not otherwise used.
+    """
+    if jobs == None: jobs = defaultJobs()
+    report = HeuristicReport()
+    states, edges, report.complete = exploreStates(problem, maxStates)
+    report.numStates, report.numEdges = len(states), len(edges)
+    values = evaluateHeuristic(heuristic, problem, states, jobs, tracker)
+    goals = [i for i, state in enumerate(states) if problem.isGoalState(state)]
+
+    for i, h in enumerate(values):
+        if h < 0:
+            report.add(NEGATIVE, 'H(%s) = %s' % (describeState(states[i]), h))
+    for i in goals:
+        if values[i] != 0:
+            report.add(GOAL, 'H(%s) = %s' % (describeState(states[i]), values[i]))
+    if report.complete:
+        costs = trueCosts(len(states), edges, goals)
+        for i, h in enumerate(values):
+            if costs[i] != None and h > costs[i]:
+                report.add(ADMISSIBILITY, 'H(%s) = %s, but the true cost is %s' %
+                           (describeState(states[i]), h, costs[i]))
+    for i, j, cost in edges:
+        if values[i] - values[j] > cost:
+            report.add(CONSISTENCY, 'H(%s) = %s, but H(%s) = %s after a step of cost %s' %
+                       (describeState(states[i]), values[i], describeState(states[j]), values[j], cost))
+    return report
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Check a heuristic on every state of a search problem')
+    parser.add_option('-l', '--layout', dest='layout', default='mediumCorners',
+                      help='Layout to load [Default: %default]')
+    parser.add_option('-p', '--problem', dest='problem', default='CornersProblem',
+                      help='Problem class from searchAgents.py [Default: %default]')
+    parser.add_option('-H', '--heuristic', dest='heuristic', default='cornersHeuristic',
+                      help='Heuristic from searchAgents.py or search.py [Default: %default]')
+    parser.add_option('-m', '--max-states', dest='maxStates', type='int', default=MAX_STATES,
+                      help='States to explore at most [Default: %default]')
+    parser.add_option('-j', '--jobs', dest='jobs', type='int', default=None,
+                      help='Processes evaluating the heuristic [Default: number of CPUs]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    import layout
+    import pacman
+    import search
+    import searchAgents
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    gameState = pacman.GameState()
+    gameState.initialize(lay, 0)
+    problem = getattr(searchAgents, options.problem)(gameState)
+    if hasattr(searchAgents, options.heuristic):
+        heuristic = getattr(searchAgents, options.heuristic)
+    else:
+        heuristic = getattr(search, options.heuristic)
+    report = checkHeuristic(problem, heuristic, options.maxStates, options.jobs)
+    print report
+    sys.exit(not report.passed())
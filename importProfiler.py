@@ -0,0 +1,102 @@
+# importProfiler.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Reports how long a script spends importing each module.
+
+The script runs as usual; when it exits, a table of the modules it
+imported is printed to standard error, with the time spent in each
+import including (cumulative) and excluding (self) the modules that import
+pulled in, and the module which first imported it.
+
+  python importProfiler.py pacman.py -q -n 1
+  python importProfiler.py --top 10 --sort self autograder.py --no-graphics -q q1
+"""
+
+import __builtin__
+import atexit
+import optparse
+import os
+import runpy
+import sys
+import time
+
+class ImportProfiler:
+    def __init__(self):
+        self.records = []   # (name, importer, cumulative seconds, self seconds)
+        self.stack = []     # [name, seconds spent in nested imports] of imports in progress
+        self.original = None
+        self.start = None
+
+    def install(self):
+        self.original = __builtin__.__import__
+        __builtin__.__import__ = self.profiledImport
+        self.start = time.time()
+
+    def uninstall(self):
+        if self.original != None:
+            __builtin__.__import__ = self.original
+            self.original = None
+
+    def profiledImport(self, name, globals=None, locals=None, fromlist=None, level=-1):
+        if name in sys.modules and sys.modules[name] != None:
+            return self.original(name, globals, locals, fromlist, level)
+        importer = self.stack and self.stack[-1][0] or '__main__'
+        frame = [name, 0.0]
+        self.stack.append(frame)
+        begin = time.time()
+        try:
+            return self.original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.time() - begin
+            self.stack.pop()
+            if self.stack: self.stack[-1][1] += elapsed
+            if name in sys.modules:
+                self.records.append((name, importer, elapsed, elapsed - frame[1]))
+
+    def report(self, top=None, sort='cumulative', out=sys.stderr):
+        total = time.time() - self.start
+        # Imports directly under __main__ do not overlap
+        importing = sum([cumulative for name, importer, cumulative, own in self.records
+                         if importer == '__main__'])
+        key = sort == 'self' and (lambda r: -r[3]) or (lambda r: -r[2])
+        records = sorted(self.records, key=key)
+        if top: records = records[:top]
+        print >>out, '\n%-28s %12s %10s  %s' % ('Module', 'Cumulative ms', 'Self ms', 'Imported by')
+        for name, importer, cumulative, own in records:
+            print >>out, '%-28s %12.1f %10.1f  %s' % (name, 1000 * cumulative, 1000 * own, importer)
+        print >>out, '%d modules imported in %.1f ms of %.1f ms' % (len(self.records), 1000 * importing, 1000 * total)
+
+def readCommand(argv):
+    parser = optparse.OptionParser(usage='%prog [options] script.py [script arguments]',
+                                   description='Report the import time of each module a script loads')
+    parser.disable_interspersed_args()
+    parser.add_option('--top', dest='top', type='int', default=25,
+                      help='Number of modules to list, 0 for all [Default: %default]')
+    parser.add_option('--sort', dest='sort', type='choice', choices=['cumulative', 'self'], default='cumulative',
+                      help='Order of the table: cumulative or self [Default: %default]')
+    options, args = parser.parse_args(argv)
+    if len(args) == 0:
+        parser.error('No script given')
+    return options, args
+
+if __name__ == '__main__':
+    options, args = readCommand(sys.argv[1:])
+    script = args[0]
+    sys.argv = args
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    profiler = ImportProfiler()
+    atexit.register(lambda: profiler.report(options.top, options.sort))
+    profiler.install()
+    runpy.run_path(script, run_name='__main__')
@@ -14,10 +14,12 @@
 
 from util import manhattanDistance
 from game import Grid
+import copy
 import os
 import random
 
 VISIBILITY_MATRIX_CACHE = {}
+LAYOUT_TEXT_CACHE = {}
 
 class Layout:
     """
@@ -92,6 +94,16 @@ class Layout:
     def deepCopy(self):
         return Layout(self.layoutText[:])
 
+    def copy(self):
+        "A copy with its own grids and lists, made without parsing the text again"
+        layout = copy.copy(self)
+        layout.walls = self.walls.copy()
+        layout.food = self.food.copy()
+        layout.capsules = self.capsules[:]
+        layout.agentPositions = self.agentPositions[:]
+        layout.layoutText = self.layoutText[:]
+        return layout
+
     def processLayoutText(self, layoutText):
         """
         Coordinates are flipped from the input format to the (x,y) convention here
@@ -142,6 +154,16 @@ def getLayout(name, back = 2):
         os.chdir(curdir)
     return layout
 
+def getLayoutFromText(text):
+    """
+    Returns the Layout for a layout given as a single string, as found in
+    test files.  Each text is parsed once; every call gets its own copy, so a
+    test may change its layout without affecting the others.
+    """
+    if text not in LAYOUT_TEXT_CACHE:
+        LAYOUT_TEXT_CACHE[text] = Layout([l.strip() for l in text.split('\n')])
+    return LAYOUT_TEXT_CACHE[text].copy()
+
 def tryToLoad(fullname):
     if(not os.path.exists(fullname)): return None
     f = open(fullname)
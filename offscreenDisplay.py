@@ -0,0 +1,641 @@
+# offscreenDisplay.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Renders games to PNG frames or an animated GIF without a window.
+
+OffscreenGraphics is graphicsDisplay.PacmanGraphics drawing on a
+RasterCanvas: an in-memory stand-in for the subset of the Tk canvas which
+graphicsUtils uses.  Canvas items are rasterised into rows of pixels
+holding indices into a 256 colour palette, and frames are expanded to RGB
+for PNG files.  The walls of a layout are rasterised once, into a static
+layer kept for later games on the same layout; each frame copies that
+layer and draws food, agents and text over it.
+
+  python pacman.py -l mediumClassic -p GreedyAgent --gif game.gif
+  python pacman.py --replay recorded-game-1 --offscreen frames
+"""
+
+import base64
+import math
+import os
+import struct
+import zlib
+
+import graphicsDisplay
+import graphicsUtils
+
+###########
+# Colours #
+###########
+
+COLOR_NAMES = {'black': (0, 0, 0), 'white': (255, 255, 255), 'red': (255, 0, 0),
+               'green': (0, 255, 0), 'blue': (0, 0, 255), 'yellow': (255, 255, 0)}
+
+def parseColor(color):
+    "An (r, g, b) triple for a Tk colour: '#rrggbb', '#rgb' or a basic name"
+    color = color.lower()
+    if color in COLOR_NAMES: return COLOR_NAMES[color]
+    if color.startswith('#') and len(color) == 7:
+        return tuple([int(color[i:i + 2], 16) for i in (1, 3, 5)])
+    if color.startswith('#') and len(color) == 4:
+        return tuple([17 * int(digit, 16) for digit in color[1:]])
+    raise Exception('Unknown colour: %s' % color)
+
+class Palette:
+    """
+    The first EXACT colours used get palette entries of their own; the
+    other 216 entries are a 6x6x6 colour cube, which later colours (and all
+    new colours once the palette is frozen for a GIF) are rounded to.
+    """
+    EXACT = 40
+
+    def __init__(self):
+        self.colors = [(0, 0, 0)] * self.EXACT
+        levels = [51 * level for level in range(6)]
+        self.colors += [(r, g, b) for r in levels for g in levels for b in levels]
+        self.indices = {}
+        self.numExact = 0
+        self.frozen = False
+
+    def index(self, color):
+        i = self.indices.get(color)
+        if i != None: return i
+        rgb = parseColor(color)
+        if rgb in self.colors[:self.numExact]:
+            i = self.colors.index(rgb)
+        elif not self.frozen and self.numExact < self.EXACT:
+            i = self.numExact
+            self.colors[i] = rgb
+            self.numExact += 1
+        else:
+            r, g, b = [int(round(c / 51.0)) for c in rgb]
+            i = self.EXACT + 36 * r + 6 * g + b
+        self.indices[color] = i
+        return i
+
+    def toRGB(self, pixels):
+        "Expands a buffer of palette indices to a buffer of RGB triples"
+        rgb = bytearray(3 * len(pixels))
+        for channel in range(3):
+            table = ''.join([chr(color[channel]) for color in self.colors])
+            rgb[channel::3] = pixels.translate(table)
+        return rgb
+
+    def toString(self):
+        return ''.join([chr(r) + chr(g) + chr(b) for r, g, b in self.colors])
+
+# One palette for every canvas, so that cached static layers stay valid
+PALETTE = Palette()
+
+##############
+# Rasterising #
+##############
+
+# Spans are (row, first column, column after the last) triples
+
+def polygonSpans(points):
+    "Spans of the pixels whose centres lie inside a polygon (even-odd rule)"
+    if len(points) < 3: return []
+    edges = zip(points, points[1:] + points[:1])
+    top = int(math.ceil(min([y for x, y in points]) - 0.5))
+    bottom = int(math.floor(max([y for x, y in points]) - 0.5))
+    spans = []
+    for row in range(top, bottom + 1):
+        yc = row + 0.5
+        crossings = []
+        for (x0, y0), (x1, y1) in edges:
+            if (y0 <= yc < y1) or (y1 <= yc < y0):
+                crossings.append(x0 + (yc - y0) * (x1 - x0) / (y1 - y0))
+        crossings.sort()
+        for i in range(0, len(crossings) - 1, 2):
+            start = int(math.ceil(crossings[i] - 0.5))
+            end = int(math.ceil(crossings[i + 1] - 0.5))
+            if end > start: spans.append((row, start, end))
+    return spans
+
+def lineSpans(points, width):
+    "Spans of a polyline of the given width, with butt ends"
+    spans = []
+    half = max(width, 1) / 2.0
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        length = math.hypot(x1 - x0, y1 - y0)
+        if length == 0: continue
+        nx, ny = -(y1 - y0) / length * half, (x1 - x0) / length * half
+        spans += polygonSpans([(x0 + nx, y0 + ny), (x1 + nx, y1 + ny), (x1 - nx, y1 - ny), (x0 - nx, y0 - ny)])
+    return spans
+
+def smoothPoints(points, steps=4):
+    "The closed parabolic spline Tk draws for a polygon with smooth=1"
+    n = len(points)
+    if n < 3: return points
+    smoothed = []
+    for i in range(n):
+        (ax, ay), (bx, by), (cx, cy) = points[i - 1], points[i], points[(i + 1) % n]
+        x0, y0 = (ax + bx) / 2.0, (ay + by) / 2.0
+        x2, y2 = (bx + cx) / 2.0, (by + cy) / 2.0
+        for step in range(steps):
+            t = float(step) / steps
+            smoothed.append(((1 - t) ** 2 * x0 + 2 * t * (1 - t) * bx + t * t * x2,
+                             (1 - t) ** 2 * y0 + 2 * t * (1 - t) * by + t * t * y2))
+    return smoothed
+
+def ellipseSpans(box, start=0, extent=360, ring=None):
+    """
+    Spans of the pixels of the ellipse inscribed in box = (x0, y0, x1, y1)
+    whose angle (in degrees, counterclockwise from east as in Tk) is within
+    extent of start.  With ring = (inner, outer), only pixels whose distance
+    from the centre, as a fraction of the radius, is in that range are kept.
+    """
+    x0, y0, x1, y1 = box
+    cx, cy = (x0 + x1) / 2.0, (y0 + y1) / 2.0
+    rx, ry = abs(x1 - x0) / 2.0, abs(y1 - y0) / 2.0
+    if rx == 0 or ry == 0: return []
+    inner, outer = ring or (0.0, 1.0)
+    wholeTurn = extent >= 359 or extent <= -359
+    if extent < 0: start, extent = start + extent, -extent
+    spans = []
+    top = int(math.ceil(cy - outer * ry - 0.5))
+    bottom = int(math.floor(cy + outer * ry - 0.5))
+    for row in range(top, bottom + 1):
+        dy = (row + 0.5 - cy) / ry
+        if dy * dy > outer * outer: continue
+        half = rx * math.sqrt(outer * outer - dy * dy)
+        first = int(math.ceil(cx - half - 0.5))
+        last = int(math.floor(cx + half - 0.5))
+        if wholeTurn and inner <= abs(dy):
+            if last >= first: spans.append((row, first, last + 1))
+            continue
+        runStart = None
+        for column in range(first, last + 2):
+            inside = False
+            if column <= last:
+                dx = (column + 0.5 - cx) / rx
+                inside = dx * dx + dy * dy >= inner * inner
+                if inside and not wholeTurn:
+                    angle = math.degrees(math.atan2(-dy, dx))
+                    inside = (angle - start) % 360 <= extent
+            if inside and runStart == None:
+                runStart = column
+            elif not inside and runStart != None:
+                spans.append((row, runStart, column))
+                runStart = None
+    return spans
+
+# A 3x5 pixel font for the info pane: five rows of three bits per character
+GLYPHS = {
+    '0': '111101101101111', '1': '010110010010111', '2': '111001111100111', '3': '111001111001111',
+    '4': '101101111001001', '5': '111100111001111', '6': '111100111101111', '7': '111001001001001',
+    '8': '111101111101111', '9': '111101111001111', 'A': '010101111101101', 'B': '110101110101110',
+    'C': '011100100100011', 'D': '110101101101110', 'E': '111100110100111', 'F': '111100110100100',
+    'G': '011100101101011', 'H': '101101111101101', 'I': '111010010010111', 'J': '001001001101010',
+    'K': '101101110101101', 'L': '100100100100111', 'M': '101111111101101', 'N': '110101101101101',
+    'O': '010101101101010', 'P': '110101110100100', 'Q': '010101101110011', 'R': '110101110101101',
+    'S': '011100010001110', 'T': '111010010010010', 'U': '101101101101111', 'V': '101101101101010',
+    'W': '101101111111101', 'X': '101101010101101', 'Y': '101101010010010', 'Z': '111001010100111',
+    '-': '000000111000000', ':': '000010000010000', '.': '000000000000010', '!': '010010010000010',
+    '?': '111001010000010', '%': '101001010100101', '/': '001001010100100'}
+
+def textSpans(x, y, text, size, anchor):
+    "Spans of text in the built-in font, scaled to roughly size points"
+    scale = max(1, int(round(abs(size) / 7.0)))
+    width, height = max(0, 4 * len(text) - 1) * scale, 5 * scale
+    if 'e' in anchor: x -= width
+    elif 'w' not in anchor: x -= width / 2.0
+    if 's' in anchor: y -= height
+    elif 'n' not in anchor: y -= height / 2.0
+    x, y = int(round(x)), int(round(y))
+    spans = []
+    for i, character in enumerate(str(text).upper()):
+        glyph = GLYPHS.get(character)
+        if glyph == None: continue
+        for bit in range(15):
+            if glyph[bit] == '1':
+                row, column = divmod(bit, 3)
+                left = x + (4 * i + column) * scale
+                for r in range(y + row * scale, y + (row + 1) * scale):
+                    spans.append((r, left, left + scale))
+    return spans
+
+#############
+# The canvas #
+#############
+
+def pairs(coords):
+    return [(coords[i], coords[i + 1]) for i in range(0, len(coords) - 1, 2)]
+
+class CanvasItem:
+    def __init__(self, kind, coords, options):
+        self.kind = kind
+        self.coords = [float(c) for c in coords]
+        self.options = options
+        self.spans = None      # (offset, length, colour index) runs, once rasterised
+        self.static = False
+        self.lowered = False
+
+class RasterCanvas:
+    """
+    The subset of Tkinter.Canvas used by graphicsUtils, kept as a list of
+    items which render() rasterises.  Items lowered beneath the static layer
+    (as the overlays of drawExpandedCells and drawDistributions are) are
+    drawn before it; all other items are drawn over it in stacking order.
+    """
+    def __init__(self, width, height, background):
+        self.width = int(math.ceil(width))
+        self.height = int(math.ceil(height))
+        self.background = PALETTE.index(background)
+        self.items = {}
+        self.order = []
+        self.nextId = 1
+        self.staticLayer = None
+
+    # Item creation, as in Tkinter
+    def _create(self, kind, coords, options):
+        itemId = self.nextId
+        self.nextId += 1
+        self.items[itemId] = CanvasItem(kind, coords, options)
+        self.order.append(itemId)
+        return itemId
+
+    def create_polygon(self, *coords, **options):
+        if len(coords) == 1: coords = coords[0]
+        return self._create('polygon', coords, options)
+
+    def create_arc(self, *coords, **options):
+        return self._create('arc', coords, options)
+
+    def create_line(self, *coords, **options):
+        return self._create('line', coords, options)
+
+    def create_text(self, x, y, **options):
+        return self._create('text', (x, y), options)
+
+    def create_image(self, *args, **options):
+        raise Exception('Images are not supported off screen')
+
+    def coords(self, itemId, *coords):
+        item = self.items[itemId]
+        if not coords: return list(item.coords)
+        self._changed(item)
+        item.coords = [float(c) for c in coords]
+
+    def itemconfigure(self, itemId, **options):
+        item = self.items[itemId]
+        self._changed(item)
+        item.options.update(options)
+    itemconfig = itemconfigure
+
+    def delete(self, itemId):
+        if itemId == 'all':
+            self.items, self.order, self.staticLayer = {}, [], None
+        elif itemId in self.items:
+            self._changed(self.items.pop(itemId))
+            self.order.remove(itemId)
+
+    def tag_lower(self, itemId, belowThis=None):
+        self.order.remove(itemId)
+        self.order.insert(belowThis == None and 0 or self.order.index(belowThis), itemId)
+        self.items[itemId].lowered = True
+
+    def tag_raise(self, itemId, aboveThis=None):
+        self.order.remove(itemId)
+        self.order.append(itemId)
+        self.items[itemId].lowered = False
+
+    def update_idletasks(self): pass
+    def update(self): pass
+
+    def postscript(self, **options):
+        raise Exception('The off-screen canvas writes PNG and GIF files, not postscript')
+
+    def _changed(self, item):
+        item.spans = None
+        if item.static: self.staticLayer = None
+
+    # Rasterising
+    def freezeStatic(self, itemIds, key=None):
+        """
+        Marks items which will not change as the static layer.  Its pixels
+        are kept under key in STATIC_LAYERS, for later canvases with the same
+        key and the same number of static items.
+        """
+        for itemId in itemIds: self.items[itemId].static = True
+        statics = [self.items[i] for i in self.order if self.items[i].static]
+        cached = key != None and STATIC_LAYERS.get(key)
+        if cached and len(cached[1]) == len(statics):
+            for item, spans in zip(statics, cached[1]): item.spans = spans
+            self.staticLayer = cached[0]
+        else:
+            self.staticLayer = self._paint(statics)
+            if key != None: STATIC_LAYERS[key] = (self.staticLayer, [item.spans for item in statics])
+
+    def _spans(self, item):
+        if item.spans != None: return item.spans
+        options, points = item.options, pairs(item.coords)
+        fill = options.get('fill', '')
+        outline = options.get('outline', '')
+        width = float(options.get('width', 1))
+        shapes = []
+        if item.kind == 'polygon':
+            if int(options.get('smooth', 0)): points = smoothPoints(points)
+            if fill: shapes.append((fill, polygonSpans(points)))
+            if outline and outline != fill:
+                shapes.append((outline, lineSpans(points + points[:1], width)))
+        elif item.kind == 'arc':
+            box = item.coords[:4]
+            start, extent = float(options.get('start', 0)), float(options.get('extent', 90))
+            radius = max(1.0, min(abs(box[2] - box[0]), abs(box[3] - box[1])) / 2.0)
+            if options.get('style', 'pieslice') == 'arc':
+                band = width / 2.0 / radius
+                if outline: shapes.append((outline, ellipseSpans(box, start, extent, (1 - band, 1 + band))))
+            else:
+                if fill: shapes.append((fill, ellipseSpans(box, start, extent)))
+                if outline and outline != fill:
+                    shapes.append((outline, ellipseSpans(box, start, extent, (1 - width / radius, 1.0))))
+        elif item.kind == 'line':
+            if fill: shapes.append((fill, lineSpans(points, width)))
+        elif item.kind == 'text':
+            font = options.get('font', ('Helvetica', 12))
+            size = len(font) > 1 and int(font[1]) or 12
+            if fill: shapes.append((fill, textSpans(points[0][0], points[0][1], options.get('text', ''),
+                                                    size, options.get('anchor', 'center'))))
+        runs = []
+        for color, spans in shapes:
+            index = PALETTE.index(color)
+            for row, first, end in spans:
+                if row < 0 or row >= self.height: continue
+                first, end = max(first, 0), min(end, self.width)
+                if end > first: runs.append((row * self.width + first, end - first, index))
+        item.spans = runs
+        return runs
+
+    def _paint(self, items, pixels=None):
+        if pixels == None: pixels = bytearray(chr(self.background) * (self.width * self.height))
+        for item in items:
+            for offset, length, index in self._spans(item):
+                pixels[offset:offset + length] = chr(index) * length
+        return pixels
+
+    def render(self):
+        "The current picture, as a bytearray of palette indices, row by row"
+        items = [self.items[i] for i in self.order]
+        if self.staticLayer == None:
+            return self._paint(items)
+        lastStatic = max([k for k, item in enumerate(items) if item.static] or [-1])
+        under = [item for item in items[:lastStatic] if item.lowered and not item.static]
+        over = [item for k, item in enumerate(items) if not item.static and not (item.lowered and k < lastStatic)]
+        if under:
+            pixels = self._paint([item for item in items[:lastStatic + 1] if item.static or item.lowered])
+        else:
+            pixels = bytearray(self.staticLayer)
+        return self._paint(over, pixels)
+
+# Rasterised static layers: key -> (pixels, spans of each static item)
+STATIC_LAYERS = {}
+
+def installCanvas(width, height, background):
+    "Makes graphicsUtils draw on a new RasterCanvas instead of a Tk window"
+    canvas = RasterCanvas(width, height, background)
+    graphicsUtils._canvas = canvas
+    graphicsUtils._canvas_xs, graphicsUtils._canvas_ys = width - 1, height - 1
+    graphicsUtils._canvas_x, graphicsUtils._canvas_y = 0, height - 1
+    graphicsUtils._bg_color = background
+    graphicsUtils.draw_background()
+    return canvas
+
+################
+# Image files #
+################
+
+def pngChunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def writePNG(path, width, height, rgb):
+    "Writes an RGB buffer, row by row, as a PNG file"
+    stride = 3 * width
+    rows = ''.join(['\x00' + str(rgb[row * stride:(row + 1) * stride]) for row in range(height)])
+    with open(path, 'wb') as handle:
+        handle.write('\x89PNG\r\n\x1a\n')
+        handle.write(pngChunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        handle.write(pngChunk('IDAT', zlib.compress(rows, 6)))
+        handle.write(pngChunk('IEND', ''))
+
+def lzwEncode(pixels, minCodeSize=8):
+    "GIF flavoured LZW compression of a string of palette indices"
+    clearCode, endCode = 1 << minCodeSize, (1 << minCodeSize) + 1
+    output = bytearray()
+    state = [0, 0, minCodeSize + 1]   # bit buffer, bits in it, code size
+
+    def emit(code):
+        state[0] |= code << state[1]
+        state[1] += state[2]
+        while state[1] >= 8:
+            output.append(state[0] & 255)
+            state[0] >>= 8
+            state[1] -= 8
+        if nextCode[0] >= 1 << state[2] and state[2] < 12:
+            state[2] += 1
+
+    nextCode = [endCode + 1]
+    table = {}
+    emit(clearCode)
+    prefix = ord(pixels[0])
+    for character in pixels[1:]:
+        byte = ord(character)
+        key = (prefix << 8) | byte
+        code = table.get(key)
+        if code != None:
+            prefix = code
+            continue
+        emit(prefix)
+        if nextCode[0] < 4095:
+            table[key] = nextCode[0]
+            nextCode[0] += 1
+        else:
+            emit(clearCode)
+            table = {}
+            nextCode[0] = endCode + 1
+            state[2] = minCodeSize + 1
+        prefix = byte
+    emit(prefix)
+    emit(endCode)
+    if state[1] > 0: output.append(state[0] & 255)
+    return str(output)
+
+def changedBox(previous, pixels, width, height):
+    "The smallest (left, top, right, bottom) box holding every changed pixel, or None"
+    rows = [row for row in range(height)
+            if previous[row * width:(row + 1) * width] != pixels[row * width:(row + 1) * width]]
+    if not rows: return None
+    left, right = width, 0
+    for row in rows:
+        base = row * width
+        # Binary searches for the first and last differing columns
+        lo, hi = 0, left
+        while lo < hi:
+            mid = (lo + hi) / 2
+            if previous[base:base + mid + 1] != pixels[base:base + mid + 1]: hi = mid
+            else: lo = mid + 1
+        left = lo
+        lo, hi = right, width
+        while lo < hi:
+            mid = (lo + hi) / 2
+            if previous[base + mid:base + width] != pixels[base + mid:base + width]: lo = mid + 1
+            else: hi = mid
+        right = lo
+    return left, rows[0], right, rows[-1] + 1
+
+def gifHeader(width, height):
+    "The GIF signature, screen descriptor and (global) palette"
+    return 'GIF89a' + struct.pack('<HHBBB', width, height, 0xF7, 0, 0) + PALETTE.toString()
+
+def gifImage(pixels, width, box, delay=0, transparent=None):
+    """
+    One GIF image of the box (left, top, right, bottom) of pixels, shown
+    for delay hundredths of a second over the previous image.  Pixels of
+    the palette index transparent, if given, show what is beneath.
+    """
+    left, top, right, bottom = box
+    data = ''.join([str(pixels[row * width + left:row * width + right])
+                    for row in range(top, bottom)])
+    # Graphic control: keep the previous frame under this one
+    flags = transparent == None and 0x04 or 0x05
+    chunks = ['\x21\xF9\x04' + struct.pack('<BHBB', flags, delay, transparent or 0, 0)]
+    chunks.append('\x2C' + struct.pack('<HHHHB', left, top, right - left, bottom - top, 0))
+    compressed = lzwEncode(data)
+    chunks.append('\x08')
+    for i in range(0, len(compressed), 255):
+        block = compressed[i:i + 255]
+        chunks.append(chr(len(block)) + block)
+    chunks.append('\x00')
+    return ''.join(chunks)
+
+class GifWriter:
+    """
+    Writes an animated GIF frame by frame.  Each frame after the first only
+    stores the box of pixels which changed.  The palette is frozen when the
+    file is opened, as GIF colour tables come first.
+    """
+    def __init__(self, path, width, height, delay=0.1):
+        self.width, self.height = width, height
+        self.delay = max(1, int(round(100 * delay)))
+        self.previous = None
+        PALETTE.frozen = True
+        self.handle = open(path, 'wb')
+        self.handle.write(gifHeader(width, height))
+        self.handle.write('\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')  # Loop forever
+
+    def addFrame(self, pixels):
+        box = (0, 0, self.width, self.height)
+        if self.previous != None:
+            box = changedBox(self.previous, pixels, self.width, self.height) or (0, 0, 1, 1)
+        self.previous = pixels
+        self.handle.write(gifImage(pixels, self.width, box, self.delay))
+
+    def close(self):
+        self.handle.write('\x3B')
+        self.handle.close()
+
+def shapesToGif(width, height, shapes, background):
+    """
+    Renders shapes made by graphicsUtils.circle_shape and line_shape as a
+    still GIF whose background is transparent, encoded in base64 as
+    Tkinter.PhotoImage(data=...) expects.
+    """
+    canvas = RasterCanvas(width, height, background)
+    for kind, coords, options in shapes:
+        getattr(canvas, 'create_' + kind)(*coords, **options)
+    pixels = canvas.render()
+    box = (0, 0, canvas.width, canvas.height)
+    data = gifHeader(canvas.width, canvas.height) + gifImage(pixels, canvas.width, box, 0, canvas.background) + '\x3B'
+    return base64.b64encode(data)
+
+###############
+# The display #
+###############
+
+class OffscreenGraphics(graphicsDisplay.PacmanGraphics):
+    """
+    A PacmanGraphics which saves a frame after initialize, every update
+    (every round with batchFrames), each drawing of the expanded cells and
+    updateDistributions: as frame_00000000.png, ... in outputDirectory
+    and/or as frames of an animated GIF at gifPath, frameDelay seconds apart.
+    """
+    def __init__(self, zoom=1.0, capture=False, outputDirectory=None, gifPath=None,
+                 frameDelay=0.1, batchFrames=False):
+        graphicsDisplay.PacmanGraphics.__init__(self, zoom, frameTime=0, capture=capture,
+                                                batchFrames=batchFrames)
+        self.outputDirectory = outputDirectory
+        self.gifPath = gifPath
+        self.frameDelay = frameDelay
+        self.framesWritten = 0
+        self.gif = None
+
+    def make_window(self, width, height):
+        screenWidth, screenHeight = self.windowSize(width, height)
+        self.canvas = installCanvas(screenWidth, screenHeight, graphicsDisplay.BACKGROUND_COLOR)
+
+    def drawStaticObjects(self, state):
+        firstWall = self.canvas.nextId
+        self.drawWalls(self.layout.walls)
+        key = (self.canvas.width, self.canvas.height, self.gridSize, self.capture, str(self.layout.walls))
+        self.canvas.freezeStatic([1] + range(firstWall, self.canvas.nextId), key)
+        self.food = self.drawFood(self.layout.food)
+        self.capsules = self.drawCapsules(self.layout.capsules)
+
+    def initialize(self, state, isBlue=False):
+        graphicsDisplay.PacmanGraphics.initialize(self, state, isBlue)
+        self.saveFrame()
+
+    def showState(self, state):
+        graphicsDisplay.PacmanGraphics.showState(self, state)
+        self.saveFrame()
+
+    def update(self, newState):
+        graphicsDisplay.PacmanGraphics.update(self, newState)
+        if not self.batchFrames: self.saveFrame()
+
+    def drawFrame(self):
+        graphicsDisplay.PacmanGraphics.drawFrame(self)
+        self.saveFrame()
+
+    def redrawExpandedCells(self):
+        graphicsDisplay.PacmanGraphics.redrawExpandedCells(self)
+        self.saveFrame()
+
+    def updateDistributions(self, distributions):
+        graphicsDisplay.PacmanGraphics.updateDistributions(self, distributions)
+        self.saveFrame()
+
+    def saveFrame(self):
+        pixels = self.canvas.render()
+        width, height = self.canvas.width, self.canvas.height
+        if self.outputDirectory != None:
+            if not os.path.isdir(self.outputDirectory): os.makedirs(self.outputDirectory)
+            path = os.path.join(self.outputDirectory, 'frame_%08d.png' % self.framesWritten)
+            writePNG(path, width, height, PALETTE.toRGB(pixels))
+        if self.gifPath != None:
+            if self.gif == None: self.gif = GifWriter(self.gifPath, width, height, self.frameDelay)
+            self.gif.addFrame(pixels)
+        self.framesWritten += 1
+
+    def finish(self):
+        if self.batchFrames and (self.pendingAgents or self.pendingInfo != None):
+            self.drawFrame()
+        if self.gif != None:
+            self.gif.close()
+            self.gif = None
+        if graphicsUtils._canvas is self.canvas: graphicsUtils._canvas = None
+        targets = [t for t in [self.outputDirectory, self.gifPath] if t != None]
+        print 'Wrote %d frames to %s' % (self.framesWritten, ' and '.join(targets))
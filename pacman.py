@@ -271,11 +271,11 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, profiler=None):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, profiler=profiler)
         game.state = initState
         self.initialState = initState.deepCopy()
         self.quiet = quiet
@@ -498,6 +498,8 @@ def readCommand( argv ):
                       metavar='TYPE', default='KeyboardAgent')
     parser.add_option('-t', '--textGraphics', action='store_true', dest='textGraphics',
                       help='Display output as text only', default=False)
+    parser.add_option('--ansi', action='store_true', dest='ansiGraphics',
+                      help='Display output as text, redrawing only the changed cells of the terminal', default=False)
     parser.add_option('-q', '--quietTextGraphics', action='store_true', dest='quietGraphics',
                       help='Generate minimal output and no graphics', default=False)
     parser.add_option('-g', '--ghosts', dest='ghost',
@@ -519,10 +521,26 @@ def readCommand( argv ):
                       help=default('How many episodes are training (suppresses output)'), default=0)
     parser.add_option('--frameTime', dest='frameTime', type='float',
                       help=default('Time to delay between frames; <0 means keyboard'), default=0.1)
+    parser.add_option('--batchFrames', action='store_true', dest='batchFrames',
+                      help='Draw each round of moves as one canvas update instead of animating every move', default=False)
+    parser.add_option('--fps', dest='fps', type='float',
+                      help=default('Target rounds per second for batched frames, dropping frames when behind; 0 draws every round'), default=0)
+    parser.add_option('--wallImage', action='store_true', dest='wallImage',
+                      help='Draw the walls as one pre-rendered image instead of a canvas item per arc and line', default=False)
+    parser.add_option('--offscreen', dest='offscreen',
+                      help='Render without a window, saving a PNG file per frame in this directory', default=None)
+    parser.add_option('--gif', dest='gif',
+                      help='Render without a window, saving the game as this animated GIF (--frameTime apart)', default=None)
+    parser.add_option('--stream', dest='stream', metavar='FILE|host:port',
+                      help='Run without graphics, streaming the games to this file or to viewers (streamDisplay.py) connecting to this port', default=None)
     parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions',
                       help='Turns on exception handling and timeouts during games', default=False)
-    parser.add_option('--timeout', dest='timeout', type='int',
+    parser.add_option('--timeout', dest='timeout', type='float',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--profile', dest='profile',
+                      help='Records per-agent latency histograms and writes them to this JSON file', default=None)
+    parser.add_option('--profileMoves', dest='profileMoves', type='int',
+                      help=default('Number of slowest moves to keep cProfile statistics for (with --profile)'), default=0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -537,7 +555,9 @@ def readCommand( argv ):
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent
-    noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
+    noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics or
+                                                   options.ansiGraphics or options.offscreen != None or
+                                                   options.gif != None or options.stream != None)
     pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
@@ -563,13 +583,29 @@ def readCommand( argv ):
         import textDisplay
         textDisplay.SLEEP_TIME = options.frameTime
         args['display'] = textDisplay.PacmanGraphics()
+    elif options.ansiGraphics:
+        import textDisplay
+        textDisplay.SLEEP_TIME = options.frameTime
+        args['display'] = textDisplay.AnsiGraphics()
+    elif options.stream != None:
+        import streamDisplay
+        args['display'] = streamDisplay.StreamGraphics(options.stream)
+    elif options.offscreen != None or options.gif != None:
+        import offscreenDisplay
+        args['display'] = offscreenDisplay.OffscreenGraphics(options.zoom, outputDirectory = options.offscreen,
+                                                             gifPath = options.gif, frameDelay = abs(options.frameTime),
+                                                             batchFrames = options.batchFrames)
     else:
         import graphicsDisplay
-        args['display'] = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
+        args['display'] = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime,
+                                                          batchFrames = options.batchFrames, fps = options.fps,
+                                                          wallImage = options.wallImage)
     args['numGames'] = options.numGames
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['profile'] = options.profile
+    args['profileMoves'] = options.profileMoves
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
@@ -608,29 +644,20 @@ def loadAgent(pacman, nographics):
     raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
 
 def replayGame( layout, actions, display ):
-    import pacmanAgents, ghostAgents
-    rules = ClassicGameRules()
-    agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(layout.getNumGhosts())]
-    game = rules.newGame( layout, agents[0], agents[1:], display )
-    state = game.state
-    display.initialize(state.data)
-
-    for action in actions:
-            # Execute the action
-        state = state.generateSuccessor( *action )
-        # Change the display
-        display.update( state.data )
-        # Allow for game specific conditions (winning, losing, etc.)
-        rules.process(state, game)
-
-    display.finish()
-
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+    import gameReplay
+    replay = gameReplay.Replay( layout, actions )
+    replay.play( display )
+    score = replay.scores[-1]
+    if replay.won: print "Pacman emerges victorious! Score: %d" % score
+    if replay.lost: print "Pacman died! Score: %d" % score
+
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, profile=None, profileMoves=0 ):
     import __main__
     __main__.__dict__['_display'] = display
 
     rules = ClassicGameRules(timeout)
     games = []
+    profilers = []
 
     for i in range( numGames ):
         beQuiet = i < numTraining
@@ -642,7 +669,12 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
+        profiler = None
+        if profile != None:
+            import gameProfiler
+            profiler = gameProfiler.GameProfiler(profileMoves)
+            profilers.append(profiler)
+        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, profiler)
         game.run()
         if not beQuiet: games.append(game)
 
@@ -663,6 +695,11 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
         print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
 
+    if profile != None and len(profilers) > 0:
+        gameProfiler.writeReports(profilers, profile)
+        print 'Latencies of the last game (all games written to %s):' % profile
+        profilers[-1].printSummary()
+
     return games
 
 if __name__ == '__main__':
@@ -678,7 +715,5 @@ if __name__ == '__main__':
     """
     args = readCommand( sys.argv[1:] ) # Get game components based on input
     runGames( **args )
-
-    # import cProfile
-    # cProfile.run("runGames( **args )")
+    if 'close' in dir(args['display']): args['display'].close() # Streams
     pass
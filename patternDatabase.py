@@ -0,0 +1,252 @@
+# patternDatabase.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Additive pattern database heuristics for sliding tile puzzles.
+
+A pattern database stores, for every placement of a subset of the tiles
+(the pattern), the number of moves of pattern tiles needed to bring them to
+their goal cells, counting neither moves of other tiles nor moves needed to
+bring the blank into place.  Since each move of the puzzle moves a single
+tile, the values of databases over disjoint patterns can be added and the
+sum is still admissible and consistent.  The goal has the blank in cell 0
+and tile t in cell t, as in eightpuzzle.py.
+
+Each table is a byte array with one entry per placement, indexed by the
+cells of the pattern tiles as the digits of a number in base width*height.
+Tables are saved under __pycache__ and memory-mapped by later runs, which
+therefore start at once.
+
+  python patternDatabase.py -n 20 -m 60     # A*: Manhattan against the databases
+"""
+
+import collections
+import mmap
+import optparse
+import os
+import random
+import sys
+import time
+
+CACHE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__pycache__')
+CACHE_VERSION = 2
+UNKNOWN = 255
+
+# Disjoint patterns which cover every tile
+DEFAULT_PARTITIONS = {
+    (3, 3): ((1, 2, 3, 4), (5, 6, 7, 8)),
+    (4, 4): ((1, 4, 5, 8, 9), (2, 3, 6, 7, 11), (10, 12, 13, 14, 15))}
+
+def neighborCells(width, height):
+    "For each cell, the cells next to it"
+    neighbors = []
+    for cell in range(width * height):
+        row, col = divmod(cell, width)
+        cells = []
+        if row != 0: cells.append(cell - width)
+        if row != height - 1: cells.append(cell + width)
+        if col != 0: cells.append(cell - 1)
+        if col != width - 1: cells.append(cell + 1)
+        neighbors.append(cells)
+    return neighbors
+
+def buildTable(width, height, tiles):
+    """
+    Returns the pattern database of tiles as a bytearray, found by breadth
+    first search from the goal placement.  A move takes a pattern tile to a
+    neighboring cell which holds no other pattern tile: the blank is
+    assumed to be wherever it is needed.  Every move of the puzzle is such
+    a move or leaves the placement alone, so the databases are consistent.
+    """
+    n = width * height
+    k = len(tiles)
+    neighbors = neighborCells(width, height)
+    digits = [n ** (k - 1 - i) for i in range(k)]
+    table = bytearray([UNKNOWN]) * (n ** k)
+    goalIndex = sum([tile * digit for tile, digit in zip(tiles, digits)])
+    table[goalIndex] = 0
+    frontier = collections.deque([goalIndex])
+    while frontier:
+        index = frontier.popleft()
+        distance = min(table[index] + 1, UNKNOWN - 1)
+        cells = []
+        rest = index
+        for i in range(k):
+            rest, cell = divmod(rest, n)
+            cells.append(cell)
+        cells.reverse()
+        for i, cell in enumerate(cells):
+            for nextCell in neighbors[cell]:
+                if nextCell in cells: continue
+                nextIndex = index + (nextCell - cell) * digits[i]
+                if table[nextIndex] == UNKNOWN:
+                    table[nextIndex] = distance
+                    frontier.append(nextIndex)
+    return table
+
+def cachePath(width, height, tiles):
+    return os.path.join(CACHE_DIRECTORY, 'pdb_v%d_%dx%d_%s.bin' %
+                        (CACHE_VERSION, width, height, '-'.join(map(str, tiles))))
+
+def writeTable(path, table):
+    "Stores a table; failures (e.g. a read-only directory) are ignored"
+    temporary = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(temporary, 'wb') as handle:
+            handle.write(table)
+        os.rename(temporary, path)
+    except (IOError, OSError):
+        pass
+
+def mapTable(path, size):
+    "Memory-maps a stored table, or returns None if there is no valid one"
+    try:
+        with open(path, 'rb') as handle:
+            if os.fstat(handle.fileno()).st_size != size: return None
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError, mmap.error):
+        return None
+
+class PatternDatabase:
+    """
+    The pattern database of some tiles of a width x height puzzle, loaded
+    from the cache or built and then cached.
+    """
+    def __init__(self, width, height, tiles, useCache=True):
+        self.width = width
+        self.height = height
+        self.tiles = tuple(tiles)
+        n = width * height
+        self.digits = [(tile, n ** (len(tiles) - 1 - i)) for i, tile in enumerate(tiles)]
+        path = cachePath(width, height, self.tiles)
+        self.table = useCache and mapTable(path, n ** len(tiles)) or None
+        if self.table == None:
+            table = buildTable(width, height, self.tiles)
+            if useCache: writeTable(path, table)
+            self.table = str(table)
+
+    def lookup(self, positions):
+        "positions[tile] is the cell of tile"
+        index = 0
+        for tile, digit in self.digits:
+            index += positions[tile] * digit
+        return ord(self.table[index])
+
+def tilePositions(state, size):
+    """
+    Returns positions, where positions[tile] is the cell of tile, for a
+    state with the tiles packed four bits per cell into state.packed (as
+    eightpuzzle.EightPuzzleState) or with a 2-dimensional list state.cells.
+    """
+    positions = [0] * size
+    if hasattr(state, 'packed') and size <= 16:
+        packed = state.packed
+        for cell in range(size):
+            positions[packed & 15] = cell
+            packed >>= 4
+    else:
+        cell = 0
+        for row in state.cells:
+            for tile in row:
+                positions[tile] = cell
+                cell += 1
+    return positions
+
+class AdditivePatternDatabase:
+    """
+    A heuristic summing pattern databases over disjoint sets of tiles; call
+    it as heuristic(state, problem), e.g. search.astar(problem, heuristic).
+    """
+    def __init__(self, width, height, partition=None, useCache=True):
+        if partition == None: partition = DEFAULT_PARTITIONS[(width, height)]
+        tiles = [tile for pattern in partition for tile in pattern]
+        if len(set(tiles)) != len(tiles) or 0 in tiles:
+            raise Exception('Patterns must be disjoint sets of tiles: %s' % (partition,))
+        self.size = width * height
+        self.databases = [PatternDatabase(width, height, pattern, useCache) for pattern in partition]
+
+    def __call__(self, state, problem=None):
+        positions = tilePositions(state, self.size)
+        return sum([database.lookup(positions) for database in self.databases])
+
+# Heuristics, keyed by puzzle size and partition, shared by all callers
+HEURISTIC_CACHE = {}
+
+def getHeuristic(width=3, height=3, partition=None):
+    key = (width, height, partition)
+    if key not in HEURISTIC_CACHE:
+        HEURISTIC_CACHE[key] = AdditivePatternDatabase(width, height, partition)
+    return HEURISTIC_CACHE[key]
+
+def eightPuzzleHeuristic(state, problem=None):
+    "The default additive pattern database heuristic for the eight puzzle"
+    return getHeuristic(3, 3)(state, problem)
+
+class CountingProblem:
+    "Counts the expansions of a search problem"
+    def __init__(self, problem):
+        self.problem = problem
+        self.expanded = 0
+
+    def getStartState(self): return self.problem.getStartState()
+    def isGoalState(self, state): return self.problem.isGoalState(state)
+    def getCostOfActions(self, actions): return self.problem.getCostOfActions(actions)
+
+    def getSuccessors(self, state):
+        self.expanded += 1
+        return self.problem.getSuccessors(state)
+
+def runBenchmark(numPuzzles, moves, seed):
+    import eightpuzzle
+    import search
+    start = time.time()
+    pdb = getHeuristic(3, 3)
+    print 'Pattern databases ready in %.2f seconds' % (time.time() - start)
+    heuristics = [('manhattan', eightpuzzle.manhattanHeuristic), ('pdb', pdb)]
+    random.seed(seed)
+    totals = dict([(name, [0, 0.0]) for name, h in heuristics])
+    print '%-8s %6s %12s %10s %12s %10s' % ('Puzzle', 'Length', 'Manhattan', 'Seconds', 'PDB', 'Seconds')
+    for i in range(numPuzzles):
+        puzzle = eightpuzzle.createRandomEightPuzzle(moves)
+        row = []
+        for name, heuristic in heuristics:
+            problem = CountingProblem(eightpuzzle.EightPuzzleSearchProblem(puzzle))
+            begin = time.time()
+            path = search.astar(problem, heuristic)
+            elapsed = time.time() - begin
+            totals[name][0] += problem.expanded
+            totals[name][1] += elapsed
+            row += [problem.expanded, elapsed]
+        print '%-8d %6d %12d %10.3f %12d %10.3f' % tuple([i, len(path)] + row)
+    print '%-8s %6s %12d %10.3f %12d %10.3f' % ('Total', '', totals['manhattan'][0], totals['manhattan'][1],
+                                               totals['pdb'][0], totals['pdb'][1])
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Compare A* with pattern databases and Manhattan distance')
+    parser.add_option('-n', '--puzzles', dest='puzzles', type='int', default=20,
+                      help='Number of random eight puzzles [Default: %default]')
+    parser.add_option('-m', '--moves', dest='moves', type='int', default=60,
+                      help='Random moves used to scramble each puzzle [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', type='int', default=0,
+                      help='Random seed [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    runBenchmark(options.puzzles, options.moves, options.seed)
@@ -0,0 +1,252 @@
+# searchBenchmark.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Benchmarks search functions against search problems on bundled layouts.
+
+Every combination of layout, problem class (from searchAgents.py), search
+function (from search.py) and, for functions that take one, heuristic is run
+in its own process.  For each run the harness records wall time, nodes
+expanded (problem._expanded), the peak size of the util.Stack, util.Queue or
+util.PriorityQueue frontier, the growth of peak memory and the cost of the
+returned path, then prints a table and optionally writes a CSV file:
+
+  python searchBenchmark.py -l mediumMaze,bigMaze -f bfs,ucs,astar \\
+      -H nullHeuristic,manhattanHeuristic --csv search.csv
+  python searchBenchmark.py -l mediumCorners -p CornersProblem -f astar -H cornersHeuristic
+"""
+
+import csv
+import optparse
+import os
+import resource
+import signal
+import sys
+import time
+import traceback
+
+import cPickle
+
+import layout
+import pacman
+import util
+
+COLUMNS = ['layout', 'problem', 'function', 'heuristic', 'status',
+           'seconds', 'expanded', 'maxFrontier', 'peakMemoryKB', 'pathLength', 'cost']
+
+class FrontierMonitor:
+    """
+    Tracks the largest size reached by any util.Stack, util.Queue or
+    util.PriorityQueue while installed.  Frontiers kept in other data
+    structures are not seen and leave maxFrontier at 0.
+    """
+    def __init__(self):
+        self.maxFrontier = 0
+        self.originals = []
+
+    def _watch(self, cls, methodName, attribute):
+        original = getattr(cls, methodName)
+        monitor = self
+        def watched(container, *args):
+            result = original(container, *args)
+            size = len(getattr(container, attribute))
+            if size > monitor.maxFrontier: monitor.maxFrontier = size
+            return result
+        self.originals.append((cls, methodName, original))
+        setattr(cls, methodName, watched)
+
+    def install(self):
+        self._watch(util.Stack, 'push', 'list')
+        self._watch(util.Queue, 'push', 'list')
+        self._watch(util.PriorityQueue, 'push', 'heap')
+        self._watch(util.PriorityQueue, 'update', 'heap')
+
+    def uninstall(self):
+        for cls, methodName, original in reversed(self.originals):
+            setattr(cls, methodName, original)
+        self.originals = []
+
+def lookup(name, modules):
+    for module in modules:
+        if hasattr(module, name): return getattr(module, name)
+    raise Exception('%s is not defined in %s' % (name, ', '.join([m.__name__ for m in modules])))
+
+def takesHeuristic(function):
+    return 'heuristic' in function.func_code.co_varnames[:function.func_code.co_argcount]
+
+def peakMemoryKB():
+    "Peak resident set size of this process (kilobytes on Linux, bytes on OS X)"
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def runOne(layoutName, problemName, functionName, heuristicName):
+    """
+    Runs a single search and returns a row of results.  Run in a child
+    process so that peak memory and monkey-patched util classes do not leak
+    between runs.
+    """
+    import search
+    import searchAgents
+    row = {'layout': layoutName, 'problem': problemName,
+           'function': functionName, 'heuristic': heuristicName or ''}
+    gameState = pacman.GameState()
+    gameState.initialize(layout.getLayout(layoutName), 0)
+    problem = lookup(problemName, [searchAgents, search])(gameState)
+    function = lookup(functionName, [search, searchAgents])
+    args = [problem]
+    if heuristicName: args.append(lookup(heuristicName, [searchAgents, search]))
+
+    monitor = FrontierMonitor()
+    memoryBefore = peakMemoryKB()
+    monitor.install()
+    try:
+        start = time.time()
+        path = function(*args)
+        row['seconds'] = time.time() - start
+    finally:
+        monitor.uninstall()
+    row['peakMemoryKB'] = peakMemoryKB() - memoryBefore
+    row['maxFrontier'] = monitor.maxFrontier
+    row['expanded'] = getattr(problem, '_expanded', '')
+    if path is None:
+        row['pathLength'] = ''
+        row['cost'] = ''
+        row['status'] = 'no path'
+    else:
+        row['pathLength'] = len(path)
+        row['cost'] = problem.getCostOfActions(path)
+        row['status'] = 'ok'
+    return row
+
+def runIsolated(timeout, *args):
+    """
+    Runs runOne(*args) in a forked child, killing it after timeout seconds.
+    Output of the search code is discarded.
+    """
+    readEnd, writeEnd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(readEnd)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        try:
+            try:
+                result = runOne(*args)
+            except Exception, e:
+                result = {'status': 'error: %s' % str(e).strip().split('\n')[-1]}
+                traceback.print_exc()
+            out = os.fdopen(writeEnd, 'wb')
+            cPickle.dump(result, out, cPickle.HIGHEST_PROTOCOL)
+            out.close()
+        finally:
+            os._exit(0)
+
+    os.close(writeEnd)
+    data = []
+    def onTimeout(signum, frame):
+        raise util.TimeoutFunctionException()
+    oldHandler = signal.signal(signal.SIGALRM, onTimeout)
+    signal.alarm(timeout)
+    try:
+        try:
+            while True:
+                chunk = os.read(readEnd, 65536)
+                if not chunk: break
+                data.append(chunk)
+            signal.alarm(0)
+            os.waitpid(pid, 0)
+        except util.TimeoutFunctionException:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            return {'status': 'timeout'}
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, oldHandler)
+        os.close(readEnd)
+    if not data: return {'status': 'crashed'}
+    return cPickle.loads(''.join(data))
+
+def runBenchmarks(layoutNames, problemNames, functionNames, heuristicNames, timeout):
+    import search
+    import searchAgents
+    rows = []
+    for layoutName in layoutNames:
+        if layout.getLayout(layoutName) == None:
+            raise Exception("The layout " + layoutName + " cannot be found")
+        for problemName in problemNames:
+            for functionName in functionNames:
+                function = lookup(functionName, [search, searchAgents])
+                for heuristicName in (takesHeuristic(function) and heuristicNames or [None]):
+                    args = (layoutName, problemName, functionName, heuristicName)
+                    row = dict([(c, '') for c in COLUMNS])
+                    row.update(dict(zip(COLUMNS, args)))
+                    row.update(runIsolated(timeout, *args))
+                    row['heuristic'] = row['heuristic'] or ''
+                    printRow(row)
+                    rows.append(row)
+    return rows
+
+TABLE_FORMAT = '%-20s %-22s %-8s %-22s %-10s %9s %9s %9s %10s %7s %8s'
+
+def formatValue(value):
+    if isinstance(value, float): return '%.3f' % value
+    return str(value)
+
+def printHeader():
+    print TABLE_FORMAT % ('Layout', 'Problem', 'Function', 'Heuristic', 'Status', 'Seconds',
+                          'Expanded', 'Frontier', 'Memory KB', 'Length', 'Cost')
+
+def printRow(row):
+    print TABLE_FORMAT % tuple([formatValue(row[c])[:22] for c in COLUMNS])
+    sys.stdout.flush()
+
+def writeCsv(rows, path):
+    f = open(path, 'wb')
+    try:
+        writer = csv.DictWriter(f, COLUMNS)
+        writer.writerow(dict(zip(COLUMNS, COLUMNS)))
+        for row in rows:
+            writer.writerow(dict([(c, row[c]) for c in COLUMNS]))
+    finally:
+        f.close()
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Benchmark search functions on search problems')
+    parser.add_option('-l', '--layouts', dest='layouts', default=None,
+                      help='Comma separated layouts [Default: all bundled layouts]')
+    parser.add_option('-p', '--problems', dest='problems', default='PositionSearchProblem',
+                      help='Comma separated problem classes from searchAgents.py [Default: %default]')
+    parser.add_option('-f', '--functions', dest='functions', default='dfs,bfs,ucs,astar',
+                      help='Comma separated search functions from search.py [Default: %default]')
+    parser.add_option('-H', '--heuristics', dest='heuristics', default='nullHeuristic',
+                      help='Comma separated heuristics for functions that take one [Default: %default]')
+    parser.add_option('-t', '--timeout', dest='timeout', type='int', default=60,
+                      help='Seconds before a single run is abandoned [Default: %default]')
+    parser.add_option('--csv', dest='csv', default=None,
+                      help='Also write the results to this CSV file')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    if options.layouts != None:
+        layoutNames = options.layouts.split(',')
+    else:
+        layoutNames = sorted([f[:-4] for f in os.listdir('layouts') if f.endswith('.lay')])
+    printHeader()
+    rows = runBenchmarks(layoutNames, options.problems.split(','), options.functions.split(','),
+                         options.heuristics.split(','), options.timeout)
+    if options.csv != None:
+        writeCsv(rows, options.csv)
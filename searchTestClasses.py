@@ -12,9 +12,14 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import array
+import gc
+import grading
+import heuristicChecker
 import re
 import testClasses
 import textwrap
+import util
 
 # import project specific code
 import layout
@@ -50,49 +55,98 @@ def checkSolution(problem, path):
     state = followAction(state, action, problem)
   return problem.isGoalState(state)
 
+# Parsed graphs, keyed by graph text.  Shared between GraphSearch instances,
+# which only ever read them.
+GRAPH_CACHE = {}
+
+# A graph specification, parsed.  successors maps a state to its
+# (next_state, action, cost) list in file order; transitions maps a state to
+# a dict of action -> (next_state, cost), as followed by getCostOfActions; and
+# states are numbered so expansion order can be kept in an array.
+class ParsedGraph:
+    def __init__(self, start_state, goals, successors, orderedSuccessorTuples):
+        self.start_state = start_state
+        self.goals = goals
+        self.goalSet = frozenset(goals)
+        self.successors = successors
+        self.orderedSuccessorTuples = orderedSuccessorTuples
+        self.states = sorted(successors)
+        # state -> (state id, successors), so expansion needs a single lookup
+        self.entries = dict([(state, (i, successors[state])) for i, state in enumerate(self.states)])
+        self.transitions = {}
+        for state, stateSuccessors in successors.items():
+            transitions = {}
+            for next_state, action, cost in stateSuccessors:
+                # Repeated actions: the last edge's state, all edges' costs
+                previousCost = transitions.get(action, (None, 0))[1]
+                transitions[action] = (next_state, previousCost + cost)
+            self.transitions[state] = transitions
+
+# Parse a graph specification
+def parseGraph(graph_text):
+    lines = graph_text.split('\n')
+    r = re.match('start_state:(.*)', lines[0])
+    if r == None:
+        print "Broken graph:"
+        print '"""%s"""' % graph_text
+        raise Exception("GraphSearch graph specification start_state not found or incorrect on line:" + lines[0])
+    start_state = r.group(1).strip()
+    r = re.match('goal_states:(.*)', lines[1])
+    if r == None:
+        print "Broken graph:"
+        print '"""%s"""' % graph_text
+        raise Exception("GraphSearch graph specification goal_states not found or incorrect on line:" + lines[1])
+    goals = r.group(1).split()
+    goals = map(str.strip, goals)
+    successors = {}
+    all_states = set()
+    orderedSuccessorTuples = []
+    for l in lines[2:]:
+        tokens = l.split()
+        if len(tokens) == 3:
+            start, action, next_state = tokens
+            cost = 1
+        elif len(tokens) == 4:
+            start, action, next_state, cost = tokens
+        else:
+            print "Broken graph:"
+            print '"""%s"""' % graph_text
+            raise Exception("Invalid line in GraphSearch graph specification on line:" + l)
+        cost = float(cost)
+        orderedSuccessorTuples.append((start, action, next_state, cost))
+        all_states.add(start)
+        all_states.add(next_state)
+        if start not in successors:
+            successors[start] = []
+        successors[start].append((next_state, action, cost))
+    for s in all_states:
+        if s not in successors:
+            successors[s] = []
+    return ParsedGraph(start_state, goals, successors, orderedSuccessorTuples)
+
 # Search problem on a plain graph
 class GraphSearch(SearchProblem):
 
     # Read in the state graph; define start/end states, edges and costs
     def __init__(self, graph_text):
-        self.expanded_states = []
-        lines = graph_text.split('\n')
-        r = re.match('start_state:(.*)', lines[0])
-        if r == None:
-            print "Broken graph:"
-            print '"""%s"""' % graph_text
-            raise Exception("GraphSearch graph specification start_state not found or incorrect on line:" + l)
-        self.start_state = r.group(1).strip()
-        r = re.match('goal_states:(.*)', lines[1])
-        if r == None:
-            print "Broken graph:"
-            print '"""%s"""' % graph_text
-            raise Exception("GraphSearch graph specification goal_states not found or incorrect on line:" + l)
-        goals = r.group(1).split()
-        self.goals = map(str.strip, goals)
-        self.successors = {}
-        all_states = set()
-        self.orderedSuccessorTuples = []
-        for l in lines[2:]:
-            if len(l.split()) == 3:
-                start, action, next_state = l.split()
-                cost = 1
-            elif len(l.split()) == 4:
-                start, action, next_state, cost = l.split()
-            else:
-                print "Broken graph:"
-                print '"""%s"""' % graph_text
-                raise Exception("Invalid line in GraphSearch graph specification on line:" + l)
-            cost = float(cost)
-            self.orderedSuccessorTuples.append((start, action, next_state, cost))
-            all_states.add(start)
-            all_states.add(next_state)
-            if start not in self.successors:
-                self.successors[start] = []
-            self.successors[start].append((next_state, action, cost))
-        for s in all_states:
-            if s not in self.successors:
-                self.successors[s] = []
+        if graph_text not in GRAPH_CACHE:
+            # Generated graphs have millions of edges; parsing creates no
+            # cycles, so spare it the repeated passes of the cyclic collector
+            collecting = gc.isenabled()
+            gc.disable()
+            try:
+                GRAPH_CACHE[graph_text] = parseGraph(graph_text)
+            finally:
+                if collecting: gc.enable()
+        self.graph = GRAPH_CACHE[graph_text]
+        self.start_state = self.graph.start_state
+        self.goals = self.graph.goals
+        self.successors = self.graph.successors
+        self.orderedSuccessorTuples = self.graph.orderedSuccessorTuples
+        # Ids of the expanded states, in expansion order
+        self.expanded_ids = array.array('i')
+        self.entries = self.graph.entries
+        self.recordExpansion = self.expanded_ids.append
 
     # Get start state
     def getStartState(self):
@@ -100,33 +154,31 @@ class GraphSearch(SearchProblem):
 
     # Check if a state is a goal state
     def isGoalState(self, state):
-        return state in self.goals
+        return state in self.graph.goalSet
 
     # Get all successors of a state
     def getSuccessors(self, state):
-        self.expanded_states.append(state)
-        return list(self.successors[state])
+        stateId, successors = self.entries[state]
+        self.recordExpansion(stateId)
+        return list(successors)
 
     # Calculate total cost of a sequence of actions
     def getCostOfActions(self, actions):
         total_cost = 0
         state = self.start_state
+        transitions = self.graph.transitions
         for a in actions:
-            successors = self.successors[state]
-            match = False
-            for (next_state, action, cost) in successors:
-                if a == action:
-                    state = next_state
-                    total_cost += cost
-                    match = True
-            if not match:
+            if a not in transitions[state]:
                 print 'invalid action sequence'
                 sys.exit(1)
+            state, cost = transitions[state][a]
+            total_cost += cost
         return total_cost
 
     # Return a list of all states on which 'getSuccessors' was called
     def getExpandedStates(self):
-        return self.expanded_states
+        states = self.graph.states
+        return [states[i] for i in self.expanded_ids]
 
     def __str__(self):
         print self.successors
@@ -144,8 +196,8 @@ def parseHeuristic(heuristicText):
         tokens = line.split()
         if len(tokens) != 2:
             print "Broken heuristic:"
-            print '"""%s"""' % graph_text
-            raise Exception("GraphSearch heuristic specification broken:" + l)
+            print '"""%s"""' % heuristicText
+            raise Exception("GraphSearch heuristic specification broken:" + line)
         state, h = tokens
         heuristic[state] = float(h)
 
@@ -160,6 +212,15 @@ def parseHeuristic(heuristicText):
 
     return graphHeuristic
 
+# Lists longer than this are cut short in test messages, so that failures on
+# generated graphs with many thousands of states stay readable.
+MAX_LISTED_ITEMS = 100
+
+def abbreviate(items):
+    if items == None or len(items) <= MAX_LISTED_ITEMS:
+        return str(items)
+    return '%s, ... (%d more)]' % (str(items[:MAX_LISTED_ITEMS])[:-1], len(items) - MAX_LISTED_ITEMS)
+
 
 class GraphSearchTest(testClasses.TestCase):
 
@@ -173,12 +234,18 @@ class GraphSearchTest(testClasses.TestCase):
             self.heuristic = parseHeuristic(testDict['heuristic'])
         else:
             self.heuristic = None
+        if 'timeLimit' in testDict:
+            self.timeLimit = float(testDict['timeLimit'])
+        else:
+            self.timeLimit = None
 
     # Note that the return type of this function is a tripple:
     # (solution, expanded states, error message)
     def getSolInfo(self, search):
         alg = getattr(search, self.alg)
         problem = GraphSearch(self.graph_text)
+        if self.timeLimit != None:
+            alg = util.TimeoutFunction(alg, self.timeLimit)
         if self.heuristic != None:
             solution = alg(problem, self.heuristic)
         else:
@@ -198,7 +265,10 @@ class GraphSearchTest(testClasses.TestCase):
         gold_solution = [str.split(solutionDict['solution']), str.split(solutionDict['rev_solution'])]
         gold_expanded_states = [str.split(solutionDict['expanded_states']), str.split(solutionDict['rev_expanded_states'])]
 
-        solution, expanded_states, error = self.getSolInfo(search)
+        try:
+            solution, expanded_states, error = self.getSolInfo(search)
+        except util.TimeoutFunctionException:
+            error = '%s did not finish within the time limit of %g seconds' % (self.alg, self.timeLimit)
         if error != None:
             grades.addMessage('FAIL: %s' % self.path)
             grades.addMessage('\t%s' % error)
@@ -206,21 +276,21 @@ class GraphSearchTest(testClasses.TestCase):
 
         if solution in gold_solution and (not self.exactExpansionOrder or expanded_states in gold_expanded_states):
             grades.addMessage('PASS: %s' % self.path)
-            grades.addMessage('\tsolution:\t\t%s' % solution)
-            grades.addMessage('\texpanded_states:\t%s' % expanded_states)
+            grades.addMessage('\tsolution:\t\t%s' % abbreviate(solution))
+            grades.addMessage('\texpanded_states:\t%s' % abbreviate(expanded_states))
             return True
         else:
             grades.addMessage('FAIL: %s' % self.path)
             grades.addMessage('\tgraph:')
             for line in self.diagram.split('\n'):
                 grades.addMessage('\t    %s' % (line,))
-            grades.addMessage('\tstudent solution:\t\t%s' % solution)
-            grades.addMessage('\tstudent expanded_states:\t%s' % expanded_states)
+            grades.addMessage('\tstudent solution:\t\t%s' % abbreviate(solution))
+            grades.addMessage('\tstudent expanded_states:\t%s' % abbreviate(expanded_states))
             grades.addMessage('')
-            grades.addMessage('\tcorrect solution:\t\t%s' % gold_solution[0])
-            grades.addMessage('\tcorrect expanded_states:\t%s' % gold_expanded_states[0])
-            grades.addMessage('\tcorrect rev_solution:\t\t%s' % gold_solution[1])
-            grades.addMessage('\tcorrect rev_expanded_states:\t%s' % gold_expanded_states[1])
+            grades.addMessage('\tcorrect solution:\t\t%s' % abbreviate(gold_solution[0]))
+            grades.addMessage('\tcorrect expanded_states:\t%s' % abbreviate(gold_expanded_states[0]))
+            grades.addMessage('\tcorrect rev_solution:\t\t%s' % abbreviate(gold_solution[1]))
+            grades.addMessage('\tcorrect rev_expanded_states:\t%s' % abbreviate(gold_expanded_states[1]))
             return False
 
     def writeSolution(self, moduleDict, filePath):
@@ -269,7 +339,7 @@ class PacmanSearchTest(testClasses.TestCase):
 
     def getSolInfo(self, search, searchAgents):
         alg = getattr(search, self.alg)
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.getLayoutFromText(self.layout_text)
         start_state = pacman.GameState()
         start_state.initialize(lay, 0)
 
@@ -386,7 +456,7 @@ class CornerProblemTest(testClasses.TestCase):
         self.layoutName = testDict['layoutName']
 
     def solution(self, search, searchAgents):
-        lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+        lay = layout.getLayoutFromText(self.layoutText)
         gameState = pacman.GameState()
         gameState.initialize(lay, 0)
         problem = searchAgents.CornersProblem(gameState)
@@ -472,9 +542,11 @@ class HeuristicTest(testClasses.TestCase):
         self.layoutName = testDict['layoutName']
         self.searchProblemClassName = testDict['searchProblemClass']
         self.heuristicName = testDict['heuristic']
+        # Also check every reachable state (heuristicChecker); slower
+        self.checkAllStates = testDict.get('checkAllStates', 'False').lower() == "true"
 
     def setupProblem(self, searchAgents):
-        lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+        lay = layout.getLayoutFromText(self.layoutText)
         gameState = pacman.GameState()
         gameState.initialize(lay, 0)
         problemClass = getattr(searchAgents, self.searchProblemClassName)
@@ -484,7 +556,7 @@ class HeuristicTest(testClasses.TestCase):
 
         return problem, state, heuristic
 
-    def checkHeuristic(self, heuristic, problem, state, solutionCost):
+    def checkHeuristic(self, heuristic, problem, state, solutionCost, checkProblem=None):
         h0 = heuristic(state, problem)
 
         if solutionCost == 0:
@@ -505,6 +577,14 @@ class HeuristicTest(testClasses.TestCase):
             if h1 < 0: return False, 'Heuristic failed H >= 0 test'
             if h0 - h1 > stepCost: return False, 'Heuristic failed consistency test'
 
+        if checkProblem == None: return True, ''
+        # Check every reachable state, or as many as the checker allows
+        report = heuristicChecker.checkHeuristic(checkProblem, heuristic, tracker=grading.activeTracker())
+        failed = report.failedKinds()
+        if failed:
+            kind = failed[0]
+            return False, '\n\t'.join(['Heuristic failed %s test' % kind] + report.describe(kind))
+
         return True, ''
 
     def execute(self, grades, moduleDict, solutionDict):
@@ -512,12 +592,17 @@ class HeuristicTest(testClasses.TestCase):
         searchAgents = moduleDict['searchAgents']
         solutionCost = int(solutionDict['solution_cost'])
         problem, state, heuristic = self.setupProblem(searchAgents)
+        checkProblem = None
+        if self.checkAllStates:
+            # A problem of its own, so the exploration does not add to problem's expansions
+            checkProblem = self.setupProblem(searchAgents)[0]
 
-        passed, message = self.checkHeuristic(heuristic, problem, state, solutionCost)
+        passed, message = self.checkHeuristic(heuristic, problem, state, solutionCost, checkProblem)
 
         if not passed:
             grades.addMessage('FAIL: %s' % self.path)
-            grades.addMessage('%s' % message)
+            for line in message.split('\n'):
+                grades.addMessage('%s' % line)
             return False
         else:
             grades.addMessage('PASS: %s' % self.path)
@@ -558,7 +643,7 @@ class HeuristicGrade(testClasses.TestCase):
         self.thresholds = [int(t) for t in testDict['gradingThresholds'].split()]
 
     def setupProblem(self, searchAgents):
-        lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+        lay = layout.getLayoutFromText(self.layoutText)
         gameState = pacman.GameState()
         gameState.initialize(lay, 0)
         problemClass = getattr(searchAgents, self.searchProblemClassName)
@@ -574,7 +659,8 @@ class HeuristicGrade(testClasses.TestCase):
         searchAgents = moduleDict['searchAgents']
         problem, _, heuristic = self.setupProblem(searchAgents)
 
-        path = search.astar(problem, heuristic)
+        # A* pushes many states more than once; compute each value once
+        path = search.astar(problem, util.CachedHeuristic(heuristic))
 
         expanded = problem._expanded
 
@@ -632,7 +718,7 @@ class ClosestDotTest(testClasses.TestCase):
         self.layoutName = testDict['layoutName']
 
     def solution(self, searchAgents):
-        lay = layout.Layout([l.strip() for l in self.layoutText.split('\n')])
+        lay = layout.getLayoutFromText(self.layoutText)
         gameState = pacman.GameState()
         gameState.initialize(lay, 0)
         path = searchAgents.ClosestDotSearchAgent().findPathToClosestDot(gameState)
@@ -682,17 +768,25 @@ class ClosestDotTest(testClasses.TestCase):
 
 
 
+CORNER_HEURISTIC_FAILURES = {
+    heuristicChecker.NEGATIVE: 'non-positive heuristic',
+    heuristicChecker.GOAL: 'heuristic non-zero at goal',
+    heuristicChecker.ADMISSIBILITY: 'Inadmissible heuristic',
+    heuristicChecker.CONSISTENCY: 'inconsistent heuristic'}
+
 class CornerHeuristicSanity(testClasses.TestCase):
 
     def __init__(self, question, testDict):
         super(CornerHeuristicSanity, self).__init__(question, testDict)
         self.layout_text = testDict['layout']
+        # Also check every reachable state (heuristicChecker); slower
+        self.checkAllStates = testDict.get('checkAllStates', 'False').lower() == "true"
 
     def execute(self, grades, moduleDict, solutionDict):
         search = moduleDict['search']
         searchAgents = moduleDict['searchAgents']
         game_state = pacman.GameState()
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.getLayoutFromText(self.layout_text)
         game_state.initialize(lay, 0)
         problem = searchAgents.CornersProblem(game_state)
         start_state = problem.getStartState()
@@ -734,6 +828,19 @@ class CornerHeuristicSanity(testClasses.TestCase):
         if heuristics[len(heuristics) - 1] != 0:
             grades.addMessage('FAIL: heuristic non-zero at goal')
             return False
+        # The same checks on every reachable state, on a problem of its own
+        failed = []
+        if self.checkAllStates:
+            checkProblem = searchAgents.CornersProblem(game_state)
+            report = heuristicChecker.checkHeuristic(checkProblem, searchAgents.cornersHeuristic,
+                                                     tracker=grading.activeTracker())
+            failed = report.failedKinds()
+        if failed:
+            kind = failed[0]
+            grades.addMessage('FAIL: %s' % CORNER_HEURISTIC_FAILURES[kind])
+            for line in report.describe(kind):
+                grades.addMessage('\t%s' % line)
+            return False
         grades.addMessage('PASS: heuristic value less than true cost at start state')
         return True
 
@@ -747,7 +854,7 @@ class CornerHeuristicSanity(testClasses.TestCase):
         handle.write('# true cost of the optimal path from that state to a goal.\n')
 
         # solve problem and write solution
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.getLayoutFromText(self.layout_text)
         start_state = pacman.GameState()
         start_state.initialize(lay, 0)
         problem = searchAgents.CornersProblem(start_state)
@@ -772,14 +879,14 @@ class CornerHeuristicPacman(testClasses.TestCase):
         true_cost = float(solutionDict['cost'])
         thresholds = map(int, solutionDict['thresholds'].split())
         game_state = pacman.GameState()
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.getLayoutFromText(self.layout_text)
         game_state.initialize(lay, 0)
         problem = searchAgents.CornersProblem(game_state)
         start_state = problem.getStartState()
         if searchAgents.cornersHeuristic(start_state, problem) > true_cost:
             grades.addMessage('FAIL: Inadmissible heuristic')
             return False
-        path = search.astar(problem, searchAgents.cornersHeuristic)
+        path = search.astar(problem, util.CachedHeuristic(searchAgents.cornersHeuristic))
         print "path:", path
         print "path length:", len(path)
         cost = problem.getCostOfActions(path)
@@ -808,7 +915,7 @@ class CornerHeuristicPacman(testClasses.TestCase):
         handle.write('# used in scoring.\n')
 
         # solve problem and write solution
-        lay = layout.Layout([l.strip() for l in self.layout_text.split('\n')])
+        lay = layout.getLayoutFromText(self.layout_text)
         start_state = pacman.GameState()
         start_state.initialize(lay, 0)
         problem = searchAgents.CornersProblem(start_state)
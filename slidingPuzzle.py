@@ -0,0 +1,444 @@
+# slidingPuzzle.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Sliding tile puzzles of any width and height (the 15-puzzle, 24-puzzle, 2x5
+boards, ...), together with two solvers that need little memory.
+
+States pack the tiles into one integer like eightpuzzle.EightPuzzleState,
+with four bits per cell on boards of up to 16 cells (so that the pattern
+databases of patternDatabase.py apply) and more bits on larger boards.  The
+goal has the blank in the top left cell and the tiles in order after it.
+Half of all configurations cannot reach the goal; SlidingPuzzleSearchProblem
+rejects them with a parity test before any search is made.
+
+  idaStar              iterative deepening A*: memory linear in the depth
+  bidirectionalSearch  breadth first search from both ends, optimal and
+                       stopped once it stores maxStates states
+
+  python slidingPuzzle.py -W 4 -H 4 -n 10 -m 200 --memory 1024
+"""
+
+import optparse
+import random
+import sys
+import time
+
+import search
+
+OPPOSITE_MOVES = {'up': 'down', 'down': 'up', 'left': 'right', 'right': 'left'}
+
+class Board:
+    """
+    The geometry of a width x height puzzle, shared by all of its states.
+    Cells are numbered row * width + col; the tile in a cell is stored in
+    bits cell * bits and up of the packed configuration.
+    """
+    def __init__(self, width, height):
+        if width < 2 or height < 2:
+            raise Exception('Puzzles must be at least 2x2, not %dx%d' % (width, height))
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.bits = max(4, (self.size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        # For each cell, (move, cell the blank moves to, bit offset of that cell)
+        self.blankMoves = []
+        for cell in range(self.size):
+            row, col = divmod(cell, width)
+            moves = []
+            if row != 0: moves.append(('up', cell - width))
+            if row != height - 1: moves.append(('down', cell + width))
+            if col != 0: moves.append(('left', cell - 1))
+            if col != width - 1: moves.append(('right', cell + 1))
+            self.blankMoves.append(tuple([(move, target, self.bits * target) for move, target in moves]))
+        self.goalPacked = self.pack(range(self.size))
+        # manhattan[tile][cell]: distance from cell to the goal cell of tile
+        self.manhattan = [[abs(cell / width - tile / width) + abs(cell % width - tile % width)
+                           for cell in range(self.size)] for tile in range(self.size)]
+
+    def pack(self, numbers):
+        packed = 0
+        for cell, number in enumerate(numbers):
+            packed |= number << (self.bits * cell)
+        return packed
+
+    def unpack(self, packed):
+        numbers = []
+        for cell in range(self.size):
+            numbers.append(packed & self.mask)
+            packed >>= self.bits
+        return numbers
+
+BOARDS = {}
+
+def getBoard(width, height):
+    if (width, height) not in BOARDS:
+        BOARDS[(width, height)] = Board(width, height)
+    return BOARDS[(width, height)]
+
+def isSolvable(numbers, width):
+    """
+      Returns whether the configuration can reach the goal.  Every move
+    swaps the blank with a tile, changing the parity of the permutation of
+    the cells and the parity of the blank's distance from its goal cell
+    together, so exactly the configurations where the two agree are solvable.
+
+    >>> isSolvable([1, 0, 2, 3], 2)
+    True
+    >>> isSolvable([0, 2, 1, 3], 2)
+    False
+    """
+    permutationParity = 0
+    seen = [False] * len(numbers)
+    for cell in range(len(numbers)):
+        # Each cycle of length k is made of k - 1 swaps
+        length = 0
+        while not seen[cell]:
+            seen[cell] = True
+            cell = numbers[cell]
+            length += 1
+        if length: permutationParity += length - 1
+    blankCell = numbers.index(0)
+    blankDistance = blankCell / width + blankCell % width
+    return permutationParity % 2 == blankDistance % 2
+
+class SlidingPuzzleState(object):
+    """
+    A configuration of a sliding puzzle, with the same interface as
+    eightpuzzle.EightPuzzleState.  numbers lists the tiles row by row, with
+    0 for the blank; width and height default to a square board.
+    """
+    __slots__ = ('board', 'packed', 'blank')
+
+    def __init__(self, numbers, width=None, height=None):
+        if width == None:
+            width = int(round(len(numbers) ** 0.5))
+        if height == None:
+            height = len(numbers) / width
+        if sorted(numbers) != range(width * height):
+            raise Exception('A %dx%d puzzle needs the numbers 0 to %d once each: %s' %
+                            (width, height, width * height - 1, numbers))
+        self.board = getBoard(width, height)
+        self.packed = self.board.pack(numbers)
+        self.blank = list(numbers).index(0)
+
+    def _getNumbers(self):
+        return self.board.unpack(self.packed)
+    numbers = property(_getNumbers)
+
+    def _getCells(self):
+        numbers, width = self.numbers, self.board.width
+        return [numbers[row * width:(row + 1) * width] for row in range(self.board.height)]
+    cells = property(_getCells)
+
+    def _getBlankLocation(self):
+        return divmod(self.blank, self.board.width)
+    blankLocation = property(_getBlankLocation)
+
+    def isGoal(self):
+        """
+        >>> SlidingPuzzleState(range(16)).isGoal()
+        True
+        """
+        return self.packed == self.board.goalPacked
+
+    def legalMoves(self):
+        """
+          Moves of the blank, as in eightpuzzle.py.
+
+        >>> SlidingPuzzleState([0, 1, 2, 3, 4, 5], 3, 2).legalMoves()
+        ['down', 'right']
+        """
+        return [move for move, target, offset in self.board.blankMoves[self.blank]]
+
+    def result(self, move):
+        for legalMove, target, offset in self.board.blankMoves[self.blank]:
+            if legalMove == move:
+                number = (self.packed >> offset) & self.board.mask
+                return makeState(self.board, self.packed - (number << offset) +
+                                 (number << (self.board.bits * self.blank)), target)
+        raise Exception("Illegal move: %s" % move)
+
+    def successors(self):
+        "Returns a list of (state, move) pairs for the legal moves"
+        board, packed = self.board, self.packed
+        blankOffset, mask = board.bits * self.blank, board.mask
+        successors = []
+        for move, target, offset in board.blankMoves[self.blank]:
+            number = (packed >> offset) & mask
+            successors.append((makeState(board, packed - (number << offset) + (number << blankOffset), target), move))
+        return successors
+
+    def __eq__(self, other):
+        return isinstance(other, SlidingPuzzleState) and self.packed == other.packed and self.board is other.board
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.packed)
+
+    def __str__(self):
+        """
+        >>> print SlidingPuzzleState([1, 0, 2, 3])
+        ---------
+        | 1 |   |
+        ---------
+        | 2 | 3 |
+        ---------
+        """
+        cellWidth = len(str(self.board.size - 1))
+        horizontalLine = '-' * ((cellWidth + 3) * self.board.width + 1)
+        lines = [horizontalLine]
+        for row in self.cells:
+            lines.append('|' + ''.join([' %*s |' % (cellWidth, number or '') for number in row]))
+            lines.append(horizontalLine)
+        return '\n'.join(lines)
+
+def makeState(board, packed, blank):
+    "Creates a SlidingPuzzleState from its packed form, without unpacking"
+    state = SlidingPuzzleState.__new__(SlidingPuzzleState)
+    state.board = board
+    state.packed = packed
+    state.blank = blank
+    return state
+
+class SlidingPuzzleSearchProblem(search.SearchProblem):
+    """
+      A SearchProblem for sliding puzzles.  Moves are reversible, so the
+    problem also provides getGoalState and reverseAction for searches run
+    backwards from the goal.
+    """
+    def __init__(self, puzzle):
+        if not isSolvable(puzzle.numbers, puzzle.board.width):
+            raise Exception('This puzzle cannot be solved:\n%s' % puzzle)
+        self.puzzle = puzzle
+
+    def getStartState(self):
+        return self.puzzle
+
+    def getGoalState(self):
+        return makeState(self.puzzle.board, self.puzzle.board.goalPacked, 0)
+
+    def isGoalState(self, state):
+        return state.isGoal()
+
+    def getSuccessors(self, state):
+        return [(successor, move, 1) for successor, move in state.successors()]
+
+    def reverseAction(self, action):
+        return OPPOSITE_MOVES[action]
+
+    def getCostOfActions(self, actions):
+        return len(actions)
+
+def manhattanHeuristic(state, problem=None):
+    """
+      The sum of the Manhattan distances of the tiles from their goal cells.
+
+    >>> manhattanHeuristic(SlidingPuzzleState([1, 2, 0, 3]))
+    3
+    """
+    board = state.board
+    packed, mask, bits, manhattan = state.packed, board.mask, board.bits, board.manhattan
+    total = 0
+    for cell in range(board.size):
+        tile = packed & mask
+        if tile: total += manhattan[tile][cell]
+        packed >>= bits
+    return total
+
+def defaultHeuristic(width, height):
+    "Additive pattern databases for the boards which have them, else Manhattan distance"
+    import patternDatabase
+    if (width, height) in patternDatabase.DEFAULT_PARTITIONS:
+        return patternDatabase.getHeuristic(width, height)
+    return manhattanHeuristic
+
+def idaStar(problem, heuristic=search.nullHeuristic):
+    """
+      Iterative deepening A*: depth first searches which prune nodes whose
+    f = g + h exceeds a bound, raising the bound to the smallest pruned f
+    after each failed pass.  Only the current path is stored, and states
+    already on it are skipped.  With an admissible heuristic the returned
+    path is optimal; if there is none, returns None.
+    """
+    start = problem.getStartState()
+    path = [start]
+    onPath = set(path)
+    actions = []
+
+    def boundedSearch(state, cost, bound):
+        "Returns (True, None) once a goal is found, else (False, smallest f above bound)"
+        f = cost + heuristic(state, problem)
+        if f > bound: return False, f
+        if problem.isGoalState(state): return True, None
+        smallest = None
+        for successor, action, stepCost in problem.getSuccessors(state):
+            if successor in onPath: continue
+            path.append(successor)
+            onPath.add(successor)
+            actions.append(action)
+            found, exceeded = boundedSearch(successor, cost + stepCost, bound)
+            if found: return True, None
+            actions.pop()
+            onPath.discard(path.pop())
+            if exceeded != None and (smallest == None or exceeded < smallest):
+                smallest = exceeded
+        return False, smallest
+
+    bound = heuristic(start, problem)
+    while True:
+        found, bound = boundedSearch(start, 0, bound)
+        if found: return actions
+        if bound == None: return None
+
+def bidirectionalSearch(problem, maxStates=None):
+    """
+      Breadth first search forwards from the start and backwards from
+    problem.getGoalState(), expanding a whole layer of the smaller side at
+    a time, for problems with unit costs and reversible moves.  Returns an
+    optimal list of actions, or None if there is no path or more than
+    maxStates states would have to be stored.
+    """
+    start, goal = problem.getStartState(), problem.getGoalState()
+    if start == goal: return []
+    # parents[side][state] = (neighbour, action taking the forward path between them)
+    parents = [{start: None}, {goal: None}]
+    layers = [[start], [goal]]
+    while layers[0] and layers[1]:
+        side = len(layers[0]) > len(layers[1]) and 1 or 0
+        seen, other = parents[side], parents[1 - side]
+        nextLayer, meetings = [], []
+        for state in layers[side]:
+            for successor, action, stepCost in problem.getSuccessors(state):
+                if successor in seen: continue
+                if side == 0:
+                    seen[successor] = (state, action)
+                else:
+                    seen[successor] = (state, problem.reverseAction(action))
+                if successor in other: meetings.append(successor)
+                nextLayer.append(successor)
+            if maxStates != None and len(seen) + len(other) > maxStates and not meetings:
+                return None
+        if meetings:
+            # Every meeting is one step further from this side; pick the closest to the other
+            depths = [(pathDepth(other, state), state) for state in meetings]
+            return joinPaths(parents, min(depths)[1])
+        layers[side] = nextLayer
+    return None
+
+def pathDepth(parents, state):
+    depth = 0
+    while parents[state] != None:
+        state = parents[state][0]
+        depth += 1
+    return depth
+
+def joinPaths(parents, middle):
+    forward, backward = parents
+    actions = []
+    state = middle
+    while forward[state] != None:
+        state, action = forward[state]
+        actions.append(action)
+    actions.reverse()
+    state = middle
+    while backward[state] != None:
+        state, action = backward[state]
+        actions.append(action)
+    return actions
+
+def createRandomPuzzle(width=4, height=4, moves=100):
+    """
+      Creates a random puzzle by applying 'moves' random moves to a solved
+    one, as eightpuzzle.createRandomEightPuzzle does.
+    """
+    puzzle = SlidingPuzzleState(range(width * height), width, height)
+    for i in range(moves):
+        puzzle = puzzle.result(random.sample(puzzle.legalMoves(), 1)[0])
+    return puzzle
+
+class CountingProblem(SlidingPuzzleSearchProblem):
+    "Counts expansions"
+    def __init__(self, puzzle):
+        SlidingPuzzleSearchProblem.__init__(self, puzzle)
+        self.expanded = 0
+
+    def getSuccessors(self, state):
+        self.expanded += 1
+        return SlidingPuzzleSearchProblem.getSuccessors(self, state)
+
+def limitMemory(megabytes):
+    "Caps the address space of this process; allocations beyond it raise MemoryError"
+    import resource
+    limit = megabytes * 1024 * 1024
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY: limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def runBenchmark(width, height, numPuzzles, moves, seed, maxStates, memory):
+    start = time.time()
+    heuristic = defaultHeuristic(width, height)
+    print 'Heuristic ready in %.2f seconds' % (time.time() - start)
+    if memory: limitMemory(memory)
+    solvers = [('IDA*', lambda problem: idaStar(problem, heuristic)),
+               ('Bidirectional BFS', lambda problem: bidirectionalSearch(problem, maxStates))]
+    random.seed(seed)
+    print '%-7s %-18s %-10s %7s %10s %9s' % ('Puzzle', 'Solver', 'Status', 'Length', 'Expanded', 'Seconds')
+    for i in range(numPuzzles):
+        puzzle = createRandomPuzzle(width, height, moves)
+        for name, solver in solvers:
+            problem = CountingProblem(puzzle)
+            begin = time.time()
+            try:
+                path = solver(problem)
+                status = path == None and 'state cap' or 'ok'
+            except MemoryError:
+                path, status = None, 'memory'
+            elapsed = time.time() - begin
+            if path != None:
+                state = puzzle
+                for action in path: state = state.result(action)
+                if not state.isGoal(): status = 'wrong'
+            print '%-7d %-18s %-10s %7s %10d %9.3f' % (i, name, status, path != None and len(path) or '',
+                                                       problem.expanded, elapsed)
+            sys.stdout.flush()
+
+def readCommand(argv):
+    parser = optparse.OptionParser(description = 'Solve random sliding puzzles with IDA* and bidirectional search')
+    parser.add_option('-W', '--width', dest='width', type='int', default=4,
+                      help='Columns of the puzzle [Default: %default]')
+    parser.add_option('-H', '--height', dest='height', type='int', default=4,
+                      help='Rows of the puzzle [Default: %default]')
+    parser.add_option('-n', '--puzzles', dest='puzzles', type='int', default=10,
+                      help='Number of random puzzles [Default: %default]')
+    parser.add_option('-m', '--moves', dest='moves', type='int', default=200,
+                      help='Random moves used to scramble each puzzle [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', type='int', default=0,
+                      help='Random seed [Default: %default]')
+    parser.add_option('--max-states', dest='maxStates', type='int', default=1000000,
+                      help='States bidirectional search may store [Default: %default]')
+    parser.add_option('--memory', dest='memory', type='int', default=1024,
+                      help='Megabytes of address space for the process, 0 for no cap [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    runBenchmark(options.width, options.height, options.puzzles, options.moves,
+                 options.seed, options.maxStates, options.memory)
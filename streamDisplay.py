@@ -0,0 +1,369 @@
+# streamDisplay.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Streams games as compact binary events, to be watched elsewhere.
+
+StreamGraphics is a display which draws nothing.  Each update is written as
+the changes it made: the agents which moved, the food or capsule eaten and
+the score, followed by an end of frame.  The stream goes to a file, or to
+viewers connecting to a local TCP port at any time.  Each viewer has a
+buffer of at most MAX_BUFFER bytes, written without blocking; a viewer
+which falls behind loses its buffer and gets a keyframe (the whole state)
+at the next frame instead, so the game never waits for it.
+
+Run this module to watch a stream with any display:
+
+  python pacman.py -p GreedyAgent -n 100 --stream localhost:8765
+  python streamDisplay.py localhost:8765
+  python pacman.py -p GreedyAgent --stream game.pacs && python streamDisplay.py -t game.pacs
+
+Records start with a one letter kind:
+  K  number of agents, layout text    a new game; the records up to the next
+                                      T give its state
+  A  agent, 2x, 2y, direction, scared an agent's position and scared timer
+  F  x, y                             food eaten
+  C  x, y                             capsule eaten
+  S  score
+  E  1 for a win, 2 for a loss        the game is over
+  T                                   the end of a frame
+"""
+
+import collections
+import errno
+import optparse
+import re
+import select
+import socket
+import struct
+import sys
+import time
+
+from game import Configuration, Directions, GameStateData
+import layout
+
+MAGIC = 'PACS\x01'
+MAX_BUFFER = 1 << 20
+
+DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+DIRECTION_CODES = dict([(direction, code) for code, direction in enumerate(DIRECTIONS)])
+
+RECORD_FORMATS = {'K': '<BH', 'A': '<BhhBB', 'F': '<BB', 'C': '<BB', 'S': '<i', 'E': '<B', 'T': ''}
+RECORD_SIZES = dict([(kind, struct.calcsize(format)) for kind, format in RECORD_FORMATS.items()])
+
+def record(kind, *fields):
+    return kind + struct.pack(RECORD_FORMATS[kind], *fields)
+
+def agentRecord(index, agentState):
+    configuration = agentState.configuration
+    if configuration == None: return ''
+    x, y = configuration.pos
+    return record('A', index, int(round(2 * x)), int(round(2 * y)),
+                  DIRECTION_CODES.get(configuration.direction, 4), min(agentState.scaredTimer, 255))
+
+def keyframe(state):
+    "The records which set up state from its layout"
+    text = '\n'.join(state.layout.layoutText)
+    records = [record('K', len(state.agentStates), len(text)) + text]
+    records += [agentRecord(index, agentState) for index, agentState in enumerate(state.agentStates)]
+    initial = state.layout
+    records += [record('F', x, y) for x, y in initial.food.asList() if not state.food[x][y]]
+    records += [record('C', x, y) for x, y in initial.capsules if (x, y) not in state.capsules]
+    records.append(record('S', state.score))
+    return ''.join(records)
+
+def isAddress(target):
+    "host:port, as opposed to a file name"
+    return re.match(r'^[\w.-]*:\d+$', target) != None
+
+def splitAddress(target):
+    host, port = target.rsplit(':', 1)
+    return host or 'localhost', int(port)
+
+class StreamViewer:
+    "A viewer connected to StreamGraphics, and the frames still to be sent to it"
+    def __init__(self, connection):
+        self.connection = connection
+        self.connection.setblocking(0)
+        self.frames = collections.deque()
+        self.sent = 0       # Bytes of the first frame sent
+        self.delivered = 0  # Bytes sent in all
+        self.size = 0       # Bytes not sent
+        self.greeted = False
+        self.needsKeyframe = True
+
+    def add(self, frame):
+        if not self.greeted:
+            frame = MAGIC + frame
+            self.greeted = True
+        self.frames.append(frame)
+        self.size += len(frame)
+
+    def drop(self):
+        "Forgets the frames not started, which a keyframe must replace"
+        if self.sent:
+            self.frames = collections.deque([self.frames[0][self.sent:]])
+        else:
+            self.frames = collections.deque()
+        self.size = sum(map(len, self.frames))
+        self.sent = 0
+        self.needsKeyframe = True
+        if self.delivered == 0: self.greeted = False
+
+    def send(self):
+        "Sends what the socket takes without blocking; False once the viewer has gone"
+        while self.frames:
+            try:
+                sent = self.connection.send(self.frames[0][self.sent:])
+            except socket.error, e:
+                return e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK)
+            self.sent += sent
+            self.size -= sent
+            self.delivered += sent
+            if self.sent < len(self.frames[0]): return True
+            self.frames.popleft()
+            self.sent = 0
+        return True
+
+class StreamGraphics:
+    """
+    A display streaming each update as events, to the file target or, when
+    target is host:port, to viewers connecting there.  skippedFrames counts
+    the frames viewers lost by falling behind.
+    """
+    def __init__(self, target):
+        self.target = target
+        self.file = None
+        self.listener = None
+        self.viewers = []
+        self.skippedFrames = 0
+        self.state = None
+        if isAddress(target):
+            self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.listener.bind(splitAddress(target))
+            self.listener.listen(5)
+            self.listener.setblocking(0)
+        else:
+            self.file = open(target, 'wb')
+            self.file.write(MAGIC)
+
+    def initialize(self, state, isBlue = False):
+        self.state = state
+        self.agentRecords = [agentRecord(i, agentState) for i, agentState in enumerate(state.agentStates)]
+        self.score = state.score
+        for viewer in self.viewers: viewer.needsKeyframe = True
+        self.emit(None)
+
+    def update(self, state):
+        self.state = state
+        records = []
+        if state._agentMoved == 0:
+            # Pacman can scare or eat any ghost
+            indices = range(len(state.agentStates))
+        else:
+            indices = [state._agentMoved]
+        for index in indices:
+            agent = agentRecord(index, state.agentStates[index])
+            if agent != self.agentRecords[index]:
+                self.agentRecords[index] = agent
+                records.append(agent)
+        if state._foodEaten != None: records.append(record('F', *state._foodEaten))
+        if state._capsuleEaten != None: records.append(record('C', *state._capsuleEaten))
+        if state.score != self.score:
+            self.score = state.score
+            records.append(record('S', state.score))
+        if state._win or state._lose:
+            records.append(record('E', state._win and 1 or 2))
+        self.emit(''.join(records))
+
+    def emit(self, records):
+        "Sends a frame of records, or a keyframe to viewers which need one when records is None"
+        if self.file != None:
+            self.file.write(records == None and keyframe(self.state) or records)
+            self.file.write('T')
+            return
+        self.acceptViewers()
+        full = None
+        for viewer in self.viewers:
+            if records != None and viewer.size + len(records) >= MAX_BUFFER:
+                viewer.drop()
+                self.skippedFrames += 1
+            if viewer.needsKeyframe:
+                if full == None: full = keyframe(self.state) + 'T'
+                viewer.add(full)
+                viewer.needsKeyframe = False
+            elif records != None:
+                viewer.add(records + 'T')
+        self.viewers = [viewer for viewer in self.viewers if viewer.send()]
+
+    def acceptViewers(self):
+        while select.select([self.listener], [], [], 0)[0]:
+            try:
+                connection, address = self.listener.accept()
+            except socket.error:
+                return
+            self.viewers.append(StreamViewer(connection))
+
+    def checkNullDisplay(self):
+        return True
+
+    def pause(self):
+        pass
+
+    def draw(self, state):
+        pass
+
+    def updateDistributions(self, dist):
+        pass
+
+    def finish(self):
+        if self.file != None:
+            self.file.flush()
+            return
+        # Give viewers what they have been sent so far; a game which follows adds to it
+        for viewer in self.viewers: viewer.send()
+
+    def close(self, timeout=1.0):
+        "Closes the stream, waiting up to timeout seconds for viewers to take what is left"
+        if self.file != None: self.file.close()
+        end = time.time() + timeout
+        while self.viewers and time.time() < end:
+            select.select([], [viewer.connection for viewer in self.viewers], [], end - time.time())
+            self.viewers = [viewer for viewer in self.viewers if viewer.send() and viewer.frames]
+        for viewer in self.viewers: viewer.connection.close()
+        if self.listener != None: self.listener.close()
+        self.viewers = []
+
+class StreamReader:
+    """
+    Rebuilds game states from a stream.  feed(data) takes bytes as they
+    arrive and returns the frames they complete, as (kind, state) where
+    kind is 'keyframe' for the first frame of a game and 'update' otherwise.
+    States are GameStateData, as a display expects them.
+    """
+    def __init__(self):
+        self.data = ''
+        self.state = None
+        self.keyframe = False
+        self.sawMagic = False
+
+    def feed(self, data):
+        self.data += data
+        if not self.sawMagic:
+            if len(self.data) < len(MAGIC): return []
+            if self.data[:len(MAGIC)] != MAGIC: raise Exception('Not a game stream')
+            self.data = self.data[len(MAGIC):]
+            self.sawMagic = True
+        frames = []
+        position = 0
+        while position < len(self.data):
+            kind = self.data[position]
+            if kind not in RECORD_SIZES: raise Exception('Bad record %r in game stream' % kind)
+            end = position + 1 + RECORD_SIZES[kind]
+            if end > len(self.data): break
+            fields = struct.unpack(RECORD_FORMATS[kind], self.data[position + 1:end])
+            if kind == 'K':
+                textEnd = end + fields[1]
+                if textEnd > len(self.data): break
+                self.startGame(fields[0], self.data[end:textEnd])
+                end = textEnd
+            elif kind == 'T':
+                frames.append((self.keyframe and 'keyframe' or 'update', self.state))
+                self.state = GameStateData(self.state)
+                self.keyframe = False
+            else:
+                self.apply(kind, fields)
+            position = end
+        self.data = self.data[position:]
+        return frames
+
+    def startGame(self, numAgents, text):
+        self.state = GameStateData()
+        self.state.initialize(layout.Layout(text.split('\n')), numAgents - 1)
+        self.keyframe = True
+
+    def apply(self, kind, fields):
+        state = self.state
+        if kind == 'A':
+            index, x2, y2, direction, scared = fields
+            agentState = state.agentStates[index].copy()
+            agentState.configuration = Configuration((x2 / 2.0, y2 / 2.0), DIRECTIONS[direction])
+            agentState.scaredTimer = scared
+            state.agentStates[index] = agentState
+            if state._agentMoved == None: state._agentMoved = index
+        elif kind == 'F':
+            state.food = state.food.copy()
+            state.food[fields[0]][fields[1]] = False
+            state._foodEaten = fields
+        elif kind == 'C':
+            state.capsules.remove(fields)
+            state._capsuleEaten = fields
+        elif kind == 'S':
+            state.score = fields[0]
+        elif kind == 'E':
+            state._win, state._lose = fields[0] == 1, fields[0] == 2
+
+def openStream(target):
+    "A function reading the next bytes of the stream at target, '' at its end"
+    if isAddress(target):
+        connection = socket.create_connection(splitAddress(target))
+        return lambda: connection.recv(1 << 16)
+    handle = open(target, 'rb')
+    return lambda: handle.read(1 << 16)
+
+def watch(target, display):
+    "Shows the stream at target on display until it ends"
+    read = openStream(target)
+    reader = StreamReader()
+    started = False
+    while True:
+        data = read()
+        if not data: break
+        for kind, state in reader.feed(data):
+            if kind == 'keyframe':
+                if started: display.finish()
+                display.initialize(state)
+                started = True
+            else:
+                if state._agentMoved == None: state._agentMoved = 0
+                display.update(state)
+    if started: display.finish()
+
+def readCommand(argv):
+    parser = optparse.OptionParser(usage='%prog [options] FILE|host:port',
+                                   description='Watch games streamed by pacman.py --stream')
+    parser.add_option('-t', '--textGraphics', action='store_true', dest='textGraphics',
+                      help='Display output as text only', default=False)
+    parser.add_option('--ansi', action='store_true', dest='ansiGraphics',
+                      help='Display output as text, redrawing only the changed cells of the terminal', default=False)
+    parser.add_option('-z', '--zoom', type='float', dest='zoom',
+                      help='Zoom the size of the graphics window [Default: %default]', default=1.0)
+    parser.add_option('--frameTime', dest='frameTime', type='float',
+                      help='Time to delay between frames [Default: %default]', default=0.1)
+    options, args = parser.parse_args(argv)
+    if len(args) != 1:
+        parser.error('Give one file or host:port to watch')
+    return options, args[0]
+
+if __name__ == '__main__':
+    options, target = readCommand(sys.argv[1:])
+    if options.textGraphics or options.ansiGraphics:
+        import textDisplay
+        textDisplay.SLEEP_TIME = options.frameTime
+        display = options.ansiGraphics and textDisplay.AnsiGraphics() or textDisplay.PacmanGraphics()
+    else:
+        import graphicsDisplay
+        display = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
+    watch(target, display)
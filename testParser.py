@@ -12,14 +12,27 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import hashlib
+import marshal
+import os
 import re
 import sys
 
+# Parsed test files are cached in this directory, next to the test files
+CACHE_DIRECTORY = '__pycache__'
+CACHE_VERSION = 2
+
+BLANK_LINE = re.compile('\A\s*\Z')
+ONE_LINE_PROPERTY = re.compile('\A([^"]*?):\s*"([^"]*)"\s*\Z')
+MULTI_LINE_PROPERTY = re.compile('\A([^"]*?):\s*"""\s*\Z')
+MULTI_LINE_END = re.compile('\A\s*"""\s*\Z')
+
 class TestParser(object):
 
-    def __init__(self, path):
+    def __init__(self, path, useCache=True):
         # save the path to the test file
         self.path = path
+        self.useCache = useCache
 
     def removeComments(self, rawlines):
         # remove any portion of a line following a '#' symbol
@@ -32,36 +45,87 @@ class TestParser(object):
                 fixed_lines.append(l[0:idx])
         return '\n'.join(fixed_lines)
 
+    def cachePath(self):
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, CACHE_DIRECTORY, name + '.cache')
+
     def parse(self):
+        """
+        Returns the test dictionary, from the cache if the file's
+        modification time and size, or else its SHA-1, match the cached copy.
+        """
+        if not self.useCache:
+            with open(self.path) as handle:
+                test = self.parseText(handle.read())
+            test.setdefault('path', self.path)
+            return test
+
+        stat = os.stat(self.path)
+        cached = None
+        try:
+            with open(self.cachePath(), 'rb') as handle:
+                cached = marshal.load(handle)
+        except (IOError, EOFError, ValueError, TypeError):
+            pass
+        if cached != None and cached[0] == CACHE_VERSION:
+            version, mtime, size, digest, test = cached
+            if (mtime, size) == (stat.st_mtime, stat.st_size):
+                test.setdefault('path', self.path)
+                return test
+
+        with open(self.path) as handle:
+            text = handle.read()
+        digest = hashlib.sha1(text).hexdigest()
+        if cached != None and cached[0] == CACHE_VERSION and cached[3] == digest:
+            test = cached[4]
+        else:
+            test = self.parseText(text)
+        self.writeCache((CACHE_VERSION, stat.st_mtime, stat.st_size, digest, test))
+        # Test files may define their own 'path' property
+        test.setdefault('path', self.path)
+        return test
+
+    def writeCache(self, entry):
+        "Stores a cache entry; failures (e.g. a read-only directory) are ignored"
+        path = self.cachePath()
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(temporary, 'wb') as handle:
+                marshal.dump(entry, handle)
+            os.rename(temporary, path)
+        except (IOError, OSError):
+            pass
+
+    def parseText(self, text):
         # read in the test case and remove comments
         test = {}
-        with open(self.path) as handle:
-            raw_lines = handle.read().split('\n')
+        raw_lines = text.split('\n')
 
         test_text = self.removeComments(raw_lines)
         test['__raw_lines__'] = raw_lines
-        test['path'] = self.path
         test['__emit__'] = []
         lines = test_text.split('\n')
         i = 0
         # read a property in each loop cycle
         while(i < len(lines)):
             # skip blank lines
-            if re.match('\A\s*\Z', lines[i]):
+            if BLANK_LINE.match(lines[i]):
                 test['__emit__'].append(("raw", raw_lines[i]))
                 i += 1
                 continue
-            m = re.match('\A([^"]*?):\s*"([^"]*)"\s*\Z', lines[i])
+            m = ONE_LINE_PROPERTY.match(lines[i])
             if m:
                 test[m.group(1)] = m.group(2)
                 test['__emit__'].append(("oneline", m.group(1)))
                 i += 1
                 continue
-            m = re.match('\A([^"]*?):\s*"""\s*\Z', lines[i])
+            m = MULTI_LINE_PROPERTY.match(lines[i])
             if m:
                 msg = []
                 i += 1
-                while(not re.match('\A\s*"""\s*\Z', lines[i])):
+                while(not MULTI_LINE_END.match(lines[i])):
                     msg.append(raw_lines[i])
                     i += 1
                 test[m.group(1)] = '\n'.join(msg)
@@ -12,6 +12,7 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
+import sys
 import time
 try: 
     import pacman
@@ -23,6 +24,10 @@ SLEEP_TIME = 0 # This can be overwritten by __init__
 DISPLAY_MOVES = False
 QUIET = False # Supresses output
 
+# AnsiGraphics: output collected at most between writes, when not pausing
+FLUSH_BYTES = 1 << 16
+ESCAPE = '\x1b['
+
 class NullGraphics:
     def initialize(self, state, isBlue = False):
         pass
@@ -34,7 +39,7 @@ class NullGraphics:
         return True
 
     def pause(self):
-        time.sleep(SLEEP_TIME)
+        if SLEEP_TIME > 0: time.sleep(SLEEP_TIME)
 
     def draw(self, state):
         print state
@@ -72,10 +77,133 @@ class PacmanGraphics:
             self.draw(state)
 
     def pause(self):
-        time.sleep(SLEEP_TIME)
+        if SLEEP_TIME > 0: time.sleep(SLEEP_TIME)
 
     def draw(self, state):
         print state
 
     def finish(self):
         pass
+
+# Rows of walls of each layout, top row first: walls.packBits() -> rows
+STATIC_FRAMES = {}
+
+def staticFrame(walls):
+    key = walls.packBits()
+    if key not in STATIC_FRAMES:
+        STATIC_FRAMES[key] = [''.join([walls[x][y] and '%' or ' ' for x in range(walls.width)])
+                              for y in range(walls.height - 1, -1, -1)]
+    return STATIC_FRAMES[key]
+
+class AnsiGraphics(PacmanGraphics):
+    """
+    Draws the game in a terminal, rewriting only the cells which changed
+    since the last frame by moving the cursor with ANSI escape codes.  The
+    walls of each layout are laid out once (staticFrame).  Output is
+    collected and written to out (standard output by default) once a frame;
+    with a SLEEP_TIME of 0 it is written whenever FLUSH_BYTES have been
+    collected, so that games run at full speed into a log.
+    """
+    def __init__(self, speed=None, out=None):
+        PacmanGraphics.__init__(self, speed)
+        self.out = out or sys.stdout
+        self.buffer = []
+        self.buffered = 0
+
+    def initialize(self, state, isBlue = False):
+        self.height = state.layout.height
+        self.rows = [list(row) for row in staticFrame(state.layout.walls)]
+        for x, y in state.food.asList():
+            self.rows[self.height - 1 - y][x] = '.'
+        self.agentCells = self.getAgentCells(state)
+        for x, y in set(self.agentCells + state.capsules):
+            self.rows[self.height - 1 - y][x] = self.getCellString(state, x, y)
+        self.write(ESCAPE + '2J' + ESCAPE + 'H' + '\n'.join([''.join(row) for row in self.rows]))
+        self.dirty = set()
+        self.score = None
+        self.drawScore(state)
+        self.flush(SLEEP_TIME > 0)
+        self.pause()
+        self.turn = 0
+        self.agentCounter = 0
+        self.over = False
+
+    def update(self, state):
+        cells = self.getAgentCells(state)
+        self.dirty.update(self.agentCells + cells)
+        self.agentCells = cells
+        if state._foodEaten != None: self.dirty.add(state._foodEaten)
+        if state._capsuleEaten != None: self.dirty.add(state._capsuleEaten)
+
+        numAgents = len(state.agentStates)
+        self.agentCounter = (self.agentCounter + 1) % numAgents
+        if self.agentCounter == 0:
+            self.turn += 1
+            if DISPLAY_MOVES:
+                ghosts = [pacman.nearestPoint(state.getGhostPosition(i)) for i in range(1, numAgents)]
+                self.write('%s%d;1H%4d) P: %-8s| Score: %-5d| Ghosts: %s%sK' %
+                           (ESCAPE, self.height + 2, self.turn, str(pacman.nearestPoint(state.getPacmanPosition())),
+                            state.score, ghosts, ESCAPE))
+            if self.turn % DRAW_EVERY == 0:
+                self.draw(state)
+                self.pause()
+        if state._win or state._lose:
+            self.draw(state)
+            # The rules print the outcome next; it belongs below the board
+            self.moveBelowBoard()
+            self.over = True
+
+    def getAgentCells(self, state):
+        cells = []
+        for agentState in state.agentStates:
+            if agentState == None or agentState.configuration == None: cells.append(None)
+            else: cells.append(pacman.nearestPoint(agentState.configuration.pos))
+        return cells
+
+    def getCellString(self, state, x, y):
+        "The character of a cell, as in str(state)"
+        if (x, y) in state.capsules: return 'o'
+        string = None
+        for agentState, cell in zip(state.agentStates, self.agentCells):
+            if cell != (x, y): continue
+            if agentState.isPacman: string = state._pacStr(agentState.configuration.direction)
+            else: string = state._ghostStr(agentState.configuration.direction)
+        if string != None: return string
+        return state._foodWallStr(state.food[x][y], state.layout.walls[x][y])
+
+    def draw(self, state):
+        for cell in self.dirty:
+            if cell == None: continue
+            x, y = cell
+            row = self.height - 1 - y
+            string = self.getCellString(state, x, y)
+            if self.rows[row][x] != string:
+                self.rows[row][x] = string
+                self.write('%s%d;%dH%s' % (ESCAPE, row + 1, x + 1, string))
+        self.dirty = set()
+        self.drawScore(state)
+        self.flush(SLEEP_TIME > 0)
+
+    def drawScore(self, state):
+        if state.score != self.score:
+            self.score = state.score
+            self.write('%s%d;1HScore: %d%sK' % (ESCAPE, self.height + 1, state.score, ESCAPE))
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+
+    def flush(self, force=True):
+        if force or self.buffered >= FLUSH_BYTES:
+            self.out.write(''.join(self.buffer))
+            self.out.flush()
+            self.buffer = []
+            self.buffered = 0
+
+    def moveBelowBoard(self):
+        self.write('%s%d;1H' % (ESCAPE, self.height + (DISPLAY_MOVES and 3 or 2)))
+        self.flush()
+
+    def finish(self):
+        # Unless the cursor is already below the board, with the outcome after it
+        if not self.over: self.moveBelowBoard()
@@ -227,6 +227,155 @@ def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
     return abs( xy1[0] - xy2[0] ) + abs( xy1[1] - xy2[1] )
 
+class LRUCache:
+    """
+    A dictionary holding at most maxSize (> 0) entries, or any number if
+    maxSize is None.  When it is full, the least recently used entry is dropped.
+    get() counts hits and misses; evictions are counted as well.
+    """
+    def __init__(self, maxSize=None):
+        self.maxSize = maxSize
+        self.links = {}       # key -> [previous link, next link, key, value]
+        self.root = []        # Sentinel of a circular list, most recent first
+        self.root[:] = [self.root, self.root, None, None]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        link = self.links.get(key)
+        if link == None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        if self.maxSize != None: self._moveToFront(link)
+        return link[3]
+
+    def _moveToFront(self, link):
+        previous, next = link[0], link[1]
+        previous[1] = next
+        next[0] = previous
+        first = self.root[1]
+        link[0], link[1] = self.root, first
+        first[0] = self.root[1] = link
+
+    def __setitem__(self, key, value):
+        link = self.links.get(key)
+        if link != None:
+            link[3] = value
+            if self.maxSize != None: self._moveToFront(link)
+            return
+        if self.maxSize != None and len(self.links) >= self.maxSize:
+            last = self.root[0]
+            last[0][1] = self.root
+            self.root[0] = last[0]
+            del self.links[last[2]]
+            self.evictions += 1
+        first = self.root[1]
+        link = [self.root, first, key, value]
+        first[0] = self.root[1] = self.links[key] = link
+
+    def __getitem__(self, key):
+        return self.links[key][3]
+
+    def __contains__(self, key):
+        return key in self.links
+
+    def __len__(self):
+        return len(self.links)
+
+    def clear(self):
+        self.links.clear()
+        self.root[:] = [self.root, self.root, None, None]
+
+    def hitRate(self):
+        calls = self.hits + self.misses
+        return calls and float(self.hits) / calls or 0.0
+
+    def __str__(self):
+        return '%d entries, %d hits, %d misses (%.1f%% hits), %d evictions' % \
+            (len(self), self.hits, self.misses, 100 * self.hitRate(), self.evictions)
+
+_MISSING = object()
+
+class CachedHeuristic:
+    """
+    Wraps a heuristic so that it is computed once per state, however often
+    A* pushes the state.  Values are kept in an LRUCache of at most maxSize
+    states, which is emptied when the heuristic is called with a different
+    problem.  The heuristic must depend on nothing but its arguments.
+    """
+    def __init__(self, heuristic, maxSize=100000):
+        self.heuristic = heuristic
+        self.cache = LRUCache(maxSize)
+        self.problem = None
+        self.__name__ = getattr(heuristic, '__name__', 'heuristic')
+
+    def __call__(self, state, problem=None):
+        if problem is not self.problem:
+            self.cache.clear()
+            self.problem = problem
+        value = self.cache.get(state, _MISSING)
+        if value is _MISSING:
+            value = self.cache[state] = self.heuristic(state, problem)
+        return value
+
+def heuristicInfo(problem):
+    """
+    Returns problem.heuristicInfo, a dictionary in which heuristics can keep
+    data between calls, creating it if the problem has none.
+    """
+    if not hasattr(problem, 'heuristicInfo'):
+        problem.heuristicInfo = {}
+    return problem.heuristicInfo
+
+class MazeDistances:
+    """
+    Shortest path lengths between the open cells of a walls grid.  The first
+    query from a position runs one breadth first search, which finds the
+    distances to every cell at once; they are kept for later queries.
+    """
+    def __init__(self, walls):
+        self.walls = walls
+        self.fromPosition = {}
+
+    def getDistance(self, start, end):
+        "The maze distance from start to end, or None if there is no path"
+        distances = self.fromPosition.get(start)
+        if distances == None:
+            distances = self.fromPosition[start] = self.search(start)
+        return distances.get(end)
+
+    def search(self, start):
+        walls = self.walls
+        distances = {start: 0}
+        frontier = [start]
+        distance = 0
+        while frontier:
+            distance += 1
+            nextFrontier = []
+            for x, y in frontier:
+                for nx, ny in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+                    if 0 <= nx < walls.width and 0 <= ny < walls.height and \
+                            (nx, ny) not in distances and not walls[nx][ny]:
+                        distances[(nx, ny)] = distance
+                        nextFrontier.append((nx, ny))
+            frontier = nextFrontier
+        return distances
+
+def mazeDistances(problem, walls=None):
+    """
+    The MazeDistances of problem's walls (problem.walls by default), shared
+    by every call through heuristicInfo(problem).  For example, a food
+    heuristic can use util.mazeDistances(problem).getDistance(position, food)
+    and pay for each breadth first search only once per search.
+    """
+    info = heuristicInfo(problem)
+    if 'mazeDistances' not in info:
+        if walls == None: walls = problem.walls
+        info['mazeDistances'] = MazeDistances(walls)
+    return info['mazeDistances']
+
 """
   Data structures and functions useful for various course projects
 
@@ -601,20 +750,73 @@ def pause():
 
 # code to handle timeouts
 #
-# FIXME
-# NOTE: TimeoutFuncton is NOT reentrant.  Later timeouts will silently
-# disable earlier timeouts.  Could be solved by maintaining a global list
-# of active time outs.  Currently, questions which have test cases calling
-# this have all student code so wrapped.
+# Active time budgets are kept on a stack of absolute deadlines, so
+# TimeoutFunctions may be nested: an inner budget never disables an outer
+# one.  A single interval timer (setitimer, sub-second resolution) is armed
+# for the earliest pending deadline and the SIGALRM handler is installed
+# only while at least one budget is active.
 #
 import signal
+import threading
 import time
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
+_DEADLINES = []          # Stack of absolute deadlines of active budgets
+_OLD_ALARM_HANDLER = None
+_CLEANING = False        # Set while a budget is being dropped
+
+def _handleAlarm(signum, frame):
+    if _CLEANING:
+        # Raising here would interrupt the cleanup; fire again once it is done
+        signal.setitimer(signal.ITIMER_REAL, 0.01)
+        return
+    now = time.time()
+    if [d for d in _DEADLINES if d <= now]:
+        # Fire again shortly in case the exception gets swallowed
+        signal.setitimer(signal.ITIMER_REAL, 0.01)
+        raise TimeoutFunctionException()
+    _armTimer() # Woke up early; wait for the earliest deadline
+
+def _armTimer():
+    if len(_DEADLINES) == 0:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        return
+    remaining = min(_DEADLINES) - time.time()
+    # A deadline that has already passed fires (almost) immediately
+    signal.setitimer(signal.ITIMER_REAL, max(remaining, 1e-6))
+
+def _endBudget(depth):
+    """
+    Drops the deadlines from depth upwards and re-arms the timer.  The alarm
+    handler does not raise while this runs, so an expired deadline (this
+    one's or an enclosing one's) cannot interrupt it.  Dropping every
+    deadline above depth also removes those of nested calls whose own
+    cleanup was cut short.
+    """
+    global _CLEANING
+    _CLEANING = True
+    try:
+        del _DEADLINES[depth:]
+        if len(_DEADLINES) == 0:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, _OLD_ALARM_HANDLER)
+        else:
+            _armTimer()
+    finally:
+        _CLEANING = False
+
+def _canUseTimer():
+    return hasattr(signal, 'setitimer') and \
+        isinstance(threading.currentThread(), threading._MainThread)
 
 class TimeoutFunction:
+    """
+    Wraps a function so that calling it raises TimeoutFunctionException
+    once it has run for longer than timeout seconds (a float).  Calls may
+    be nested; each keeps its own budget.
+    """
     def __init__(self, function, timeout):
         self.timeout = timeout
         self.function = function
@@ -623,17 +825,27 @@ class TimeoutFunction:
         raise TimeoutFunctionException()
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
+        # If we have an interval timer, use it to cause an exception if and
         # when this function runs too long.  Otherwise check the time taken
         # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
-            old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
+        global _OLD_ALARM_HANDLER
+        if self.timeout <= 0:
+            self.handle_timeout(None, None)
+        if _canUseTimer():
+            if len(_DEADLINES) == 0:
+                _OLD_ALARM_HANDLER = signal.signal(signal.SIGALRM, _handleAlarm)
+            deadline = time.time() + self.timeout
+            depth = len(_DEADLINES)
+            _DEADLINES.append(deadline)
+            _armTimer()
             try:
                 result = self.function(*args, **keyArgs)
             finally:
-                signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
+                _endBudget(depth)
+            # The function may have swallowed our timeout (e.g. while inside
+            # a nested TimeoutFunction), so check the deadline again.
+            if time.time() >= deadline:
+                self.handle_timeout(None, None)
         else:
             startTime = time.time()
             result = self.function(*args, **keyArgs)